@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "SOKKA.settings")
+# Tells the settings that requests are served over ASGI (see CONN_MAX_AGE)
+os.environ["SOKKA_ASGI"] = "1"
 
 application = get_asgi_application()
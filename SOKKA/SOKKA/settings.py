@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,9 +42,12 @@ INSTALLED_APPS = [
     "jobs",
     "profiles",
     "kanban",
+    "perf",
+    "tasks",
 ]
 
 MIDDLEWARE = [
+    "perf.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -51,6 +55,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "perf.replicas.ReplicaPinningMiddleware",
 ]
 
 ROOT_URLCONF = "SOKKA.urls"
@@ -77,13 +82,105 @@ WSGI_APPLICATION = "SOKKA.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLite connection options by profile. "production" runs in WAL mode, so
+# readers never block the writer, and takes the write lock when a transaction
+# starts (BEGIN IMMEDIATE): a transaction that reads before writing then waits
+# for the lock instead of failing with "database is locked" when it upgrades.
+# Compare the profiles with `manage.py benchmark_sqlite`.
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "init_command": (
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            "PRAGMA busy_timeout=5000;"
+            "PRAGMA mmap_size=134217728;"
+            "PRAGMA cache_size=-20000;"
+            "PRAGMA temp_store=MEMORY;"
+        ),
+        "transaction_mode": "IMMEDIATE",
+    },
+}
+
+SQLITE_PROFILE = os.environ.get("SOKKA_SQLITE_PROFILE", "production")
+
+# Set by SOKKA/asgi.py. Under ASGI every request runs its ORM calls in a new
+# thread, each with its own connection, so persistent connections would pile
+# up one per thread that ever ran a request: connections close after each
+# request there, whatever the profile.
+SERVED_OVER_ASGI = os.environ.get("SOKKA_ASGI") == "1"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_PROFILES[SQLITE_PROFILE],
+        # Keep connections (and their page cache) open between requests, under WSGI
+        "CONN_MAX_AGE": None if SQLITE_PROFILE == "production" and not SERVED_OVER_ASGI else 0,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Read replicas, as a comma-separated list of SQLite files (copies of the
+# database refreshed by `manage.py sync_replicas`). Views marked with
+# perf.replicas.read_only read from them; see perf/replicas.py.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get("SOKKA_DB_REPLICAS", "").split(","))):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": replica,
+        # Nothing writes to a replica, so there is no write lock to take up front
+        "OPTIONS": {**DATABASES["default"]["OPTIONS"], "transaction_mode": "DEFERRED"},
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["perf.replicas.ReplicaRouter"]
+
+# How long a session reads from the primary after it writes
+DATABASE_REPLICA_PIN_SECONDS = 10
+
+
+# Cache, picked with SOKKA_CACHE: "locmem" (the default, one per process, only
+# for a single worker process), "file" (shared by the processes of one host)
+# or "redis" (any Redis-compatible server, such as a local Valkey, for several
+# hosts). Stage edits and page cache invalidations only reach the workers
+# sharing the cache, so multi-worker deployments opt into "file" or "redis".
+# SOKKA_CACHE_LOCATION overrides the location.
+
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/0",
+    },
+}
+
+CACHE = os.environ.get("SOKKA_CACHE", "locmem")
+
+CACHES = {"default": CACHE_BACKENDS[CACHE]}
+if os.environ.get("SOKKA_CACHE_LOCATION"):
+    CACHES["default"]["LOCATION"] = os.environ["SOKKA_CACHE_LOCATION"]
+
+# How long anonymous job and profile listings stay cached (see perf/pagecache.py);
+# changes to the listed rows invalidate them sooner
+
+PAGE_CACHE_SECONDS = 10 * 60
+
+# How long cached profile cards and job rows are kept (see
+# perf/templatetags/fragment_cache.py); 0 turns fragment caching off
+
+FRAGMENT_CACHE_SECONDS = 24 * 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -121,6 +218,58 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# Assets that belong to no app (e.g. the landing page's)
+STATICFILES_DIRS = [BASE_DIR / "static"]
+
+# Outside development, `collectstatic` gives assets content-hashed names and
+# writes minified, precompressed copies; perf.staticfiles.serve serves them
+# with far-future cache headers (see perf/staticfiles.py).
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG
+            else "perf.staticfiles.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
+
+# Live kanban board updates (see kanban/broker.py)
+
+KANBAN_BROKER = "kanban.broker.InProcessBroker"
+
+# Per-view performance metrics, served at /metrics (see perf/metrics.py).
+# With several worker processes, point METRICS_DIR at a directory they share.
+
+METRICS_DIR = os.environ.get("SOKKA_METRICS_DIR") or None
+
+METRICS_FLUSH_SECONDS = 5
+
+# Worker files in METRICS_DIR not written for this long are from workers that
+# have exited, and are removed when the metrics are collected
+
+METRICS_STALE_SECONDS = 60 * 60
+
+# Background tasks, run by `manage.py run_workers` (see tasks/queue.py).
+# A worker holds the tasks it claims for TASKS_LEASE_SECONDS; tasks still
+# running after that are assumed lost and run again, so the lease must be
+# longer than a batch of tasks takes.
+
+TASKS_LEASE_SECONDS = 10 * 60
+
+# Retries wait this long, doubling with every failed attempt up to the maximum
+TASKS_RETRY_BACKOFF_SECONDS = 10
+
+TASKS_MAX_RETRY_BACKOFF_SECONDS = 60 * 60
+
+# How long finished tasks are kept for inspection
+TASKS_KEEP_FINISHED_SECONDS = 7 * 24 * 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
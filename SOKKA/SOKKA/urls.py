@@ -15,14 +15,23 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 
+from perf import staticfiles
+from perf.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", TemplateView.as_view(template_name="landing.html"), name="landing"),
     path("jobs/", include("jobs.urls")),
     path("profiles/", include("profiles.urls")),
     path("kanban/", include("kanban.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
+
+if not settings.DEBUG:
+    # In development runserver serves static files itself
+    urlpatterns.append(re_path(rf"^{settings.STATIC_URL.lstrip('/')}(?P<path>.*)$", staticfiles.serve))
@@ -24,6 +24,10 @@ class Job(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # The job list: active jobs, newest first
+            models.Index(fields=["-created_at"], name="jobs_active_recent_idx", condition=models.Q(is_active=True)),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.location or 'Remote/Unknown'}"
@@ -48,6 +52,10 @@ class JobApplication(models.Model):
     class Meta:
         unique_together = ['job', 'applicant']
         ordering = ['-applied_at']
+        indexes = [
+            # An applicant's applications, newest first
+            models.Index(fields=['applicant', '-applied_at'], name='jobs_application_applicant_idx'),
+        ]
 
     def __str__(self):
         return f"{self.applicant.get_full_name()} applied to {self.job.title}"
\ No newline at end of file
@@ -1,49 +1,55 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
 from django.contrib import messages
 from .models import Job, JobApplication
 from .forms import JobForm, JobApplicationForm
+from perf import pagecache
+from perf.replicas import read_only
 
 
-def job_list(request):
+# Filters of the job list, with how each is normalized
+JOB_FILTERS = {
+    "title": pagecache.text,
+    "skills": pagecache.comma_set,
+    "location": pagecache.text,
+    "salary_min": pagecache.integer,
+    "salary_max": pagecache.integer,
+    "is_remote": pagecache.flag,
+    "visa_sponsorship": pagecache.flag,
+}
+
+
+@pagecache.cache_anonymous_page("jobs:list", groups=["jobs"], params=JOB_FILTERS)
+@read_only
+async def job_list(request):
     # Filters: title, skills, location, salary range, is_remote, visa_sponsorship
     qs = Job.objects.filter(is_active=True)
-    title = request.GET.get("title")
-    skills = request.GET.get("skills")
-    location = request.GET.get("location")
-    salary_min = request.GET.get("salary_min")
-    salary_max = request.GET.get("salary_max")
-    is_remote = request.GET.get("is_remote")
-    visa = request.GET.get("visa_sponsorship")
+    filters = pagecache.normalize_query(request.GET, JOB_FILTERS)
 
-    if title:
-        qs = qs.filter(title__icontains=title)
-    if skills:
+    if filters["title"]:
+        qs = qs.filter(title__icontains=filters["title"])
+    if filters["skills"]:
         # naive: check if any of comma-separated skills string appears
-        for skill in [s.strip() for s in skills.split(",") if s.strip()]:
+        for skill in filters["skills"].split(","):
             qs = qs.filter(skills__icontains=skill)
-    if location:
-        qs = qs.filter(location__icontains=location)
-    if salary_min:
-        try:
-            smin = int(salary_min)
-            qs = qs.filter(salary_max__gte=smin) | qs.filter(salary_min__gte=smin)
-        except ValueError:
-            pass
-    if salary_max:
-        try:
-            smax = int(salary_max)
-            qs = qs.filter(salary_min__lte=smax) | qs.filter(salary_max__lte=smax)
-        except ValueError:
-            pass
-    if is_remote in ["1", "true", "True"]:
+    if filters["location"]:
+        qs = qs.filter(location__icontains=filters["location"])
+    if filters["salary_min"]:
+        smin = int(filters["salary_min"])
+        qs = qs.filter(salary_max__gte=smin) | qs.filter(salary_min__gte=smin)
+    if filters["salary_max"]:
+        smax = int(filters["salary_max"])
+        qs = qs.filter(salary_min__lte=smax) | qs.filter(salary_max__lte=smax)
+    if filters["is_remote"]:
         qs = qs.filter(is_remote=True)
-    if visa in ["1", "true", "True"]:
+    if filters["visa_sponsorship"]:
         qs = qs.filter(visa_sponsorship=True)
 
-    context = {"jobs": qs}
-    return render(request, "jobs/job_list.html", context)
+    context = {"jobs": [job async for job in qs], "filters": filters}
+    # The admin base template looks at the user and its permissions
+    return await sync_to_async(render)(request, "jobs/job_list.html", context)
 
 
 def job_detail(request, pk):
@@ -1,3 +1,45 @@
 from django.contrib import admin
+from .models import PipelineStage, KanbanBoard, ProfileCard, ProfileLike, PipelineRule
 
-# Register your models here.
+
+class PipelineStageInline(admin.TabularInline):
+    model = PipelineStage
+    extra = 1
+    fields = ['name', 'label', 'order', 'color']
+
+
+@admin.register(PipelineStage)
+class PipelineStageAdmin(admin.ModelAdmin):
+    list_display = ['name', 'label', 'board', 'order', 'color']
+    list_filter = ['board']
+    ordering = ['board', 'order']
+
+
+@admin.register(KanbanBoard)
+class KanbanBoardAdmin(admin.ModelAdmin):
+    list_display = ['name', 'recruiter', 'revision', 'updated_at']
+    search_fields = ['recruiter__username', 'name']
+    readonly_fields = ['revision', 'compacted_revision']
+    inlines = [PipelineStageInline]
+
+
+@admin.register(ProfileCard)
+class ProfileCardAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'board', 'stage', 'position', 'flagged', 'updated_at']
+    list_filter = ['stage', 'flagged']
+    raw_id_fields = ['board', 'profile']
+    readonly_fields = ['notes_version']
+
+
+@admin.register(ProfileLike)
+class ProfileLikeAdmin(admin.ModelAdmin):
+    list_display = ['recruiter', 'profile', 'liked_at']
+    raw_id_fields = ['recruiter', 'profile']
+
+
+@admin.register(PipelineRule)
+class PipelineRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'board', 'stage', 'idle_days', 'action', 'target_stage', 'is_active', 'last_run_at', 'last_matched']
+    list_filter = ['action', 'is_active', 'stage']
+    raw_id_fields = ['board']
+    readonly_fields = ['last_run_at', 'last_matched']
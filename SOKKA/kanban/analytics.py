@@ -0,0 +1,223 @@
+"""
+Hiring funnel analytics.
+
+Every time a card enters or leaves a stage a ``StageTransition`` row is
+appended (see ``record_transitions``). ``rollup_board`` folds new transitions
+into ``StageFlowRollup`` rows, one per board, day and (from, to) stage pair,
+which carry counts and a histogram of how long cards spent in the stage they
+left. Funnel conversion and time-in-stage percentiles are computed from the
+rollups only, so reports cost the same however much history there is.
+
+Transitions are rolled up incrementally from the board's ``rollup_cursor`` by
+the ``rollup_stage_transitions`` command, run on a schedule. ``funnel_report``
+only reads the stored rollups, so a report covers the transitions up to the
+last run and never writes while serving a request.
+"""
+
+import datetime
+import math
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import KanbanBoard, StageFlowRollup, StageTransition
+from .stages import stage_registry
+
+# Histogram bucket i counts durations in [2**(i-1), 2**i) hours; bucket 0 is
+# under an hour and the last bucket is open-ended (over ~1.9 years)
+HISTOGRAM_BUCKETS = 16
+
+ROLLUP_BATCH_SIZE = 1000
+
+
+def record_transitions(board_id, transitions, at=None):
+    """Append (card_id, from_stage_id, to_stage_id) transitions to a board's log"""
+    record_board_transitions(
+        [(board_id, card_id, from_stage_id, to_stage_id) for card_id, from_stage_id, to_stage_id in transitions], at
+    )
+
+
+def record_board_transitions(transitions, at=None):
+    """Append (board_id, card_id, from_stage_id, to_stage_id) transitions, possibly across boards"""
+    at = at or timezone.now()
+    StageTransition.objects.bulk_create([
+        StageTransition(board_id=board_id, card_id=card_id, from_stage_id=from_stage_id, to_stage_id=to_stage_id, at=at)
+        for board_id, card_id, from_stage_id, to_stage_id in transitions
+        if from_stage_id != to_stage_id
+    ], batch_size=500)
+
+
+def duration_bucket(seconds):
+    """Get the histogram bucket for a duration"""
+    hours = seconds / 3600
+    if hours < 1:
+        return 0
+    return min(int(math.log2(hours)) + 1, HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_bounds(bucket):
+    """Get the (lower, upper) duration in seconds covered by a bucket"""
+    lower = 0 if bucket == 0 else 2 ** (bucket - 1) * 3600
+    return lower, 2 ** bucket * 3600
+
+
+def merge_histograms(target, histogram):
+    """Add one histogram's counts into another, in place"""
+    if len(target) < len(histogram):
+        target.extend([0] * (len(histogram) - len(target)))
+    for bucket, count in enumerate(histogram):
+        target[bucket] += count
+    return target
+
+
+def histogram_percentile(histogram, percentile):
+    """
+    Estimate a percentile duration (in seconds) from a histogram.
+
+    Interpolates within the bucket the percentile falls in; returns None for
+    an empty histogram.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = total * percentile / 100
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower, upper = bucket_bounds(bucket)
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return bucket_bounds(len(histogram) - 1)[1]
+
+
+def rollup_board(board_id):
+    """
+    Fold a board's new stage transitions into its daily rollups.
+
+    Returns the number of transitions processed.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            cursor = KanbanBoard.objects.select_for_update().values_list('rollup_cursor', flat=True).get(id=board_id)
+            transitions = list(
+                StageTransition.objects.filter(board_id=board_id, id__gt=cursor).order_by('id')[:ROLLUP_BATCH_SIZE]
+            )
+            if not transitions:
+                return processed
+
+            # The transition that brought each card into the stage it is now leaving
+            last_ids = StageTransition.objects.filter(
+                board_id=board_id, card_id__in={t.card_id for t in transitions}, id__lte=cursor,
+            ).values('card_id').annotate(last_id=Max('id')).values_list('last_id', flat=True)
+            previous = {t.card_id: t for t in StageTransition.objects.filter(id__in=list(last_ids))}
+
+            totals = {}
+            for t in transitions:
+                key = (timezone.localdate(t.at), t.from_stage_id, t.to_stage_id)
+                total = totals.setdefault(
+                    key, {'count': 0, 'timed_count': 0, 'total_seconds': 0, 'histogram': [0] * HISTOGRAM_BUCKETS}
+                )
+                total['count'] += 1
+                entered = previous.get(t.card_id)
+                if entered is not None and entered.to_stage_id == t.from_stage_id:
+                    seconds = max(int((t.at - entered.at).total_seconds()), 0)
+                    total['timed_count'] += 1
+                    total['total_seconds'] += seconds
+                    total['histogram'][duration_bucket(seconds)] += 1
+                previous[t.card_id] = t
+
+            existing = {
+                (rollup.day, rollup.from_stage_id, rollup.to_stage_id): rollup
+                for rollup in StageFlowRollup.objects.filter(board_id=board_id, day__in={key[0] for key in totals})
+            }
+            updated, created = [], []
+            for key, total in totals.items():
+                rollup = existing.get(key)
+                if rollup is None:
+                    day, from_stage_id, to_stage_id = key
+                    created.append(StageFlowRollup(board_id=board_id, day=day, from_stage_id=from_stage_id, to_stage_id=to_stage_id, **total))
+                    continue
+                rollup.count += total['count']
+                rollup.timed_count += total['timed_count']
+                rollup.total_seconds += total['total_seconds']
+                rollup.histogram = merge_histograms(rollup.histogram, total['histogram'])
+                updated.append(rollup)
+            StageFlowRollup.objects.bulk_create(created, batch_size=500)
+            StageFlowRollup.objects.bulk_update(updated, ['count', 'timed_count', 'total_seconds', 'histogram'], batch_size=500)
+            KanbanBoard.objects.filter(id=board_id).update(rollup_cursor=transitions[-1].id)
+            processed += len(transitions)
+
+
+def _days(seconds):
+    return round(seconds / 86400, 2) if seconds is not None else None
+
+
+def funnel_report(board, days=90, percentiles=(50, 75, 90)):
+    """
+    Summarise the hiring funnel of a board over the last ``days`` days.
+
+    For each stage in board order: how many cards entered it, conversion
+    from the previous and the first stage, and time-in-stage statistics for
+    cards that left it. Reads the stored rollups only; see ``rollup_board``.
+    """
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+
+    entered = {}
+    flows = {}
+    exits = {}
+    for rollup in StageFlowRollup.objects.filter(board=board, day__gte=since):
+        entered[rollup.to_stage_id] = entered.get(rollup.to_stage_id, 0) + rollup.count
+        pair = (rollup.from_stage_id, rollup.to_stage_id)
+        flows[pair] = flows.get(pair, 0) + rollup.count
+        stage_exits = exits.setdefault(rollup.from_stage_id, {'count': 0, 'timed_count': 0, 'total_seconds': 0, 'histogram': []})
+        stage_exits['count'] += rollup.count
+        stage_exits['timed_count'] += rollup.timed_count
+        stage_exits['total_seconds'] += rollup.total_seconds
+        merge_histograms(stage_exits['histogram'], rollup.histogram)
+
+    stages = []
+    first_entered = None
+    previous_entered = None
+    for stage in stage_registry.get_stages(board.id):
+        stage_entered = entered.get(stage.id, 0)
+        if first_entered is None:
+            first_entered = stage_entered
+        stage_exits = exits.get(stage.id, {'count': 0, 'timed_count': 0, 'total_seconds': 0, 'histogram': []})
+        time_in_stage = {
+            'count': stage_exits['timed_count'],
+            'mean_days': _days(stage_exits['total_seconds'] / stage_exits['timed_count']) if stage_exits['timed_count'] else None,
+        }
+        for percentile in percentiles:
+            time_in_stage[f'p{percentile}_days'] = _days(histogram_percentile(stage_exits['histogram'], percentile))
+        stages.append({
+            'id': stage.id,
+            'name': stage.name,
+            'label': stage.display_name,
+            'entered': stage_entered,
+            'exited': stage_exits['count'],
+            'conversion_from_previous': round(stage_entered / previous_entered, 4) if previous_entered else None,
+            'conversion_from_first': round(stage_entered / first_entered, 4) if first_entered else None,
+            'time_in_stage': time_in_stage,
+        })
+        previous_entered = stage_entered
+
+    return {
+        'days': days,
+        'since': since.isoformat(),
+        'stages': stages,
+        'flows': [
+            {'from_stage_id': from_stage_id, 'to_stage_id': to_stage_id, 'count': count}
+            for (from_stage_id, to_stage_id), count in sorted(flows.items(), key=lambda item: -item[1])
+        ],
+    }
+
+
+def conversion(report, from_name, to_name):
+    """Share of the cards entering one stage that entered another, from a funnel report"""
+    by_name = {stage['name']: stage for stage in report['stages']}
+    if from_name not in by_name or to_name not in by_name:
+        return None
+    entered = by_name[from_name]['entered']
+    return round(by_name[to_name]['entered'] / entered, 4) if entered else None
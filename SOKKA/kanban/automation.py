@@ -0,0 +1,125 @@
+"""
+Time-based pipeline automation.
+
+Each active ``PipelineRule`` compiles to one query over ``ProfileCard``: the
+cards in the rule's stage whose ``updated_at`` is older than the rule allows,
+found through the (stage, updated_at) index and taken oldest first, so the
+database never sorts. The query is drained a chunk at a time; each chunk is
+applied with a single UPDATE, which also takes the cards out of the rule's
+matches, and records its board changes and stage transitions in bulk. No
+card is ever loaded as a model instance.
+"""
+
+import datetime
+
+from django.db import transaction
+from django.db.models import Case, Max, Value, When
+from django.utils import timezone
+
+from .analytics import record_board_transitions
+from .board import board_changed
+from .models import PipelineRule, ProfileCard
+from .ranking import keys_between
+
+RULE_CHUNK_SIZE = 500
+
+
+def rule_cards(rule, now):
+    """Get the cards a rule currently applies to"""
+    cards = ProfileCard.objects.filter(
+        stage_id=rule.stage_id,
+        updated_at__lt=now - datetime.timedelta(days=rule.idle_days),
+    )
+    if rule.board_id:
+        cards = cards.filter(board_id=rule.board_id)
+    if rule.action == 'flag':
+        cards = cards.filter(flagged=False)
+    return cards
+
+
+def _by_board(rows):
+    boards = {}
+    for card_id, board_id in rows:
+        boards.setdefault(board_id, []).append(card_id)
+    return boards
+
+
+def _flag_cards(rule, rows, now):
+    ProfileCard.objects.filter(id__in=[card_id for card_id, board_id in rows]).update(flagged=True)
+    for board_id, card_ids in _by_board(rows).items():
+        board_changed(board_id, [{'type': 'card.flagged', 'card_id': card_id, 'flagged': True} for card_id in card_ids])
+
+
+def _move_cards(rule, rows, now):
+    boards = _by_board(rows)
+    # Moved cards go to the end of the target column of their board
+    last_positions = dict(
+        ProfileCard.objects.filter(board_id__in=boards, stage_id=rule.target_stage_id)
+        .order_by().values('board_id').annotate(last=Max('position')).values_list('board_id', 'last')
+    )
+    keys = {}
+    for board_id, card_ids in boards.items():
+        keys.update(zip(card_ids, keys_between(last_positions.get(board_id) or '', None, len(card_ids))))
+
+    ProfileCard.objects.filter(id__in=keys).update(
+        stage_id=rule.target_stage_id,
+        position=Case(*[When(id=card_id, then=Value(key)) for card_id, key in keys.items()]),
+        flagged=False,
+        updated_at=now,
+    )
+    record_board_transitions(
+        [(board_id, card_id, rule.stage_id, rule.target_stage_id) for card_id, board_id in rows], at=now
+    )
+    for board_id, card_ids in boards.items():
+        board_changed(board_id, [
+            {
+                'type': 'card.moved',
+                'card_id': card_id,
+                'stage_id': rule.target_stage_id,
+                'position': keys[card_id],
+                'from_stage_id': rule.stage_id,
+            }
+            for card_id in card_ids
+        ])
+
+
+ACTIONS = {
+    'flag': _flag_cards,
+    'move': _move_cards,
+}
+
+
+def run_rule(rule, now=None, dry_run=False):
+    """
+    Apply a rule to every card it matches.
+
+    Returns the number of cards affected (or that would be, with ``dry_run``).
+    """
+    now = now or timezone.now()
+    if rule.action == 'move' and not rule.target_stage_id:
+        return 0
+    cards = rule_cards(rule, now)
+    if dry_run:
+        return cards.count()
+
+    action = ACTIONS[rule.action]
+    matched = 0
+    while True:
+        with transaction.atomic():
+            # Updated cards stop matching, so each chunk is the next batch
+            rows = list(cards.order_by('updated_at', 'id').values_list('id', 'board_id')[:RULE_CHUNK_SIZE])
+            if not rows:
+                break
+            action(rule, rows, now)
+        matched += len(rows)
+
+    PipelineRule.objects.filter(id=rule.id).update(last_run_at=now, last_matched=matched)
+    return matched
+
+
+def run_rules(rules=None, now=None, dry_run=False):
+    """Run rules (by default every active rule), returning the cards affected per rule"""
+    now = now or timezone.now()
+    if rules is None:
+        rules = PipelineRule.objects.filter(is_active=True)
+    return {rule: run_rule(rule, now, dry_run) for rule in rules}
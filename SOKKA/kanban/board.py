@@ -0,0 +1,391 @@
+"""
+Kanban board loading.
+
+A board is loaded with a constant number of queries: the revision, the card
+count of every column, and the first page of cards of every column (with
+profile and user joined in) picked by a window function. Columns come from
+the stage registry (see ``kanban.stages``) without touching the database.
+Further cards are fetched a page at a time with ``get_column_page``, so
+loading a board costs the same however many cards it holds. The result is
+stored as a plain-data snapshot in the cache, and reused for as long as the
+board's revision matches the one it was taken at, so reopening an unchanged
+board costs no queries beyond fetching the board itself. Checking the
+revision keeps a snapshot from outliving a change even when the cache is
+local to a process and so never sees other processes drop it.
+
+Any card mutation must call ``board_changed``, which assigns each change a
+revision, appends it to the board's change log, drops the snapshot and
+publishes the change to open boards (see ``kanban.broker``). The model
+signals in ``kanban.signals`` take care of ordinary saves and deletes;
+set-based updates, bulk inserts and queryset deletes must call it themselves.
+
+Clients that reconnect catch up through ``get_changes_since``, which returns
+only the cards changed since a revision, or a fresh snapshot when the log no
+longer reaches back that far.
+"""
+
+import re
+
+from django.core.cache import cache
+from django.core.validators import slug_re
+from django.db import transaction
+from django.db.models import Case, Count, When, F, Q, Value, Window
+from django.db.models.functions import Now, RowNumber
+
+from .analytics import record_transitions
+from .broker import board_channel, get_broker
+from .models import BoardChange, KanbanBoard, PipelineStage, ProfileCard
+from .ranking import keys_between, spread_keys
+from .stages import stage_registry
+
+SNAPSHOT_CACHE_KEY = 'kanban:board:{board_id}:snapshot'
+SNAPSHOT_TIMEOUT = 60 * 60
+
+# Catching up on more changed cards than this sends a snapshot instead
+MAX_DELTA_CARDS = 500
+
+COLOR_RE = re.compile(r'^#[0-9a-fA-F]{6}$')
+
+# Cards per column loaded with the board, and the most fetched at once after that
+COLUMN_PAGE_SIZE = 50
+MAX_COLUMN_PAGE_SIZE = 500
+
+
+def serialize_card(card):
+    """Plain-data representation of a card, as stored in snapshots"""
+    return {
+        'id': card.id,
+        'profile_id': card.profile_id,
+        'stage_id': card.stage_id,
+        'name': card.profile.get_full_name(),
+        'headline': card.profile.headline,
+        'position': card.position,
+        'flagged': card.flagged,
+    }
+
+
+def page_cursor(card):
+    """Keyset cursor for the cards after ``card`` in its column"""
+    return {'after': card['position'], 'after_id': card['id']}
+
+
+def column_counts(board):
+    """Get the number of cards in each of a board's columns, by stage ID"""
+    return dict(ProfileCard.objects.filter(board=board).order_by().values_list('stage_id').annotate(count=Count('id')))
+
+
+def load_board(board):
+    """
+    Load the columns of a board with their first page of cards, along with the board revision.
+    
+    The revision is read first, so the cards are at least as new as it.
+    """
+    revision = KanbanBoard.objects.values_list('revision', flat=True).get(id=board.id)
+    stages_version = stage_registry.version
+    columns = {}
+    for stage in stage_registry.get_stages(board.id):
+        columns[stage.id] = {
+            'id': stage.id,
+            'name': stage.name,
+            'label': stage.display_name,
+            'color': stage.color,
+            'count': 0,
+            'cards': [],
+            'next': None,
+        }
+    
+    for stage_id, count in column_counts(board).items():
+        if stage_id in columns:
+            columns[stage_id]['count'] = count
+    
+    cards = ProfileCard.objects.filter(board=board).annotate(
+        column_rank=Window(RowNumber(), partition_by=[F('stage_id')], order_by=[F('position').asc(), F('id').asc()]),
+    ).filter(column_rank__lte=COLUMN_PAGE_SIZE).select_related('profile__user').order_by('position', 'id')
+    for card in cards:
+        column = columns.get(card.stage_id)
+        if column is not None:
+            column['cards'].append(serialize_card(card))
+    for column in columns.values():
+        if column['count'] > len(column['cards']):
+            column['next'] = page_cursor(column['cards'][-1])
+    return {'revision': revision, 'stages_version': stages_version, 'columns': list(columns.values())}
+
+
+def get_board_snapshot(board):
+    """
+    Get the revision and columns of a board, from the snapshot cache when possible.
+    
+    ``board`` must have been fetched for this request: a snapshot is only used
+    if it was taken at the board's current revision.
+    """
+    key = SNAPSHOT_CACHE_KEY.format(board_id=board.id)
+    snapshot = cache.get(key)
+    # Snapshots taken before a card or stage change have the old cards or columns
+    if (
+        snapshot is None
+        or snapshot['revision'] != board.revision
+        or snapshot.get('stages_version') != stage_registry.version
+    ):
+        snapshot = load_board(board)
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def get_column_page(board, stage, after=None, after_id=None, limit=COLUMN_PAGE_SIZE):
+    """
+    Get a page of a column's cards, in order, after the card at (``after``, ``after_id``).
+    
+    Pages are found by keyset on the column index, so deep pages cost the same
+    as the first. Returns the cards and the cursor for the next page, if any.
+    """
+    cards = ProfileCard.objects.filter(board=board, stage=stage)
+    if after is not None:
+        cards = cards.filter(Q(position__gt=after) | Q(position=after, id__gt=after_id or 0))
+    cards = [
+        serialize_card(card)
+        for card in cards.select_related('profile__user').order_by('position', 'id')[:limit + 1]
+    ]
+    next_cursor = page_cursor(cards[limit - 1]) if len(cards) > limit else None
+    return {'cards': cards[:limit], 'next': next_cursor}
+
+
+def get_changes_since(board, since):
+    """
+    Get what changed on a board after revision ``since``.
+    
+    Returns a delta of the current state of every changed card, the IDs of
+    removed cards and the stages of columns to refetch (rebalanced ones), or a
+    full snapshot if the change log has been compacted past ``since`` or too
+    many cards changed for a delta to be worthwhile.
+    """
+    board = KanbanBoard.objects.only('revision', 'compacted_revision').get(id=board.id)
+    if since is None or since < board.compacted_revision or since > board.revision:
+        return dict(get_board_snapshot(board), type='snapshot')
+    
+    changes = BoardChange.objects.filter(board=board, revision__gt=since, revision__lte=board.revision).order_by()
+    changed_ids = set(
+        changes.filter(card_id__isnull=False).values_list('card_id', flat=True).distinct()[:MAX_DELTA_CARDS + 1]
+    )
+    if len(changed_ids) > MAX_DELTA_CARDS:
+        return dict(get_board_snapshot(board), type='snapshot')
+    changed_columns = set(changes.filter(card_id__isnull=True).values_list('event__stage_id', flat=True))
+    
+    cards = ProfileCard.objects.filter(board=board, id__in=changed_ids).select_related('profile__user')
+    upserts = [serialize_card(card) for card in cards]
+    removed = changed_ids - {card['id'] for card in upserts}
+    return {
+        'type': 'delta',
+        'revision': board.revision,
+        'cards': upserts,
+        'removed': sorted(removed),
+        'columns': sorted(changed_columns),
+        'counts': column_counts(board),
+    }
+
+
+def invalidate_board(*board_ids):
+    """Drop the cached snapshots of the given boards"""
+    cache.delete_many([SNAPSHOT_CACHE_KEY.format(board_id=board_id) for board_id in board_ids])
+
+
+def card_event(event_type, card, from_stage_id=None):
+    """
+    Build the live-update event describing a change to a card.
+    
+    Moves say which stage the card left when it is known, so clients can keep
+    column counts right for cards they haven't loaded.
+    """
+    if event_type == 'card.added':
+        return {'type': event_type, 'card': serialize_card(card)}
+    if event_type == 'card.moved':
+        event = {'type': event_type, 'card_id': card.id, 'stage_id': card.stage_id, 'position': card.position}
+        if from_stage_id is not None:
+            event['from_stage_id'] = from_stage_id
+        return event
+    if event_type == 'card.notes_updated':
+        # Notes can be long: clients fetch the text if they need it
+        return {'type': event_type, 'card_id': card.id, 'notes_version': card.notes_version}
+    return {'type': event_type, 'card_id': card.id, 'stage_id': card.stage_id}
+
+
+def _event_card_id(event):
+    if 'card' in event:
+        return event['card']['id']
+    # Column events (such as a rebalance) concern no single card
+    return event.get('card_id')
+
+
+def _assign_revisions(board_id, events):
+    """Take the next board revisions for ``events``; returns the last one, or None if the board is gone"""
+    # The UPDATE locks the board row, so revisions are handed out in commit order
+    updated = KanbanBoard.objects.filter(id=board_id).update(revision=F('revision') + len(events), updated_at=Now())
+    if not updated:
+        return None
+    revision = KanbanBoard.objects.values_list('revision', flat=True).get(id=board_id)
+    first_revision = revision - len(events) + 1
+    for offset, event in enumerate(events):
+        event['revision'] = first_revision + offset
+    return revision
+
+
+def _publish_on_commit(board_id, events):
+    def publish():
+        invalidate_board(board_id)
+        broker = get_broker()
+        for event in events:
+            broker.publish(board_channel(board_id), event)
+    transaction.on_commit(publish)
+
+
+def board_changed(board_id, events):
+    """
+    Record changes to a board's cards.
+    
+    Each event gets the next board revision and is appended to the change
+    log. Once the transaction commits, the snapshot is dropped and the events
+    are published to open boards. Returns the new board revision.
+    """
+    events = list(events)
+    with transaction.atomic():
+        revision = _assign_revisions(board_id, events)
+        if revision is None:
+            return None
+        BoardChange.objects.bulk_create([
+            BoardChange(board_id=board_id, revision=event['revision'], card_id=_event_card_id(event), event=event)
+            for event in events
+        ], batch_size=500)
+    _publish_on_commit(board_id, events)
+    return revision
+
+
+def board_change_superseded(board_id, event, superseded):
+    """
+    Record a change that supersedes one still in the change log.
+    
+    Instead of appending, the log entry matching the ``superseded`` lookups
+    is moved to the new revision and given the new event, so a run of rapid
+    changes (such as one editor's autosaves) keeps a single row. Clients that
+    already read the old entry see the change at its new revision, as with
+    any other. If the entry has been compacted away, the event is appended.
+    Must be called inside a transaction. Returns the new board revision.
+    """
+    revision = _assign_revisions(board_id, [event])
+    if revision is None:
+        return None
+    moved = BoardChange.objects.filter(board_id=board_id, **superseded).update(
+        revision=revision, card_id=_event_card_id(event), event=event,
+    )
+    if not moved:
+        BoardChange.objects.create(board_id=board_id, revision=revision, card_id=_event_card_id(event), event=event)
+    _publish_on_commit(board_id, [event])
+    return revision
+
+
+def move_cards(board, card_ids, new_stage, prev_card_id=None, next_card_id=None):
+    """
+    Move several cards into a stage, between two neighbouring cards.
+    
+    The cards keep the order they are given in. Ownership is checked with a
+    single query and all cards are moved by one UPDATE. Returns the new board
+    revision. Raises ProfileCard.DoesNotExist if any card is not on the board.
+    """
+    card_ids = list(dict.fromkeys(card_ids))
+    with transaction.atomic():
+        old_stages = dict(ProfileCard.objects.filter(board=board, id__in=card_ids).values_list('id', 'stage_id'))
+        if len(old_stages) != len(card_ids):
+            raise ProfileCard.DoesNotExist('Some cards are not on this board')
+        
+        neighbours = dict(
+            ProfileCard.objects.filter(
+                board=board,
+                stage=new_stage,
+                id__in=[card_id for card_id in (prev_card_id, next_card_id) if card_id],
+            ).exclude(id__in=card_ids).order_by().values_list('id', 'position')
+        )
+        prev_position = neighbours.get(prev_card_id)
+        next_position = neighbours.get(next_card_id)
+        if prev_position is None and next_position is None:
+            prev_position = ProfileCard.objects.filter(board=board, stage=new_stage).exclude(
+                id__in=card_ids
+            ).order_by('-position').values_list('position', flat=True).first()
+        if next_position is not None and (prev_position or '') >= next_position:
+            # Neighbours out of order (stale client view); keep the cards below the one above them
+            next_position = None
+        
+        keys = keys_between(prev_position or '', next_position, len(card_ids))
+        ProfileCard.objects.filter(id__in=card_ids).update(
+            stage=new_stage,
+            position=Case(*[When(id=card_id, then=Value(key)) for card_id, key in zip(card_ids, keys)]),
+            flagged=False,
+            updated_at=Now(),
+        )
+        record_transitions(board.id, [(card_id, old_stages[card_id], new_stage.id) for card_id in card_ids])
+        return board_changed(board.id, [
+            {'type': 'card.moved', 'card_id': card_id, 'stage_id': new_stage.id, 'position': key, 'from_stage_id': old_stages[card_id]}
+            for card_id, key in zip(card_ids, keys)
+        ])
+
+
+def rebalance_column(board_id, stage_id):
+    """Rewrite a column's position keys as short, evenly spaced keys, keeping its order"""
+    with transaction.atomic():
+        cards = list(
+            ProfileCard.objects.select_for_update()
+            .filter(board_id=board_id, stage_id=stage_id)
+            .order_by('position', 'id')
+            .only('id', 'position')
+        )
+        for card, key in zip(cards, spread_keys(len(cards))):
+            card.position = key
+        ProfileCard.objects.bulk_update(cards, ['position'], batch_size=500)
+        # The order is unchanged, so one event tells clients to refetch the column
+        board_changed(board_id, [{'type': 'column.rebalanced', 'stage_id': stage_id}])
+    return len(cards)
+
+
+def set_board_stages(board, stages):
+    """
+    Give a board its own pipeline.
+    
+    ``stages`` lists the columns in order, each a dict with a ``name`` and
+    optionally a ``label`` and ``color``. Existing stages of the board are
+    updated in place. Cards in stages the board no longer uses move to the
+    new stage with the same name, or else to the end of the first stage.
+    Raises ValueError if the stages are invalid.
+    """
+    names = [spec.get('name') for spec in stages]
+    if not names:
+        raise ValueError('A pipeline needs at least one stage')
+    if not all(isinstance(name, str) and slug_re.match(name) for name in names):
+        raise ValueError('Stage names may only contain letters, numbers, underscores and hyphens')
+    if len(set(names)) != len(names):
+        raise ValueError('Stage names must be unique')
+    for spec in stages:
+        if 'color' in spec and not COLOR_RE.match(spec['color']):
+            raise ValueError(f'Invalid color for stage {spec["name"]}: {spec["color"]}')
+    
+    with transaction.atomic():
+        old_stages = stage_registry.get_stages(board.id)
+        existing = {stage.name: stage for stage in PipelineStage.objects.filter(board=board)}
+        new_stages = {}
+        for order, spec in enumerate(stages, start=1):
+            stage = existing.pop(spec['name'], None) or PipelineStage(board=board, name=spec['name'])
+            stage.label = spec.get('label', stage.label)
+            stage.color = spec.get('color', stage.color)
+            stage.order = order
+            stage.save()
+            new_stages[stage.name] = stage
+        
+        first_stage = new_stages[names[0]]
+        for old_stage in old_stages:
+            if new_stages.get(old_stage.name, first_stage).id == old_stage.id:
+                continue
+            card_ids = list(
+                ProfileCard.objects.filter(board=board, stage=old_stage).order_by('position', 'id').values_list('id', flat=True)
+            )
+            if card_ids:
+                move_cards(board, card_ids, new_stages.get(old_stage.name, first_stage))
+        
+        # Left-over stages are empty now
+        PipelineStage.objects.filter(id__in=[stage.id for stage in existing.values()]).delete()
+    return [new_stages[name] for name in names]
@@ -0,0 +1,118 @@
+"""
+Publish/subscribe brokers for live kanban board events.
+
+Board changes are published to a per-board channel and streamed to open
+boards by the ``board_events`` view. The broker class is configured with the
+``KANBAN_BROKER`` setting; the default ``InProcessBroker`` needs no external
+services but only reaches subscribers served by the same process, so it
+suits a single ASGI worker (e.g. ``uvicorn SOKKA.asgi:application``). Run
+several workers behind a broker that fans out between processes.
+
+Under WSGI there are no live events: a streamed response would hold a
+worker for as long as the board stays open, so boards poll the change log
+instead (see ``live_updates_available``).
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.module_loading import import_string
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def board_channel(board_id):
+    return f'board:{board_id}'
+
+
+def live_updates_available(request):
+    """Whether board events can be streamed in answer to a request (only an ASGI server can)"""
+    return isinstance(request, ASGIRequest)
+
+
+class Subscription:
+    """A subscriber's queue of events on one channel"""
+
+    def __init__(self, broker, channel, max_pending):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue an event; must be called on the subscriber's event loop"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop events and tell the client to resync
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        """Wait for the next event, raising asyncio.TimeoutError after ``timeout`` seconds"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """Interface every board event broker implements"""
+
+    def publish(self, channel, event):
+        """Send an event to every subscriber of a channel; callable from sync code"""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Subscribe to a channel from async code, returning a Subscription"""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """Broker delivering events to subscribers in the current process"""
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_pending)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+def get_broker():
+    """Get the process-wide broker configured by ``KANBAN_BROKER``"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            broker_class = import_string(getattr(settings, 'KANBAN_BROKER', 'kanban.broker.InProcessBroker'))
+            _broker = broker_class()
+        return _broker
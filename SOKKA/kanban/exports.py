@@ -0,0 +1,168 @@
+"""
+Streaming exports of a kanban board.
+
+Cards are read a chunk at a time, column by column, by keyset on the column
+index; each chunk's profiles, skills, experience, education and links are
+prefetched together, turned into output and dropped before the next chunk is
+read. Output is yielded as it is written, so memory use does not grow with
+the size of the board.
+
+Candidate data goes through ``profiles.exports.build_resume`` with the
+candidate's visible fields, so exports show recruiters exactly what the
+candidate's privacy settings allow.
+"""
+
+import csv
+import json
+import zipfile
+
+from django.db.models import Q, prefetch_related_objects
+from django.utils.text import slugify
+
+from profiles.exports import build_resume, get_visible_fields
+from .models import ProfileCard
+from .stages import stage_registry
+
+EXPORT_CHUNK_SIZE = 500
+
+CSV_COLUMNS = [
+    'card_id', 'stage', 'added_at', 'updated_at', 'notes',
+    'name', 'headline', 'email', 'phone', 'location', 'summary',
+    'skills', 'current_position', 'education', 'links',
+]
+
+
+class StreamBuffer:
+    """Write-only file object whose contents are collected with ``take()``"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _TextWriter:
+    """Adapt a binary stream for csv.writer"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        return self.stream.write(text.encode('utf-8'))
+
+
+def iter_card_chunks(board, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a board's cards in board order, a chunk at a time, with their candidates prefetched"""
+    for stage in stage_registry.get_stages(board.id):
+        after = None
+        while True:
+            cards = ProfileCard.objects.filter(board=board, stage=stage)
+            if after is not None:
+                cards = cards.filter(Q(position__gt=after[0]) | Q(position=after[0], id__gt=after[1]))
+            cards = list(
+                cards.select_related('profile__user', 'profile__privacy_settings').order_by('position', 'id')[:chunk_size]
+            )
+            if not cards:
+                break
+            prefetch_related_objects(
+                cards,
+                'profile__profile_skills__skill', 'profile__work_experiences', 'profile__educations', 'profile__links',
+            )
+            yield stage, cards
+            if len(cards) < chunk_size:
+                break
+            after = (cards[-1].position, cards[-1].id)
+
+
+def card_resume(card):
+    """Build the candidate's resume for a card, limited to their visible fields"""
+    return build_resume(card.profile, get_visible_fields(card.profile))
+
+
+def card_row(stage, card, resume):
+    """Build the CSV row for a card"""
+    basics = resume['basics']
+    work = resume.get('work') or [{}]
+    education = resume.get('education') or [{}]
+    return [
+        card.id,
+        stage.display_name,
+        card.added_at.isoformat(),
+        card.updated_at.isoformat(),
+        card.notes,
+        basics['name'],
+        basics.get('label', ''),
+        basics.get('email', ''),
+        basics.get('phone', ''),
+        basics.get('location', {}).get('address', ''),
+        basics.get('summary', ''),
+        '; '.join(f"{skill['name']} ({skill['level']})" for skill in resume.get('skills', [])),
+        f"{work[0]['position']} at {work[0]['name']}" if work[0] else '',
+        f"{education[0]['studyType']}, {education[0]['institution']}" if education[0] else '',
+        ' '.join(link['url'] for link in basics.get('profiles', [])),
+    ]
+
+
+def stream_csv(board):
+    """Yield a board export as CSV"""
+    buffer = StreamBuffer()
+    writer = csv.writer(_TextWriter(buffer))
+    writer.writerow(CSV_COLUMNS)
+    for stage, cards in iter_card_chunks(board):
+        for card in cards:
+            writer.writerow(card_row(stage, card, card_resume(card)))
+        yield buffer.take()
+    yield buffer.take()
+
+
+def stream_zip(board):
+    """
+    Yield a board export as a ZIP holding the CSV plus one JSON resume per candidate.
+
+    A ZIP entry must be finished before the next starts, so the board is read
+    twice: once for the CSV and once for the JSON files.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('board.csv', 'w', force_zip64=True) as entry:
+            writer = csv.writer(_TextWriter(entry))
+            writer.writerow(CSV_COLUMNS)
+            for stage, cards in iter_card_chunks(board):
+                for card in cards:
+                    writer.writerow(card_row(stage, card, card_resume(card)))
+                yield buffer.take()
+
+        for stage, cards in iter_card_chunks(board):
+            for card in cards:
+                resume = card_resume(card)
+                resume['meta'] = {
+                    'cardId': card.id,
+                    'stage': stage.display_name,
+                    'notes': card.notes,
+                    'addedAt': card.added_at.isoformat(),
+                }
+                name = f"candidates/{card.id}-{slugify(resume['basics']['name']) or 'candidate'}.json"
+                archive.writestr(name, json.dumps(resume, indent=2))
+            yield buffer.take()
+    yield buffer.take()
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'zip': (stream_zip, 'application/zip', 'zip'),
+}
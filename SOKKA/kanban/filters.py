@@ -0,0 +1,70 @@
+"""
+Server-side filtering of the cards on a board.
+
+Filters run as one query over the board's cards: skill criteria become
+``EXISTS`` lookups on the (skill, proficiency level, profile) index of
+``ProfileSkill``, and text is matched against card notes and the candidate's
+name and headline for the board's cards only (found through the board
+index). Only matching card IDs are sent to the client, so filtering never
+needs every profile's skills shipped to the browser.
+"""
+
+from django.db.models import Exists, OuterRef, Q
+
+from profiles.models import ProfileSkill, Skill
+from .models import ProfileCard
+
+# Upper bound on skills combined in one filter
+MAX_FILTER_SKILLS = 5
+
+
+def skills_hidden_q(prefix=''):
+    """Q matching profiles whose privacy settings hide their skills from recruiters"""
+    return Q(**{f'{prefix}privacy_settings__profile_visibility': 'private'}) | Q(
+        **{f'{prefix}privacy_settings__profile_visibility': 'selective', f'{prefix}privacy_settings__show_skills': False}
+    )
+
+
+def filter_board_cards(board, skills=(), min_level=None, text=''):
+    """
+    Get the IDs of a board's cards matching a filter, grouped by stage ID.
+
+    A card matches if its candidate has every skill in ``skills`` (at
+    ``min_level`` or above, when given) and, if ``text`` is given, the text
+    appears in the card notes or the candidate's name or headline. Skills are
+    only matched on profiles that show their skills to recruiters. Unknown
+    skills match nothing. Raises ValueError for an unknown level.
+    """
+    cards = ProfileCard.objects.filter(board=board)
+
+    if skills:
+        levels = ProfileSkill.levels_at_least(min_level) if min_level else None
+        skill_ids = dict(
+            (name.lower(), skill_id)
+            for skill_id, name in Skill.objects.filter(
+                Q(*[Q(name__iexact=name) for name in skills], _connector=Q.OR)
+            ).values_list('id', 'name')
+        )
+        if len(skill_ids) < len({name.lower() for name in skills}):
+            return {}
+        for skill_id in skill_ids.values():
+            matching = ProfileSkill.objects.filter(profile_id=OuterRef('profile_id'), skill_id=skill_id)
+            if levels:
+                matching = matching.filter(proficiency_level__in=levels)
+            cards = cards.filter(Exists(matching))
+        cards = cards.exclude(skills_hidden_q('profile__'))
+
+    if text:
+        cards = cards.filter(
+            Q(notes__icontains=text)
+            | Q(profile__headline__icontains=text)
+            | Q(profile__first_name__icontains=text)
+            | Q(profile__last_name__icontains=text)
+            | Q(profile__user__first_name__icontains=text)
+            | Q(profile__user__last_name__icontains=text)
+        )
+
+    matches = {}
+    for card_id, stage_id in cards.order_by('position', 'id').values_list('id', 'stage_id'):
+        matches.setdefault(stage_id, []).append(card_id)
+    return matches
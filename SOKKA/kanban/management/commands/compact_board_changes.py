@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from kanban.models import BoardChange, KanbanBoard
+
+
+class Command(BaseCommand):
+    help = 'Discard old board change log entries, keeping the most recent ones for delta sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=1000,
+            help='Number of most recent revisions to keep per board (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        keep = options['keep']
+        boards = KanbanBoard.objects.filter(revision__gt=F('compacted_revision') + keep).values_list('id', 'revision')
+        
+        deleted_total = 0
+        for board_id, revision in boards.iterator():
+            floor = revision - keep
+            with transaction.atomic():
+                # Raise the floor first so no client is sent a delta with a hole in it
+                KanbanBoard.objects.filter(id=board_id).update(compacted_revision=floor)
+                deleted, _ = BoardChange.objects.filter(board_id=board_id, revision__lte=floor).delete()
+            deleted_total += deleted
+        
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted_total} board change entries'))
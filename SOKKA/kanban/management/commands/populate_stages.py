@@ -1,9 +1,10 @@
 from django.core.management.base import BaseCommand
 from kanban.models import PipelineStage
+from kanban.stages import invalidate_stages, stage_registry
 
 
 class Command(BaseCommand):
-    help = 'Populate the pipeline stages for the kanban board'
+    help = 'Populate the default pipeline stages for the kanban board'
 
     def handle(self, *args, **options):
         stages_data = [
@@ -14,32 +15,30 @@ class Command(BaseCommand):
             {'name': 'rejected', 'order': 4, 'color': '#cf513d'},
         ]
         
+        # The default pipeline, as every process sees it
+        existing = {stage.name: stage for stage in stage_registry.get_stages() if stage.board_id is None}
+        
         created_count = 0
         for stage_data in stages_data:
-            stage, created = PipelineStage.objects.get_or_create(
-                name=stage_data['name'],
-                defaults={
-                    'order': stage_data['order'],
-                    'color': stage_data['color']
-                }
-            )
-            if created:
+            stage = existing.get(stage_data['name'])
+            if stage is None:
+                stage = PipelineStage.objects.create(**stage_data)
                 created_count += 1
                 self.stdout.write(
-                    self.style.SUCCESS(f'Created stage: {stage.get_name_display()}')
+                    self.style.SUCCESS(f'Created stage: {stage.display_name}')
                 )
             else:
                 # Update existing stage order and color if needed
                 if stage.order != stage_data['order'] or stage.color != stage_data['color']:
-                    stage.order = stage_data['order']
-                    stage.color = stage_data['color']
-                    stage.save()
+                    # Registry stages are shared, so update the row rather than the instance
+                    PipelineStage.objects.filter(id=stage.id).update(order=stage_data['order'], color=stage_data['color'])
+                    invalidate_stages()
                     self.stdout.write(
-                        self.style.WARNING(f'Updated stage: {stage.get_name_display()}')
+                        self.style.WARNING(f'Updated stage: {stage.display_name}')
                     )
                 else:
                     self.stdout.write(
-                        self.style.WARNING(f'Stage already exists: {stage.get_name_display()}')
+                        self.style.WARNING(f'Stage already exists: {stage.display_name}')
                     )
         
         self.stdout.write(
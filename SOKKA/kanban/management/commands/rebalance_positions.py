@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.db.models.functions import Length
+
+from kanban.board import rebalance_column
+from kanban.models import ProfileCard
+from kanban.ranking import REBALANCE_LENGTH
+
+
+class Command(BaseCommand):
+    help = 'Rewrite card position keys in columns whose keys have grown too long (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-length',
+            type=int,
+            default=REBALANCE_LENGTH,
+            help=f'Rebalance columns holding a key longer than this (default: {REBALANCE_LENGTH})',
+        )
+
+    def handle(self, *args, **options):
+        columns = (
+            ProfileCard.objects.values('board_id', 'stage_id')
+            .annotate(longest=Max(Length('position')))
+            .filter(longest__gt=options['max_length'])
+        )
+        
+        rebalanced = 0
+        for column in columns:
+            count = rebalance_column(column['board_id'], column['stage_id'])
+            rebalanced += 1
+            self.stdout.write(f"Rebalanced {count} cards on board {column['board_id']}, stage {column['stage_id']}")
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebalanced {rebalanced} columns'))
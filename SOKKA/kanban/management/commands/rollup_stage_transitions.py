@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, F
+
+from kanban.analytics import rollup_board
+from kanban.models import KanbanBoard
+
+
+class Command(BaseCommand):
+    help = 'Fold new stage transitions into the daily funnel analytics rollups'
+
+    def handle(self, *args, **options):
+        boards = KanbanBoard.objects.annotate(
+            last_transition=Max('transitions__id')
+        ).filter(last_transition__gt=F('rollup_cursor')).values_list('id', flat=True)
+        
+        processed = 0
+        board_count = 0
+        for board_id in boards.iterator():
+            processed += rollup_board(board_id)
+            board_count += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {processed} transitions on {board_count} boards'))
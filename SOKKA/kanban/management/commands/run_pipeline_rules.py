@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from kanban.automation import run_rules
+from kanban.models import PipelineRule
+
+
+class Command(BaseCommand):
+    help = 'Apply the active pipeline rules to idle kanban cards (run on a schedule, e.g. nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the cards each rule would affect',
+        )
+        parser.add_argument(
+            '--board',
+            type=int,
+            help='Only run the rules of this board (by ID)',
+        )
+
+    def handle(self, *args, **options):
+        rules = PipelineRule.objects.filter(is_active=True).select_related('stage', 'target_stage')
+        if options['board']:
+            rules = rules.filter(board_id=options['board'])
+        
+        results = run_rules(rules, dry_run=options['dry_run'])
+        verb = 'would affect' if options['dry_run'] else 'affected'
+        for rule, count in results.items():
+            self.stdout.write(f'{rule.name}: {verb} {count} cards')
+        
+        self.stdout.write(self.style.SUCCESS(f'Ran {len(results)} pipeline rules'))
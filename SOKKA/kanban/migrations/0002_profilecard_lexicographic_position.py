@@ -0,0 +1,50 @@
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+def assign_rank_keys(apps, schema_editor):
+    """Convert integer positions into evenly spaced keys, keeping each column's order"""
+    from kanban.ranking import spread_keys
+
+    ProfileCard = apps.get_model('kanban', 'ProfileCard')
+    cards = ProfileCard.objects.order_by('board_id', 'stage_id', 'position', 'id').only('id', 'board_id', 'stage_id')
+    for _, column in groupby(cards.iterator(), key=lambda card: (card.board_id, card.stage_id)):
+        column = list(column)
+        for card, key in zip(column, spread_keys(len(column))):
+            card.rank = key
+        ProfileCard.objects.bulk_update(column, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilecard',
+            name='rank',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RunPython(assign_rank_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='profilecard',
+            name='position',
+        ),
+        migrations.RenameField(
+            model_name='profilecard',
+            old_name='rank',
+            new_name='position',
+        ),
+        migrations.AlterField(
+            model_name='profilecard',
+            name='position',
+            field=models.CharField(default='', help_text='Lexicographic ordering key within the stage', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='profilecard',
+            index=models.Index(fields=['board', 'stage', 'position'], name='kanban_card_column_idx'),
+        ),
+    ]
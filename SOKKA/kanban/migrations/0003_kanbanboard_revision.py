@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0002_profilecard_lexicographic_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kanbanboard',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0, help_text="Incremented on every change to the board's cards"),
+        ),
+    ]
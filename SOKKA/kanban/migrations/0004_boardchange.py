@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0003_kanbanboard_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kanbanboard',
+            name='compacted_revision',
+            field=models.PositiveBigIntegerField(default=0, help_text='Change log entries up to this revision have been discarded'),
+        ),
+        migrations.CreateModel(
+            name='BoardChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveBigIntegerField()),
+                ('card_id', models.PositiveBigIntegerField()),
+                ('event', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='kanban.kanbanboard')),
+            ],
+            options={
+                'ordering': ['revision'],
+                'unique_together': {('board', 'revision')},
+            },
+        ),
+    ]
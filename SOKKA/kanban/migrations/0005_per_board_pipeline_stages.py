@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0004_boardchange'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='pipelinestage',
+            options={'ordering': ['order', 'id']},
+        ),
+        migrations.AddField(
+            model_name='pipelinestage',
+            name='board',
+            field=models.ForeignKey(blank=True, help_text='Board this stage belongs to; empty for the default pipeline', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stages', to='kanban.kanbanboard'),
+        ),
+        migrations.AddField(
+            model_name='pipelinestage',
+            name='label',
+            field=models.CharField(blank=True, help_text='Column title; defaults to the standard title for the name', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='pipelinestage',
+            name='name',
+            field=models.SlugField(),
+        ),
+        migrations.AddConstraint(
+            model_name='pipelinestage',
+            constraint=models.UniqueConstraint(fields=('board', 'name'), name='kanban_stage_board_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='pipelinestage',
+            constraint=models.UniqueConstraint(condition=models.Q(('board__isnull', True)), fields=('name',), name='kanban_stage_default_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0005_per_board_pipeline_stages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kanbanboard',
+            name='rollup_cursor',
+            field=models.PositiveBigIntegerField(default=0, help_text='Stage transitions up to this ID have been rolled up'),
+        ),
+        migrations.CreateModel(
+            name='StageFlowRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('from_stage_id', models.PositiveBigIntegerField(null=True)),
+                ('to_stage_id', models.PositiveBigIntegerField(null=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('timed_count', models.PositiveIntegerField(default=0, help_text='Transitions whose time in the previous stage is known')),
+                ('total_seconds', models.PositiveBigIntegerField(default=0)),
+                ('histogram', models.JSONField(default=list, help_text='Time in the previous stage, counted per duration bucket')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flow_rollups', to='kanban.kanbanboard')),
+            ],
+            options={
+                'ordering': ['day'],
+                'unique_together': {('board', 'day', 'from_stage_id', 'to_stage_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StageTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card_id', models.PositiveBigIntegerField()),
+                ('from_stage_id', models.PositiveBigIntegerField(help_text='Empty when the card was added to the board', null=True)),
+                ('to_stage_id', models.PositiveBigIntegerField(help_text='Empty when the card was removed from the board', null=True)),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='kanban.kanbanboard')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['board', 'id'], name='kanban_transition_board_idx'), models.Index(fields=['card_id', 'id'], name='kanban_transition_card_idx')],
+            },
+        ),
+    ]
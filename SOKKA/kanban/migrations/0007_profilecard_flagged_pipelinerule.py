@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0006_stagetransition_stageflowrollup'),
+        ('profiles', '0005_profileskill_skill_level_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('idle_days', models.PositiveIntegerField(help_text='Days since the card was last changed')),
+                ('action', models.CharField(choices=[('move', 'Move to another stage'), ('flag', 'Flag for attention')], max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_matched', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['stage__order', 'idle_days'],
+            },
+        ),
+        migrations.AddField(
+            model_name='profilecard',
+            name='flagged',
+            field=models.BooleanField(default=False, help_text='Flagged for attention by a pipeline rule; cleared when the card moves'),
+        ),
+        migrations.AddIndex(
+            model_name='profilecard',
+            index=models.Index(fields=['stage', 'updated_at'], name='kanban_card_stage_idle_idx'),
+        ),
+        migrations.AddField(
+            model_name='pipelinerule',
+            name='board',
+            field=models.ForeignKey(blank=True, help_text='Board the rule applies to; empty for every board', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rules', to='kanban.kanbanboard'),
+        ),
+        migrations.AddField(
+            model_name='pipelinerule',
+            name='stage',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rules', to='kanban.pipelinestage'),
+        ),
+        migrations.AddField(
+            model_name='pipelinerule',
+            name='target_stage',
+            field=models.ForeignKey(blank=True, help_text='Stage cards are moved to (move rules only)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='kanban.pipelinestage'),
+        ),
+    ]
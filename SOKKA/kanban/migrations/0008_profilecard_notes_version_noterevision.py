@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0007_profilecard_flagged_pipelinerule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilecard',
+            name='notes_version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every notes change, for optimistic concurrency'),
+        ),
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('diff', models.JSONField(default=list)),
+                ('client_id', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='note_revisions', to='kanban.profilecard')),
+            ],
+            options={
+                'ordering': ['-version'],
+                'unique_together': {('card', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0008_profilecard_notes_version_noterevision'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='boardchange',
+            name='card_id',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Empty for changes to a whole column', null=True),
+        ),
+    ]
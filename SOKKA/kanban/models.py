@@ -1,10 +1,18 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from profiles.models import Profile
+from .ranking import key_after, key_before, midpoint
 
 
 class PipelineStage(models.Model):
-    """Represents the different stages in the hiring pipeline"""
+    """
+    Represents a stage in a hiring pipeline.
+    
+    Stages without a board make up the default pipeline shared by every
+    board; a board with stages of its own uses those instead.
+    """
     STAGE_CHOICES = [
         ('profile_interest', 'Profile Interest'),
         ('resume_review', 'Resume Review'),
@@ -13,15 +21,30 @@ class PipelineStage(models.Model):
         ('rejected', 'Rejected'),
     ]
     
-    name = models.CharField(max_length=50, choices=STAGE_CHOICES, unique=True)
+    board = models.ForeignKey(
+        'KanbanBoard', on_delete=models.CASCADE, null=True, blank=True, related_name='stages',
+        help_text='Board this stage belongs to; empty for the default pipeline',
+    )
+    name = models.SlugField(max_length=50)
+    label = models.CharField(max_length=100, blank=True, help_text='Column title; defaults to the standard title for the name')
     order = models.PositiveIntegerField(default=0)
     color = models.CharField(max_length=7, default='#3498db', help_text='Hex color code for the stage')
     
     class Meta:
-        ordering = ['order']
+        ordering = ['order', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'name'], name='kanban_stage_board_name_uniq'),
+            models.UniqueConstraint(
+                fields=['name'], condition=models.Q(board__isnull=True), name='kanban_stage_default_name_uniq'
+            ),
+        ]
     
     def __str__(self):
-        return self.get_name_display()
+        return self.display_name
+    
+    @property
+    def display_name(self):
+        return self.label or dict(self.STAGE_CHOICES).get(self.name, self.name.replace('_', ' ').title())
     
     def save(self, *args, **kwargs):
         # Auto-assign order based on stage name if not set
@@ -41,6 +64,9 @@ class KanbanBoard(models.Model):
     """Represents a recruiter's kanban board"""
     recruiter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kanban_boards')
     name = models.CharField(max_length=100, default='My Hiring Pipeline')
+    revision = models.PositiveBigIntegerField(default=0, help_text='Incremented on every change to the board\'s cards')
+    compacted_revision = models.PositiveBigIntegerField(default=0, help_text='Change log entries up to this revision have been discarded')
+    rollup_cursor = models.PositiveBigIntegerField(default=0, help_text='Stage transitions up to this ID have been rolled up')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -56,31 +82,75 @@ class ProfileCard(models.Model):
     board = models.ForeignKey(KanbanBoard, on_delete=models.CASCADE, related_name='profile_cards')
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='kanban_cards')
     stage = models.ForeignKey(PipelineStage, on_delete=models.CASCADE, related_name='profile_cards')
-    position = models.PositiveIntegerField(default=0, help_text='Position within the stage')
+    position = models.CharField(max_length=255, default='', help_text='Lexicographic ordering key within the stage')
     notes = models.TextField(blank=True, help_text='Recruiter notes about this candidate')
+    notes_version = models.PositiveIntegerField(default=0, help_text='Incremented on every notes change, for optimistic concurrency')
+    flagged = models.BooleanField(default=False, help_text='Flagged for attention by a pipeline rule; cleared when the card moves')
     added_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['stage__order', 'position']
         unique_together = ['board', 'profile']  # A profile can only appear once per board
+        indexes = [
+            models.Index(fields=['board', 'stage', 'position'], name='kanban_card_column_idx'),
+            # Finds the cards idle in a stage for pipeline rules
+            models.Index(fields=['stage', 'updated_at'], name='kanban_card_stage_idle_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.profile.get_full_name()} in {self.stage.get_name_display()}"
-    
-    def move_to_stage(self, new_stage, new_position=None):
-        """Move this card to a new stage"""
-        if new_position is None:
-            # Get the next position in the new stage
-            last_card = ProfileCard.objects.filter(
-                board=self.board, 
-                stage=new_stage
-            ).order_by('-position').first()
-            new_position = (last_card.position + 1) if last_card else 0
+        return f"{self.profile.get_full_name()} in {self.stage.display_name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stage the card was loaded in, so saves can tell when it moves
+        instance._loaded_stage_id = instance.__dict__.get('stage_id')
+        return instance
+    
+    @classmethod
+    def first_position(cls, board, stage):
+        """Get a position key above every card currently in the stage"""
+        first = cls.objects.filter(board=board, stage=stage).order_by('position').values_list('position', flat=True).first()
+        return key_before(first) if first else key_after('')
+    
+    @classmethod
+    def last_position(cls, board, stage):
+        """Get a position key below every card currently in the stage"""
+        last = cls.objects.filter(board=board, stage=stage).order_by('-position').values_list('position', flat=True).first()
+        return key_after(last or '')
+    
+    def move_to_stage(self, new_stage, prev_card_id=None, next_card_id=None):
+        """
+        Move this card to a new stage, between two neighbouring cards.
+        
+        ``prev_card_id`` and ``next_card_id`` are the cards that should end up
+        directly above and below this one; with neither, the card is appended.
+        Only this card's row is written.
+        """
+        neighbours = dict(
+            ProfileCard.objects.filter(
+                board_id=self.board_id,
+                stage=new_stage,
+                id__in=[card_id for card_id in (prev_card_id, next_card_id) if card_id],
+            ).exclude(id=self.id).order_by().values_list('id', 'position')
+        )
+        prev_position = neighbours.get(prev_card_id)
+        next_position = neighbours.get(next_card_id)
+        
+        if prev_position is None and next_position is None:
+            new_position = ProfileCard.last_position(self.board_id, new_stage)
+        else:
+            try:
+                new_position = midpoint(prev_position or '', next_position)
+            except ValueError:
+                # Neighbours out of order (stale client view); keep the card next to the one above it
+                new_position = midpoint(prev_position or '', None)
         
         self.stage = new_stage
         self.position = new_position
-        self.save()
+        self.flagged = False
+        self.save(update_fields=['stage', 'position', 'flagged', 'updated_at'])
 
 
 class ProfileLike(models.Model):
@@ -93,4 +163,130 @@ class ProfileLike(models.Model):
         unique_together = ['recruiter', 'profile']  # A recruiter can only like a profile once
     
     def __str__(self):
-        return f"{self.recruiter.get_full_name()} likes {self.profile.get_full_name()}"
\ No newline at end of file
+        return f"{self.recruiter.get_full_name()} likes {self.profile.get_full_name()}"
+
+
+class NoteRevision(models.Model):
+    """
+    A past version of a card's notes, stored as a reverse diff.
+    
+    ``diff`` turns the notes as of ``version`` back into the notes before
+    the revision (see ``kanban.notes``), so only the current text is kept in
+    full. Rapid edits from one client share a single revision.
+    """
+    card = models.ForeignKey(ProfileCard, on_delete=models.CASCADE, related_name='note_revisions')
+    version = models.PositiveIntegerField()
+    diff = models.JSONField(default=list)
+    author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    client_id = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-version']
+        unique_together = ['card', 'version']
+    
+    def __str__(self):
+        return f"Notes version {self.version} of card {self.card_id}"
+
+
+class BoardChange(models.Model):
+    """Append-only log of card changes on a board, one entry per revision"""
+    board = models.ForeignKey(KanbanBoard, on_delete=models.CASCADE, related_name='changes')
+    revision = models.PositiveBigIntegerField()
+    card_id = models.PositiveBigIntegerField(null=True, blank=True, help_text='Empty for changes to a whole column')
+    event = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['revision']
+        unique_together = ['board', 'revision']
+    
+    def __str__(self):
+        return f"{self.event.get('type')} on board {self.board_id} at revision {self.revision}"
+
+
+class StageTransition(models.Model):
+    """
+    Append-only log of cards entering and leaving stages.
+    
+    Stages are stored as plain IDs so the history outlives deleted stages.
+    """
+    board = models.ForeignKey(KanbanBoard, on_delete=models.CASCADE, related_name='transitions')
+    card_id = models.PositiveBigIntegerField()
+    from_stage_id = models.PositiveBigIntegerField(null=True, help_text='Empty when the card was added to the board')
+    to_stage_id = models.PositiveBigIntegerField(null=True, help_text='Empty when the card was removed from the board')
+    at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['board', 'id'], name='kanban_transition_board_idx'),
+            models.Index(fields=['card_id', 'id'], name='kanban_transition_card_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Card {self.card_id}: {self.from_stage_id} -> {self.to_stage_id}"
+
+
+class StageFlowRollup(models.Model):
+    """Daily totals of transitions between two stages on a board, built from StageTransition"""
+    board = models.ForeignKey(KanbanBoard, on_delete=models.CASCADE, related_name='flow_rollups')
+    day = models.DateField()
+    from_stage_id = models.PositiveBigIntegerField(null=True)
+    to_stage_id = models.PositiveBigIntegerField(null=True)
+    count = models.PositiveIntegerField(default=0)
+    timed_count = models.PositiveIntegerField(default=0, help_text='Transitions whose time in the previous stage is known')
+    total_seconds = models.PositiveBigIntegerField(default=0)
+    histogram = models.JSONField(default=list, help_text='Time in the previous stage, counted per duration bucket')
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = ['board', 'day', 'from_stage_id', 'to_stage_id']
+    
+    def __str__(self):
+        return f"{self.count} transitions {self.from_stage_id} -> {self.to_stage_id} on {self.day}"
+
+
+class PipelineRule(models.Model):
+    """
+    Time-based automation for cards idle in a stage.
+    
+    Rules without a board apply to every board whose pipeline includes the
+    stage. They are run by the ``run_pipeline_rules`` command.
+    """
+    ACTION_CHOICES = [
+        ('move', 'Move to another stage'),
+        ('flag', 'Flag for attention'),
+    ]
+    
+    board = models.ForeignKey(
+        KanbanBoard, on_delete=models.CASCADE, null=True, blank=True, related_name='rules',
+        help_text='Board the rule applies to; empty for every board',
+    )
+    name = models.CharField(max_length=100)
+    stage = models.ForeignKey(PipelineStage, on_delete=models.CASCADE, related_name='rules')
+    idle_days = models.PositiveIntegerField(help_text='Days since the card was last changed')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    target_stage = models.ForeignKey(
+        PipelineStage, on_delete=models.CASCADE, null=True, blank=True, related_name='+',
+        help_text='Stage cards are moved to (move rules only)',
+    )
+    is_active = models.BooleanField(default=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_matched = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['stage__order', 'idle_days']
+    
+    def __str__(self):
+        return self.name
+    
+    def clean(self):
+        if self.action == 'move' and not self.target_stage_id:
+            raise ValidationError('Move rules need a target stage.')
+        if self.action == 'move' and self.target_stage_id == self.stage_id:
+            raise ValidationError('The target stage must differ from the stage.')
+        if self.target_stage_id and self.stage_id and self.target_stage.board_id != self.stage.board_id:
+            raise ValidationError('The target stage must be in the same pipeline as the stage.')
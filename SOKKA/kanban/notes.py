@@ -0,0 +1,139 @@
+"""
+Versioned card notes.
+
+Saving notes is a compare-and-swap on ``ProfileCard.notes_version``: the
+client sends the version its edit is based on, and the notes are only
+written (with a single UPDATE of the notes columns) if nobody has changed
+them since. Otherwise ``NotesConflict`` carries the current notes back to
+the client.
+
+Each change is kept as a ``NoteRevision`` holding a reverse diff, a list of
+``[start, end, text]`` edits that turn the newer text back into the older
+one. An autosaving editor sends a save every few keystrokes; successive saves
+from the same client within ``COALESCE_SECONDS`` update one revision instead
+of adding a revision each, and move that revision's entry in the board's
+change log up to the new board revision rather than appending another, so
+a coalesced save costs a handful of UPDATEs and adds no rows. Board events
+only carry the new notes version; clients that need the text fetch it.
+"""
+
+import datetime
+import difflib
+
+from django.db import transaction
+from django.utils import timezone
+
+from .board import board_change_superseded, board_changed
+from .models import NoteRevision, ProfileCard
+
+# Saves from one client this close together share a revision
+COALESCE_SECONDS = 60
+
+MAX_NOTES_LENGTH = 20000
+
+
+class NotesConflict(Exception):
+    """The notes changed since the version an edit was based on"""
+
+    def __init__(self, notes, version):
+        super().__init__('The notes were changed by someone else')
+        self.notes = notes
+        self.version = version
+
+
+def make_diff(new, old):
+    """Get the edits that turn ``new`` back into ``old``"""
+    matcher = difflib.SequenceMatcher(None, new, old, autojunk=False)
+    return [
+        [i1, i2, old[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+def apply_diff(text, diff):
+    """Apply edits made by ``make_diff`` to ``text``"""
+    for start, end, replacement in reversed(diff):
+        text = text[:start] + replacement + text[end:]
+    return text
+
+
+def save_notes(card, notes, base_version, author=None, client_id=''):
+    """
+    Replace a card's notes, if they are still at ``base_version``.
+
+    Returns the new notes version. Raises NotesConflict if the notes have
+    changed since ``base_version``.
+    """
+    with transaction.atomic():
+        # The latest revision comes with the card's current notes, saving a query per autosave
+        latest = NoteRevision.objects.filter(card_id=card.id).select_related('card').first()
+        if latest is not None:
+            current, version = latest.card.notes, latest.card.notes_version
+        else:
+            current, version = ProfileCard.objects.values_list('notes', 'notes_version').get(id=card.id)
+        if version != base_version:
+            raise NotesConflict(current, version)
+        if notes == current:
+            return version
+
+        updated = ProfileCard.objects.filter(id=card.id, notes_version=base_version).update(
+            notes=notes, notes_version=base_version + 1,
+        )
+        if not updated:
+            # Lost a race with another save of the same version
+            current, version = ProfileCard.objects.values_list('notes', 'notes_version').get(id=card.id)
+            raise NotesConflict(current, version)
+        version = base_version + 1
+        event = {
+            'type': 'card.notes_updated',
+            'card_id': card.id,
+            'notes_version': version,
+            'client_id': client_id,
+        }
+
+        recent = timezone.now() - datetime.timedelta(seconds=COALESCE_SECONDS)
+        if (
+            latest is not None and client_id and latest.client_id == client_id
+            and latest.author_id == getattr(author, 'id', None) and latest.updated_at >= recent
+            and latest.version == base_version
+        ):
+            # Fold this edit into the client's open revision: diff back to the text before it
+            before = apply_diff(current, latest.diff)
+            latest.diff = make_diff(notes, before)
+            latest.version = version
+            latest.save(update_fields=['diff', 'version', 'updated_at'])
+            # The change logged for the previous save is superseded by this one
+            board_change_superseded(card.board_id, event, {
+                'card_id': card.id, 'event__type': 'card.notes_updated', 'event__notes_version': base_version,
+            })
+        else:
+            NoteRevision.objects.create(
+                card_id=card.id, version=version, diff=make_diff(notes, current), author=author, client_id=client_id,
+            )
+            board_changed(card.board_id, [event])
+    return version
+
+
+def notes_history(card, limit=50):
+    """
+    Get a card's notes as of each of its latest revisions, newest first.
+
+    Texts are rebuilt by applying the reverse diffs to the current notes. When
+    every revision fits in ``limit``, the notes from before the first revision
+    come last, as version 0.
+    """
+    text = ProfileCard.objects.values_list('notes', flat=True).get(id=card.id)
+    revisions = list(NoteRevision.objects.filter(card_id=card.id).select_related('author')[:limit])
+    history = []
+    for revision in revisions:
+        history.append({
+            'version': revision.version,
+            'notes': text,
+            'author': (revision.author.get_full_name() or revision.author.username) if revision.author else None,
+            'saved_at': revision.updated_at.isoformat(),
+        })
+        text = apply_diff(text, revision.diff)
+    if len(revisions) < limit:
+        history.append({'version': 0, 'notes': text, 'author': None, 'saved_at': None})
+    return history
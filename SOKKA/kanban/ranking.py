@@ -0,0 +1,118 @@
+"""
+Lexicographic ordering keys for kanban cards.
+
+A card's ``position`` is a base-36 string and cards are ordered by plain
+string comparison. There is always a key between any two distinct keys, so
+moving a card between two others only ever rewrites the moved card. Keys
+never end in the smallest digit ('0'), which is what guarantees that a key
+can always be generated below an existing one.
+
+Repeated inserts at the same spot make keys grow slowly but without bound;
+``rebalance_positions`` rewrites long columns with short, evenly spaced keys.
+"""
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Columns with keys longer than this are due for rebalancing
+REBALANCE_LENGTH = 12
+
+
+def key_after(key):
+    """
+    Get a short key above ``key``, for appending to a column.
+    
+    Steps the first digit that can be incremented instead of halving the gap
+    to the top, so repeated appends only grow keys by one character every
+    35 or so inserts.
+    """
+    if not key:
+        return DIGITS[BASE // 2]
+    for i, char in enumerate(key):
+        if char != DIGITS[-1]:
+            return key[:i] + DIGITS[DIGITS.index(char) + 1]
+    return key + DIGITS[1]
+
+
+def key_before(key):
+    """Get a short key below ``key``, for prepending to a column"""
+    for i, char in enumerate(key):
+        digit = DIGITS.index(char)
+        if digit > 1:
+            return key[:i] + DIGITS[digit - 1]
+    return _bisect('', key)
+
+
+def midpoint(lower, upper):
+    """
+    Get a key strictly between ``lower`` and ``upper``.
+    
+    ``lower`` may be '' (no lower bound) and ``upper`` may be None (no upper
+    bound). Raises ValueError if the bounds are not strictly ordered.
+    """
+    if upper is None:
+        return key_after(lower)
+    if lower >= upper:
+        raise ValueError(f'{lower!r} is not below {upper!r}')
+    if not lower:
+        return key_before(upper)
+    return _bisect(lower, upper)
+
+
+def _bisect(lower, upper):
+    """Get the key halfway between ``lower`` and ``upper`` (None meaning no upper bound)"""
+    if upper is not None:
+        # Skip the common prefix, padding the lower key with zeros
+        prefix = 0
+        while prefix < len(upper) and (lower[prefix] if prefix < len(lower) else '0') == upper[prefix]:
+            prefix += 1
+        if prefix:
+            return upper[:prefix] + _bisect(lower[prefix:], upper[prefix:])
+    
+    lower_digit = DIGITS.index(lower[0]) if lower else 0
+    upper_digit = DIGITS.index(upper[0]) if upper is not None else BASE
+    if upper_digit - lower_digit > 1:
+        return DIGITS[(lower_digit + upper_digit) // 2]
+    if upper is not None and len(upper) > 1:
+        return upper[:1]
+    return DIGITS[lower_digit] + _bisect(lower[1:], None)
+
+
+def keys_between(lower, upper, count):
+    """
+    Get ``count`` ordered keys strictly between ``lower`` and ``upper``.
+    
+    Keys are spread over the gap rather than stepped one after another, so
+    they stay short however many are needed at once.
+    """
+    if count <= 0:
+        return []
+    if upper is None:
+        if not lower:
+            return spread_keys(count)
+        # Bisect up to the next step above ``lower``
+        upper = key_after(lower)
+        return keys_between(lower, upper, count - 1) + [upper]
+    if not lower:
+        lower = key_before(upper)
+        return [lower] + keys_between(lower, upper, count - 1)
+    middle = midpoint(lower, upper)
+    half = count // 2
+    return keys_between(lower, middle, half) + [middle] + keys_between(middle, upper, count - half - 1)
+
+
+def spread_keys(count):
+    """Get ``count`` short, evenly spaced keys, as used when rebalancing a column"""
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    step = BASE ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
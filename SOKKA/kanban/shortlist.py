@@ -0,0 +1,100 @@
+"""
+Shortlisting (liking) profiles onto a recruiter's board.
+
+Liking a profile records a ``ProfileLike`` and puts a card for it at the top
+of the board's first stage. Both operations work on many profiles at once,
+resolving the board and stage once and writing likes and cards with set-based
+statements, so shortlisting a whole page costs the same handful of queries
+as shortlisting one profile.
+"""
+
+from django.db import transaction
+
+from profiles.models import Profile
+from .analytics import record_transitions
+from .board import board_changed, card_event
+from .models import KanbanBoard, ProfileCard, ProfileLike
+from .ranking import keys_between
+from .stages import stage_registry
+
+# Upper bound on profiles handled by one bulk request
+MAX_BULK_PROFILES = 500
+
+
+def shortlist_profiles(recruiter, profile_ids):
+    """
+    Like profiles and add them to the recruiter's board.
+
+    Returns the IDs of the profiles that were newly liked; unknown profiles
+    and profiles that were already liked are skipped.
+    """
+    profile_ids = list(dict.fromkeys(profile_ids))
+    with transaction.atomic():
+        existing_profiles = set(Profile.objects.filter(id__in=profile_ids).values_list('id', flat=True))
+        already_liked = set(
+            ProfileLike.objects.filter(recruiter=recruiter, profile_id__in=profile_ids).values_list('profile_id', flat=True)
+        )
+        new_ids = [
+            profile_id for profile_id in profile_ids
+            if profile_id in existing_profiles and profile_id not in already_liked
+        ]
+        if not new_ids:
+            return []
+
+        ProfileLike.objects.bulk_create(
+            [ProfileLike(recruiter=recruiter, profile_id=profile_id) for profile_id in new_ids],
+            ignore_conflicts=True,
+        )
+
+        board, _ = KanbanBoard.objects.get_or_create(recruiter=recruiter)
+        first_stage = stage_registry.get_first_stage(board.id)
+        if first_stage:
+            on_board = set(
+                ProfileCard.objects.filter(board=board, profile_id__in=new_ids).values_list('profile_id', flat=True)
+            )
+            card_profile_ids = [profile_id for profile_id in new_ids if profile_id not in on_board]
+            top = ProfileCard.objects.filter(board=board, stage=first_stage).order_by('position').values_list(
+                'position', flat=True
+            ).first()
+            keys = keys_between('', top, len(card_profile_ids))
+            ProfileCard.objects.bulk_create(
+                [
+                    ProfileCard(board=board, profile_id=profile_id, stage=first_stage, position=key)
+                    for profile_id, key in zip(card_profile_ids, keys)
+                ],
+                ignore_conflicts=True,
+            )
+            # bulk_create skips signals, so record the new cards explicitly
+            cards = ProfileCard.objects.filter(board=board, profile_id__in=card_profile_ids).select_related('profile__user')
+            board_changed(board.id, [card_event('card.added', card) for card in cards])
+            record_transitions(board.id, [(card.id, None, card.stage_id) for card in cards])
+    return new_ids
+
+
+def unshortlist_profiles(recruiter, profile_ids):
+    """
+    Unlike profiles and remove their cards from the recruiter's board.
+
+    Returns the IDs of the profiles that were liked before.
+    """
+    profile_ids = list(dict.fromkeys(profile_ids))
+    with transaction.atomic():
+        liked = list(
+            ProfileLike.objects.filter(recruiter=recruiter, profile_id__in=profile_ids).values_list('profile_id', flat=True)
+        )
+        if not liked:
+            return []
+        ProfileLike.objects.filter(recruiter=recruiter, profile_id__in=liked).delete()
+
+        board = KanbanBoard.objects.filter(recruiter=recruiter).first()
+        if board:
+            card_stages = dict(ProfileCard.objects.filter(board=board, profile_id__in=liked).values_list('id', 'stage_id'))
+            if card_stages:
+                # Queryset deletes don't record board changes (see kanban.signals)
+                ProfileCard.objects.filter(id__in=card_stages).delete()
+                board_changed(board.id, [
+                    {'type': 'card.removed', 'card_id': card_id, 'stage_id': stage_id}
+                    for card_id, stage_id in card_stages.items()
+                ])
+                record_transitions(board.id, [(card_id, stage_id, None) for card_id, stage_id in card_stages.items()])
+    return liked
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from profiles.models import Profile
+from .analytics import record_transitions
+from .board import board_changed, card_event, invalidate_board
+from .models import KanbanBoard, PipelineStage, ProfileCard
+from .stages import invalidate_stages
+
+
+@receiver(post_save, sender=ProfileCard)
+def card_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Card saves are board changes; work out which kind from what was saved"""
+    if created:
+        event_type = 'card.added'
+    elif update_fields and set(update_fields) <= {'notes', 'notes_version', 'updated_at'}:
+        event_type = 'card.notes_updated'
+    else:
+        event_type = 'card.moved'
+    from_stage_id = None if created else getattr(instance, '_loaded_stage_id', None)
+    board_changed(instance.board_id, [card_event(event_type, instance, from_stage_id)])
+    
+    if created or from_stage_id is not None:
+        record_transitions(instance.board_id, [(instance.id, from_stage_id, instance.stage_id)])
+    instance._loaded_stage_id = instance.stage_id
+
+
+@receiver(post_delete, sender=ProfileCard)
+def card_deleted(sender, instance, origin=None, **kwargs):
+    # Nothing to record when the whole board is going away, and queryset
+    # deletes of cards record their changes in one go themselves
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model in (KanbanBoard, User) or isinstance(origin, QuerySet) and origin_model is ProfileCard:
+        return
+    board_changed(instance.board_id, [card_event('card.removed', instance)])
+    record_transitions(instance.board_id, [(instance.id, instance.stage_id, None)])
+
+
+@receiver(post_save, sender=Profile)
+def profile_changed(sender, instance, created, **kwargs):
+    """Cards show the candidate's name and headline, so refresh boards holding the profile"""
+    if created:
+        return
+    board_ids = ProfileCard.objects.filter(profile=instance).values_list('board_id', flat=True)
+    invalidate_board(*board_ids)
+
+
+@receiver(post_save, sender=PipelineStage)
+@receiver(post_delete, sender=PipelineStage)
+def stage_changed(sender, **kwargs):
+    """Make every process reload its stage registry"""
+    # Bump now so this connection sees the change, and again on commit so no
+    # other process keeps a copy it loaded before the change was visible
+    invalidate_stages()
+    transaction.on_commit(invalidate_stages)
@@ -0,0 +1,88 @@
+"""
+Process-wide registry of pipeline stages.
+
+Stages change rarely but are needed on every board load, like and move, so
+each process loads them all once and keeps them in memory. A version stamp
+in the shared cache tells processes when to reload: saving or deleting a
+stage bumps it (see ``kanban.signals``), and every lookup compares it with
+the version the process loaded. Lookups never hit the database unless the
+stamp has changed.
+
+A board uses its own stages if it has any, and the default pipeline (stages
+without a board) otherwise.
+"""
+
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .models import PipelineStage
+
+VERSION_CACHE_KEY = 'kanban:stages:version'
+
+
+class StageRegistry:
+    """In-memory index of every pipeline stage, reloaded when the version stamp changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_id = {}
+        self._by_board = {}
+
+    def _current_version(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            # First process up (or the cache was flushed): start a new version
+            cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def _load(self):
+        version = self._current_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            by_id = {}
+            by_board = {}
+            for stage in PipelineStage.objects.order_by('order', 'id'):
+                by_id[stage.id] = stage
+                by_board.setdefault(stage.board_id, []).append(stage)
+            self._by_id, self._by_board = by_id, by_board
+            self._version = version
+
+    @property
+    def version(self):
+        self._load()
+        return self._version
+
+    def get_stages(self, board_id=None):
+        """Get a board's stages in column order (the default pipeline for ``None``)"""
+        self._load()
+        return list(self._by_board.get(board_id) or self._by_board.get(None, []))
+
+    def get_stage(self, board_id, stage_id):
+        """Get one of a board's stages by ID, or None if the board doesn't use it"""
+        self._load()
+        stage = self._by_id.get(stage_id)
+        if stage is None:
+            return None
+        if stage.board_id == board_id or stage.board_id is None and board_id not in self._by_board:
+            return stage
+        return None
+
+    def get_first_stage(self, board_id):
+        """Get the stage new cards on a board start in, or None if there are no stages"""
+        stages = self.get_stages(board_id)
+        return stages[0] if stages else None
+
+
+def invalidate_stages():
+    """Make every process reload its stages on next use"""
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+stage_registry = StageRegistry()
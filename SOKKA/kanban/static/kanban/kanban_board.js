@@ -0,0 +1,887 @@
+// Kanban board: virtualized columns, drag and drop, filtering, notes and
+// live updates. The endpoint URLs come from the script tag's data attributes.
+const ENDPOINTS = document.currentScript.dataset;
+
+let draggedCard = null;
+let boardRevision = null;
+
+// Columns are virtualized: each keeps the cards it has loaded so far, in
+// order, and only the ones scrolled into view are in the DOM. Further
+// pages are fetched from the column endpoint as the column is scrolled.
+const COLUMN_URL = ENDPOINTS.columnUrl;
+const CARD_OVERSCAN = 8;
+const columns = {};
+const cardStages = new Map();
+const selectedCards = new Set();
+let cardHeight = 60;
+
+// Card IDs matching the board filter, and how many match per stage, while a filter is set
+let cardFilter = null;
+let filterTimer = null;
+
+// Notes autosave: edits are saved a moment after typing stops, against
+// the version they were made from; the server refuses a save if someone
+// else saved in between, and groups this editor's saves into one revision.
+const NOTES_URL = ENDPOINTS.notesUrl;
+const NOTES_SAVE_DELAY = 800;
+const notesClientId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+let notesEditor = null;
+
+document.addEventListener('DOMContentLoaded', function() {
+    initializeColumns();
+    initializeFilter();
+    initializeNotes();
+    connectBoardEvents();
+});
+
+function initializeColumns() {
+    document.querySelectorAll('.kanban-column').forEach(columnElement => {
+        const content = columnElement.querySelector('.column-content');
+        const column = {
+            stageId: columnElement.dataset.stageId,
+            element: columnElement,
+            content: content,
+            count: parseInt(columnElement.dataset.count, 10),
+            next: columnElement.dataset.nextAfterId ? {
+                after: columnElement.dataset.nextAfter,
+                after_id: columnElement.dataset.nextAfterId,
+            } : null,
+            loading: false,
+            items: [],
+            first: 0,
+            last: 0,
+        };
+        content.querySelectorAll('.profile-card').forEach(card => {
+            column.items.push({
+                id: card.dataset.cardId,
+                profile_id: card.dataset.profileId,
+                stage_id: column.stageId,
+                name: card.querySelector('.profile-name').textContent,
+                headline: card.querySelector('.profile-role').textContent,
+                position: card.dataset.position,
+                flagged: card.classList.contains('flagged'),
+            });
+            cardStages.set(card.dataset.cardId, column.stageId);
+        });
+        columns[column.stageId] = column;
+
+        // Make columns droppable
+        content.addEventListener('dragover', handleDragOver);
+        content.addEventListener('drop', handleDrop);
+        content.addEventListener('dragenter', handleDragEnter);
+        content.addEventListener('dragleave', handleDragLeave);
+        content.addEventListener('scroll', () => scheduleRender(column));
+    });
+
+    const sample = document.querySelector('.profile-card');
+    if (sample) {
+        // Flex gap between cards included
+        cardHeight = sample.getBoundingClientRect().height + 8;
+    }
+    Object.values(columns).forEach(renderColumn);
+}
+
+function scheduleRender(column) {
+    if (!column.renderPending) {
+        column.renderPending = true;
+        requestAnimationFrame(() => {
+            column.renderPending = false;
+            renderColumn(column);
+        });
+    }
+}
+
+function renderColumn(column) {
+    const content = column.content;
+    // Re-rendering the column a card is being dragged from would cancel the drag
+    if (draggedCard && content.contains(draggedCard)) {
+        return;
+    }
+    column.element.querySelector('.card-count').textContent = cardFilter ?
+        `${cardFilter.counts[column.stageId] || 0}/${column.count}` : column.count;
+
+    if (!column.items.length) {
+        column.first = column.last = 0;
+        if (column.next) {
+            content.replaceChildren();
+            loadNextPage(column);
+        } else {
+            content.innerHTML = '<div class="empty-column"><i class="fas fa-plus"></i> Drop profiles here</div>';
+        }
+        return;
+    }
+
+    const first = Math.max(0, Math.floor(content.scrollTop / cardHeight) - CARD_OVERSCAN);
+    const last = Math.min(column.items.length, Math.ceil((content.scrollTop + content.clientHeight) / cardHeight) + CARD_OVERSCAN);
+    const rendered = new Map([...content.querySelectorAll('.profile-card')].map(card => [card.dataset.cardId, card]));
+    const children = [createSpacer(first * cardHeight)];
+    for (let i = first; i < last; i++) {
+        const item = column.items[i];
+        children.push(updateCardElement(rendered.get(item.id) || createCardElement(item), item));
+    }
+    children.push(createSpacer((column.items.length - last) * cardHeight));
+    content.replaceChildren(...children);
+    column.first = first;
+    column.last = last;
+
+    if (column.next && last >= column.items.length - CARD_OVERSCAN) {
+        loadNextPage(column);
+    }
+}
+
+function createSpacer(height) {
+    const spacer = document.createElement('div');
+    spacer.className = 'column-spacer';
+    spacer.style.height = `${height}px`;
+    return spacer;
+}
+
+function loadNextPage(column) {
+    if (column.loading || !column.next) {
+        return;
+    }
+    column.loading = true;
+    const cursor = new URLSearchParams(column.next);
+    fetch(`${columnUrl(column)}?${cursor}`)
+        .then(response => response.json())
+        .then(data => {
+            data.cards.forEach(card => {
+                // Cards already placed from live updates are skipped
+                if (!cardStages.has(String(card.id))) {
+                    column.items.push(normalizeCard(card));
+                    cardStages.set(String(card.id), column.stageId);
+                }
+            });
+            column.next = data.next;
+            column.count = data.count;
+        })
+        .catch(error => console.error('Error loading cards:', error))
+        .finally(() => {
+            column.loading = false;
+            scheduleRender(column);
+        });
+}
+
+function reloadColumn(column) {
+    // Refetch everything loaded so far, e.g. when an unloaded card moved into view
+    const limit = Math.min(Math.max(column.items.length, 1), 500);
+    fetch(`${columnUrl(column)}?limit=${limit}`)
+        .then(response => response.json())
+        .then(data => {
+            column.items.forEach(item => cardStages.delete(item.id));
+            column.items = data.cards.map(normalizeCard);
+            column.items.forEach(item => cardStages.set(item.id, column.stageId));
+            column.next = data.next;
+            column.count = data.count;
+            scheduleRender(column);
+        })
+        .catch(error => console.error('Error loading cards:', error));
+}
+
+function columnUrl(column) {
+    return COLUMN_URL.replace('/0/', `/${column.stageId}/`);
+}
+
+function normalizeCard(card) {
+    return Object.assign({}, card, {id: String(card.id), stage_id: String(card.stage_id)});
+}
+
+function compareCards(a, b) {
+    // Position keys sort as plain strings; ties are broken by card ID
+    if (a.position !== b.position) {
+        return a.position < b.position ? -1 : 1;
+    }
+    return parseInt(a.id, 10) - parseInt(b.id, 10);
+}
+
+function findItem(cardId) {
+    const column = columns[cardStages.get(String(cardId))];
+    return column ? column.items.find(item => item.id === String(cardId)) : null;
+}
+
+function removeItem(cardId) {
+    // Take a loaded card out of its column, returning it
+    const column = columns[cardStages.get(String(cardId))];
+    if (!column) {
+        return null;
+    }
+    const index = column.items.findIndex(item => item.id === String(cardId));
+    if (index === -1) {
+        return null;
+    }
+    const [item] = column.items.splice(index, 1);
+    cardStages.delete(String(cardId));
+    column.count -= 1;
+    scheduleRender(column);
+    return item;
+}
+
+function isLoaded(column, item) {
+    // Whether a card sorts within the part of the column loaded so far
+    return !column.next || compareCards(item, {position: column.next.after, id: column.next.after_id}) <= 0;
+}
+
+function placeItem(column, item) {
+    // Insert a card in order, unless it belongs to a page not loaded yet
+    column.count += 1;
+    scheduleRender(column);
+    if (!isLoaded(column, item)) {
+        return false;
+    }
+    let index = column.items.findIndex(other => compareCards(item, other) < 0);
+    column.items.splice(index === -1 ? column.items.length : index, 0, item);
+    cardStages.set(item.id, column.stageId);
+    return true;
+}
+
+function upsertCard(card) {
+    // The payload is the card's current state: nothing is kept from the old copy (e.g. its notes)
+    removeItem(card.id);
+    const item = normalizeCard(card);
+    const column = columns[item.stage_id];
+    if (!column) {
+        // The card went to a stage this page doesn't show (the pipeline changed)
+        window.location.reload();
+        return;
+    }
+    placeItem(column, item);
+}
+
+function createCardElement(item) {
+    const card = document.createElement('div');
+    card.className = 'profile-card';
+    card.draggable = true;
+    card.dataset.cardId = item.id;
+    card.innerHTML = '<div class="drag-handle">⋮⋮</div><div class="profile-name"></div><div class="profile-role"></div>';
+    card.addEventListener('dragstart', handleDragStart);
+    card.addEventListener('dragend', handleDragEnd);
+    card.addEventListener('drag', handleDrag);
+    card.addEventListener('click', handleCardClick);
+    return card;
+}
+
+function updateCardElement(card, item) {
+    card.dataset.profileId = item.profile_id;
+    card.dataset.position = item.position;
+    card.querySelector('.profile-name').textContent = item.name;
+    card.querySelector('.profile-role').textContent = item.headline;
+    card.title = item.notes || '';
+    card.classList.toggle('selected', selectedCards.has(item.id));
+    card.classList.toggle('flagged', Boolean(item.flagged));
+    card.classList.toggle('filtered-out', cardFilter !== null && !cardFilter.ids.has(item.id));
+    return card;
+}
+
+function initializeFilter() {
+    const form = document.getElementById('board-filter');
+    form.querySelectorAll('input, select').forEach(input => {
+        input.addEventListener('input', scheduleFilter);
+    });
+    document.getElementById('clear-filter').addEventListener('click', () => {
+        form.reset();
+        applyFilter();
+    });
+}
+
+function scheduleFilter() {
+    clearTimeout(filterTimer);
+    filterTimer = setTimeout(applyFilter, 300);
+}
+
+function applyFilter() {
+    const form = document.getElementById('board-filter');
+    const summary = form.querySelector('.filter-summary');
+    const skill = form.elements.skill.value.trim();
+    const text = form.elements.q.value.trim();
+    if (!skill && !text) {
+        cardFilter = null;
+        summary.textContent = '';
+        Object.values(columns).forEach(scheduleRender);
+        return;
+    }
+
+    const params = new URLSearchParams({q: text, level: form.elements.level.value});
+    if (skill) {
+        params.append('skill', skill);
+    }
+    fetch(`${ENDPOINTS.filterUrl}?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status !== 'success') {
+                summary.textContent = data.message;
+                return;
+            }
+            const ids = new Set();
+            const counts = {};
+            Object.entries(data.stages).forEach(([stageId, cardIds]) => {
+                cardIds.forEach(cardId => ids.add(String(cardId)));
+                counts[stageId] = cardIds.length;
+            });
+            cardFilter = {ids: ids, counts: counts};
+            summary.textContent = `${data.count} matching candidate${data.count === 1 ? '' : 's'}`;
+            Object.values(columns).forEach(scheduleRender);
+        })
+        .catch(error => console.error('Error filtering board:', error));
+}
+
+function handleCardClick(e) {
+    // Ctrl/Cmd/Shift-click toggles a card in the multi-card selection
+    if (e.ctrlKey || e.metaKey || e.shiftKey) {
+        const cardId = this.dataset.cardId;
+        if (selectedCards.has(cardId)) {
+            selectedCards.delete(cardId);
+        } else {
+            selectedCards.add(cardId);
+        }
+        this.classList.toggle('selected', selectedCards.has(cardId));
+    } else {
+        openNotes(this.dataset.cardId);
+    }
+}
+
+function notesUrl(cardId) {
+    return NOTES_URL.replace('/0/', `/${cardId}/`);
+}
+
+function initializeNotes() {
+    const text = document.getElementById('notes-text');
+    text.addEventListener('input', scheduleNotesSave);
+    text.addEventListener('blur', () => notesEditor && saveNotes());
+    document.getElementById('close-notes').addEventListener('click', closeNotes);
+    document.getElementById('notes-load-theirs').addEventListener('click', () => {
+        const conflict = notesEditor.conflict;
+        notesEditor.conflict = null;
+        notesEditor.version = conflict.version;
+        notesEditor.saved = conflict.notes;
+        text.value = conflict.notes;
+        showNotesState();
+    });
+    document.getElementById('notes-keep-mine').addEventListener('click', () => {
+        // Save this text over theirs
+        notesEditor.version = notesEditor.conflict.version;
+        notesEditor.conflict = null;
+        saveNotes();
+    });
+}
+
+function openNotes(cardId) {
+    if (notesEditor) {
+        if (notesEditor.cardId === cardId) {
+            return;
+        }
+        saveNotes();
+    }
+    const item = findItem(cardId);
+    const panel = document.getElementById('notes-panel');
+    const text = document.getElementById('notes-text');
+    notesEditor = {cardId: cardId, version: null, saved: '', saving: false, timer: null, conflict: null};
+    panel.querySelector('.notes-title').textContent = item ? item.name : '';
+    text.value = '';
+    text.disabled = true;
+    panel.hidden = false;
+    showNotesState('Loading…');
+    const editor = notesEditor;
+    fetch(notesUrl(cardId))
+        .then(response => response.json())
+        .then(data => {
+            if (notesEditor !== editor) {
+                return;
+            }
+            editor.version = data.version;
+            editor.saved = data.notes;
+            text.value = data.notes;
+            text.disabled = false;
+            text.focus();
+            showNotesState();
+        })
+        .catch(error => console.error('Error loading notes:', error));
+}
+
+function closeNotes() {
+    if (notesEditor) {
+        saveNotes();
+    }
+    notesEditor = null;
+    document.getElementById('notes-panel').hidden = true;
+}
+
+function scheduleNotesSave() {
+    clearTimeout(notesEditor.timer);
+    showNotesState('Unsaved changes');
+    notesEditor.timer = setTimeout(saveNotes, NOTES_SAVE_DELAY);
+}
+
+function saveNotes() {
+    const editor = notesEditor;
+    clearTimeout(editor.timer);
+    // One save in flight per editor: a save finishing checks for newer edits
+    if (editor.saving || editor.conflict || editor.version === null) {
+        return;
+    }
+    const notes = document.getElementById('notes-text').value;
+    if (notes === editor.saved) {
+        return;
+    }
+    editor.saving = true;
+    showNotesState('Saving…');
+    fetch(notesUrl(editor.cardId), {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({notes: notes, version: editor.version, client_id: notesClientId})
+    })
+    .then(response => response.json())
+    .then(data => {
+        editor.saving = false;
+        if (data.status === 'success') {
+            editor.version = data.version;
+            editor.saved = notes;
+            setItemNotes(editor.cardId, notes);
+            if (editor.conflict && editor.conflict.version <= data.version) {
+                editor.conflict = null;
+            }
+        } else if (data.status === 'conflict') {
+            editor.conflict = {notes: data.notes, version: data.version};
+        } else {
+            console.error('Error saving notes:', data.message);
+        }
+        if (notesEditor !== editor) {
+            return;
+        }
+        showNotesState();
+        if (!editor.conflict && document.getElementById('notes-text').value !== editor.saved) {
+            scheduleNotesSave();
+        }
+    })
+    .catch(error => {
+        editor.saving = false;
+        console.error('Error:', error);
+        if (notesEditor === editor) {
+            scheduleNotesSave();
+        }
+    });
+}
+
+function showNotesState(message) {
+    const editor = notesEditor;
+    document.getElementById('notes-conflict').hidden = !editor.conflict;
+    if (message === undefined) {
+        const unsaved = document.getElementById('notes-text').value !== editor.saved;
+        message = unsaved ? 'Unsaved changes' : 'Saved';
+    }
+    document.querySelector('#notes-panel .notes-status').textContent = message;
+}
+
+function setItemNotes(cardId, notes) {
+    const item = findItem(cardId);
+    if (item) {
+        item.notes = notes;
+        const card = document.querySelector(`.profile-card[data-card-id="${cardId}"]`);
+        if (card) {
+            card.title = notes;
+        }
+    }
+}
+
+function clearSelection() {
+    selectedCards.clear();
+    document.querySelectorAll('.profile-card.selected').forEach(card => {
+        card.classList.remove('selected');
+    });
+}
+
+function selectedCardIds() {
+    // Selected cards in board order
+    const ids = [];
+    Object.values(columns).forEach(column => {
+        column.items.forEach(item => {
+            if (selectedCards.has(item.id)) {
+                ids.push(item.id);
+            }
+        });
+    });
+    return ids;
+}
+
+function handleDragStart(e) {
+    // Dragging an unselected card drags just that card
+    if (!selectedCards.has(this.dataset.cardId)) {
+        clearSelection();
+    }
+    draggedCard = this;
+    this.classList.add('dragging');
+    e.dataTransfer.effectAllowed = 'move';
+    e.dataTransfer.setData('text/plain', this.dataset.cardId);
+
+    // Add a slight delay to make the drag effect more visible
+    setTimeout(() => {
+        this.style.opacity = '0.5';
+    }, 0);
+}
+
+function handleDrag(e) {
+    // Update drag effect during drag
+    e.dataTransfer.dropEffect = 'move';
+}
+
+function handleDragEnd(e) {
+    endDrag(this);
+}
+
+function endDrag(card) {
+    card.classList.remove('dragging');
+    card.style.opacity = '1';
+    draggedCard = null;
+
+    // Remove all drag-over classes
+    document.querySelectorAll('.drag-over').forEach(el => {
+        el.classList.remove('drag-over');
+    });
+    Object.values(columns).forEach(scheduleRender);
+}
+
+function handleDragOver(e) {
+    e.preventDefault();
+    e.dataTransfer.dropEffect = 'move';
+    return false;
+}
+
+function handleDragEnter(e) {
+    e.preventDefault();
+    this.classList.add('drag-over');
+
+    // Add visual feedback
+    const column = this.closest('.kanban-column');
+    if (column) {
+        column.classList.add('drag-target');
+    }
+}
+
+function handleDragLeave(e) {
+    // Only remove drag-over if we're actually leaving the column
+    if (!this.contains(e.relatedTarget)) {
+        this.classList.remove('drag-over');
+
+        const column = this.closest('.kanban-column');
+        if (column) {
+            column.classList.remove('drag-target');
+        }
+    }
+}
+
+function handleDrop(e) {
+    e.preventDefault();
+    e.stopPropagation();
+
+    this.classList.remove('drag-over');
+    const columnElement = this.closest('.kanban-column');
+    columnElement.classList.remove('drag-target');
+    if (!draggedCard) {
+        return false;
+    }
+
+    const target = columns[columnElement.dataset.stageId];
+    const draggedId = draggedCard.dataset.cardId;
+    const movingIds = selectedCards.has(draggedId) ? selectedCardIds() : [draggedId];
+    const moving = new Set(movingIds);
+
+    // The card the drop lands in front of: the rendered card under the
+    // cursor, or else the first card past the rendered ones
+    const below = getCardBelow(this, e.clientY);
+    const rest = target.items.slice(target.last).find(item => !moving.has(item.id));
+    const nextId = below ? below.dataset.cardId : (rest ? rest.id : null);
+    const remaining = target.items.filter(item => !moving.has(item.id));
+    const index = nextId ? remaining.findIndex(item => item.id === nextId) : remaining.length;
+    // Dropped below everything loaded in a column with more to load: append at its real end
+    const toEnd = !nextId && target.next;
+    const prevId = index > 0 && !toEnd ? remaining[index - 1].id : null;
+
+    endDrag(draggedCard);
+    const movedItems = movingIds.map(removeItem).filter(Boolean);
+    movedItems.forEach(item => {
+        item.stage_id = target.stageId;
+        item.flagged = false;
+    });
+    target.count += movedItems.length;
+    if (!toEnd) {
+        target.items.splice(index, 0, ...movedItems);
+        movedItems.forEach(item => cardStages.set(item.id, target.stageId));
+    }
+    scheduleRender(target);
+
+    // Update the position in the database
+    if (movingIds.length > 1) {
+        updateCardPositions(movingIds, target.stageId, prevId, nextId);
+        clearSelection();
+    } else {
+        updateCardPosition(draggedId, target.stageId, prevId, nextId);
+    }
+
+    // Show success feedback
+    showDragSuccess();
+    return false;
+}
+
+function getCardBelow(column, y) {
+    // First card whose vertical midpoint is below the cursor
+    const cards = [...column.querySelectorAll('.profile-card:not(.dragging):not(.selected)')];
+    return cards.find(card => {
+        const box = card.getBoundingClientRect();
+        return y < box.top + box.height / 2;
+    }) || null;
+}
+
+function showDragSuccess() {
+    // Create a temporary success indicator
+    const success = document.createElement('div');
+    success.style.cssText = `
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        background: #61bd4f;
+        color: white;
+        padding: 12px 20px;
+        border-radius: 6px;
+        font-size: 14px;
+        z-index: 9999;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.15);
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    `;
+    success.textContent = 'Profile moved successfully!';
+    document.body.appendChild(success);
+
+    setTimeout(() => {
+        success.remove();
+    }, 2000);
+}
+
+function updateCardPosition(cardId, newStageId, prevCardId, nextCardId) {
+    fetch(ENDPOINTS.moveCardUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({
+            card_id: cardId,
+            new_stage_id: newStageId,
+            prev_card_id: prevCardId,
+            next_card_id: nextCardId
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status !== 'success') {
+            console.error('Error moving card:', data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+}
+
+function updateCardPositions(cardIds, newStageId, prevCardId, nextCardId) {
+    fetch(ENDPOINTS.moveCardsUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({
+            card_ids: cardIds,
+            new_stage_id: newStageId,
+            prev_card_id: prevCardId,
+            next_card_id: nextCardId
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status !== 'success') {
+            console.error('Error moving cards:', data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+}
+
+// Live updates: apply changes made in other tabs or by other recruiters.
+// The events URL is only given when the server can stream events (ASGI);
+// otherwise the board polls the change log.
+const BOARD_POLL_INTERVAL = 10000;
+let boardPollTimer = null;
+
+function connectBoardEvents() {
+    boardRevision = parseInt(document.querySelector('.kanban-container').dataset.revision, 10);
+    if (!ENDPOINTS.eventsUrl || !window.EventSource) {
+        pollBoardChanges();
+        return;
+    }
+    const source = new EventSource(ENDPOINTS.eventsUrl);
+    const handlers = {
+        'card.added': applyCardAdded,
+        'card.moved': applyCardMoved,
+        'card.removed': applyCardRemoved,
+        'card.notes_updated': applyNotesUpdated,
+        'card.flagged': applyCardFlagged,
+        'column.rebalanced': applyColumnRebalanced,
+    };
+    Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, e => {
+            const event = JSON.parse(e.data);
+            handler(event);
+            boardRevision = Math.max(boardRevision, event.revision);
+            if (cardFilter) {
+                // The change may affect which cards match
+                scheduleFilter();
+            }
+        });
+    });
+    // Every (re)connection may have missed events: catch up from the change log
+    source.addEventListener('open', syncChanges);
+    source.addEventListener('resync', syncChanges);
+    source.addEventListener('error', () => {
+        // Closed for good (e.g. the server answered 204): fall back to polling
+        if (source.readyState === EventSource.CLOSED) {
+            pollBoardChanges();
+        }
+    });
+}
+
+function pollBoardChanges() {
+    if (boardPollTimer === null) {
+        boardPollTimer = setInterval(() => {
+            if (!document.hidden) {
+                syncChanges();
+            }
+        }, BOARD_POLL_INTERVAL);
+    }
+}
+
+function syncChanges() {
+    fetch(`${ENDPOINTS.changesUrl}?since=${boardRevision}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.type === 'snapshot') {
+                // Too far behind for a delta
+                window.location.reload();
+                return;
+            }
+            data.cards.forEach(upsertCard);
+            data.removed.forEach(cardId => removeItem(cardId));
+            data.columns.forEach(stageId => applyColumnRebalanced({stage_id: stageId}));
+            // Cards outside the loaded pages may have changed too
+            Object.values(columns).forEach(column => {
+                column.count = data.counts[column.stageId] || 0;
+                scheduleRender(column);
+            });
+            boardRevision = Math.max(boardRevision, data.revision);
+        })
+        .catch(error => console.error('Error syncing board:', error));
+}
+
+function applyCardAdded(event) {
+    if (!findItem(event.card.id)) {
+        upsertCard(event.card);
+    }
+}
+
+function applyCardMoved(event) {
+    if (draggedCard && draggedCard.dataset.cardId === String(event.card_id)) {
+        return;
+    }
+    const item = findItem(event.card_id);
+    if (item) {
+        upsertCard(Object.assign({}, item, {stage_id: event.stage_id, position: event.position, flagged: false}));
+        return;
+    }
+    // A card this page hasn't loaded: keep the counts right, and load it if it lands in view
+    const from = columns[event.from_stage_id];
+    if (from) {
+        from.count -= 1;
+        scheduleRender(from);
+    }
+    const target = columns[event.stage_id];
+    if (!target) {
+        window.location.reload();
+        return;
+    }
+    target.count += 1;
+    scheduleRender(target);
+    if (isLoaded(target, {id: String(event.card_id), position: event.position})) {
+        reloadColumn(target);
+    }
+}
+
+function applyCardRemoved(event) {
+    if (!removeItem(event.card_id) && columns[event.stage_id]) {
+        columns[event.stage_id].count -= 1;
+        scheduleRender(columns[event.stage_id]);
+    }
+}
+
+function applyNotesUpdated(event) {
+    const editor = notesEditor;
+    if (event.client_id === notesClientId) {
+        return;
+    }
+    if (!editor || editor.cardId !== String(event.card_id)) {
+        // Events don't carry the text; drop the stale copy until the notes are opened
+        setItemNotes(event.card_id, '');
+        return;
+    }
+    if (editor.version === null || event.notes_version <= editor.version) {
+        return;
+    }
+    fetch(notesUrl(editor.cardId))
+        .then(response => response.json())
+        .then(data => {
+            if (notesEditor !== editor || data.version <= editor.version) {
+                return;
+            }
+            setItemNotes(editor.cardId, data.notes);
+            if (!editor.saving && document.getElementById('notes-text').value === editor.saved) {
+                // Nothing unsaved here: just show their version
+                editor.version = data.version;
+                editor.saved = data.notes;
+                document.getElementById('notes-text').value = data.notes;
+            } else {
+                editor.conflict = {notes: data.notes, version: data.version};
+            }
+            showNotesState();
+        })
+        .catch(error => console.error('Error loading notes:', error));
+}
+
+function applyColumnRebalanced(event) {
+    // Every position key in the column changed: refetch the cards loaded so far
+    const column = columns[event.stage_id];
+    if (column) {
+        reloadColumn(column);
+    }
+}
+
+function applyCardFlagged(event) {
+    const item = findItem(event.card_id);
+    if (item) {
+        item.flagged = event.flagged;
+        scheduleRender(columns[item.stage_id]);
+    }
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
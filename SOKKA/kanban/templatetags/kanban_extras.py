@@ -1,8 +0,0 @@
-from django import template
-
-register = template.Library()
-
-@register.filter
-def lookup(dictionary, key):
-    """Look up a key in a dictionary"""
-    return dictionary.get(key, [])
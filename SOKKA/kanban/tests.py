@@ -1,3 +1,424 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from profiles.models import Profile
+from . import automation
+from .analytics import duration_bucket, funnel_report, histogram_percentile, record_transitions, rollup_board
+from .board import board_changed, card_event, get_changes_since, rebalance_column
+from .models import (
+    BoardChange, KanbanBoard, NoteRevision, PipelineRule, PipelineStage, ProfileCard, StageFlowRollup, StageTransition,
+)
+from .notes import NotesConflict, notes_history, save_notes
+from .ranking import REBALANCE_LENGTH, key_after, key_before, keys_between, midpoint, spread_keys
+from .shortlist import shortlist_profiles
+from .stages import invalidate_stages, stage_registry
+
+
+class PositionKeyTests(TestCase):
+    """Position keys order cards by plain string comparison"""
+
+    def test_midpoint_is_strictly_between(self):
+        for lower, upper in [('', 'i'), ('i', 'j'), ('i', 'i1'), ('az', 'b'), ('1', '2'), ('', '01')]:
+            key = midpoint(lower, upper)
+            self.assertLess(lower, key)
+            self.assertLess(key, upper)
+            self.assertFalse(key.endswith('0'))
+
+    def test_midpoint_refuses_unordered_bounds(self):
+        with self.assertRaises(ValueError):
+            midpoint('j', 'i')
+
+    def test_repeated_inserts_keep_order(self):
+        # Always insert just below the top card, the worst case for key growth
+        keys = [key_after('')]
+        for _ in range(200):
+            keys.insert(0, key_before(keys[0]))
+        for _ in range(200):
+            keys.insert(1, midpoint(keys[0], keys[1]))
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_keys_between(self):
+        keys = keys_between('a', 'b', 100)
+        self.assertEqual(len(keys), 100)
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertTrue(all('a' < key < 'b' for key in keys))
+        self.assertEqual(keys_between('x', None, 3), sorted(keys_between('x', None, 3)))
+
+    def test_spread_keys_are_short_and_ordered(self):
+        keys = spread_keys(1000)
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertLessEqual(max(map(len, keys)), 2)
+
+
+class BoardTestCase(TestCase):
+    """A recruiter's board with a column of shortlisted profiles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        invalidate_stages()
+        call_command('populate_stages', verbosity=0, stdout=io.StringIO())
+        cls.recruiter = User.objects.create_user('recruiter', password='secret')
+        cls.profiles = Profile.objects.bulk_create([Profile(headline=f'Engineer {i}', first_name='Sam') for i in range(6)])
+        shortlist_profiles(cls.recruiter, [profile.id for profile in cls.profiles])
+        cls.board = KanbanBoard.objects.get(recruiter=cls.recruiter)
+        cls.stages = stage_registry.get_stages(cls.board.id)
+
+    def setUp(self):
+        self.client.force_login(self.recruiter)
+
+    def revision(self):
+        return KanbanBoard.objects.get(id=self.board.id).revision
+
+    def column(self, stage):
+        return list(ProfileCard.objects.filter(board=self.board, stage=stage).order_by('position', 'id').values_list('id', flat=True))
+
+
+class RebalanceEventTests(BoardTestCase):
+
+    def test_rebalance_logs_one_column_event(self):
+        stage = self.stages[0]
+        revision = self.revision()
+        rebalance_column(self.board.id, stage.id)
+        self.assertEqual(self.revision(), revision + 1)
+        [change] = BoardChange.objects.filter(board=self.board, revision__gt=revision)
+        self.assertEqual((change.card_id, change.event['type']), (None, 'column.rebalanced'))
+
+        delta = get_changes_since(self.board, revision)
+        self.assertEqual((delta['type'], delta['cards'], delta['columns']), ('delta', [], [stage.id]))
+
+
+class RebalanceTests(BoardTestCase):
+
+    def test_rebalance_keeps_order_and_shortens_keys(self):
+        stage = self.stages[0]
+        cards = list(ProfileCard.objects.filter(board=self.board, stage=stage).order_by('position', 'id'))
+        # Crowd the column into long keys, as many inserts at one spot would
+        key = 'i'
+        for card in cards:
+            key = key + 'z' * REBALANCE_LENGTH + '1'
+            card.position = key
+        ProfileCard.objects.bulk_update(cards, ['position'])
+        order = self.column(stage)
+
+        self.assertEqual(rebalance_column(self.board.id, stage.id), len(cards))
+        self.assertEqual(self.column(stage), order)
+        positions = ProfileCard.objects.filter(board=self.board, stage=stage).values_list('position', flat=True)
+        self.assertTrue(all(len(position) <= 2 for position in positions))
+
+
+class MoveCardTests(BoardTestCase):
+
+    def move(self, data, client=None, **headers):
+        return (client or self.client).post(
+            reverse('kanban:move_card'), json.dumps(data), content_type='application/json', headers=headers,
+        )
+
+    def test_moves_card_between_neighbours_writing_only_that_card(self):
+        source, target = self.stages[0], self.stages[1]
+        first, second, third = self.column(source)[:3]
+        self.move({'card_id': first, 'new_stage_id': target.id})
+        self.move({'card_id': second, 'new_stage_id': target.id})
+        positions = dict(ProfileCard.objects.values_list('id', 'position'))
+        response = self.move({'card_id': third, 'new_stage_id': target.id, 'prev_card_id': first, 'next_card_id': second})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column(target), [first, third, second])
+        moved = {card_id for card_id, position in ProfileCard.objects.values_list('id', 'position') if positions[card_id] != position}
+        self.assertEqual(moved, {third})
+
+    def test_rejects_invalid_and_foreign_cards(self):
+        card = self.column(self.stages[0])[0]
+        self.assertEqual(self.move({'card_id': card, 'new_stage_id': 'x'}).status_code, 400)
+        other = User.objects.create_user('other')
+        shortlist_profiles(other, [self.profiles[0].id])
+        foreign = ProfileCard.objects.get(board__recruiter=other).id
+        self.assertEqual(self.move({'card_id': foreign, 'new_stage_id': self.stages[1].id}).status_code, 404)
+
+    def test_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.recruiter)
+        data = {'card_id': self.column(self.stages[0])[0], 'new_stage_id': self.stages[1].id}
+        self.assertEqual(self.move(data, client=client).status_code, 403)
+        client.get(reverse('kanban:kanban_board'))
+        self.assertEqual(self.move(data, client=client, X_CSRFToken=client.cookies['csrftoken'].value).status_code, 200)
+
+
+class BatchMoveTests(BoardTestCase):
+
+    def move(self, card_ids, stage, client=None, headers=None, **neighbours):
+        return (client or self.client).post(
+            reverse('kanban:move_cards'),
+            json.dumps({'card_ids': card_ids, 'new_stage_id': stage.id, **neighbours}),
+            content_type='application/json',
+            headers=headers,
+        )
+
+    def test_moves_cards_in_the_given_order(self):
+        source, target = self.stages[0], self.stages[1]
+        moved = self.column(source)[:3][::-1]
+        response = self.move(moved, target)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column(target), moved)
+        self.assertEqual(response.json()['revision'], self.revision())
+        self.assertEqual(BoardChange.objects.filter(board=self.board, event__type='card.moved').count(), 3)
+
+    def test_moves_cards_between_neighbours(self):
+        source, target = self.stages[0], self.stages[1]
+        first, second, *rest = self.column(source)
+        self.move([first, second], target)
+        response = self.move(rest[:2], target, prev_card_id=first, next_card_id=second)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column(target), [first, *rest[:2], second])
+
+    def test_rejects_cards_of_another_board(self):
+        other = User.objects.create_user('other')
+        shortlist_profiles(other, [self.profiles[0].id])
+        foreign = ProfileCard.objects.get(board__recruiter=other).id
+        own = self.column(self.stages[0])[0]
+        response = self.move([own, foreign], self.stages[1])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(ProfileCard.objects.get(id=own).stage_id, self.stages[0].id)
+
+    def test_rejects_malformed_requests(self):
+        self.assertEqual(self.move([], self.stages[1]).status_code, 400)
+        self.assertEqual(self.move(['x'], self.stages[1]).status_code, 400)
+
+    def test_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.recruiter)
+        card = self.column(self.stages[0])[0]
+        self.assertEqual(self.move([card], self.stages[1], client=client).status_code, 403)
+        client.get(reverse('kanban:kanban_board'))
+        response = self.move([card], self.stages[1], client=client, headers={'X-CSRFToken': client.cookies['csrftoken'].value})
+        self.assertEqual(response.status_code, 200)
+
+
+class DeltaSyncTests(BoardTestCase):
+
+    def changes(self, since):
+        return self.client.get(reverse('kanban:board_changes'), {'since': since}).json()
+
+    def test_delta_has_only_changed_and_removed_cards(self):
+        revision = self.revision()
+        moved, removed, *untouched = self.column(self.stages[0])
+        ProfileCard.objects.get(id=moved).move_to_stage(self.stages[1])
+        ProfileCard.objects.get(id=removed).delete()
+
+        delta = self.changes(revision)
+        self.assertEqual(delta['type'], 'delta')
+        self.assertEqual([card['id'] for card in delta['cards']], [moved])
+        self.assertEqual(delta['cards'][0]['stage_id'], self.stages[1].id)
+        self.assertEqual(delta['removed'], [removed])
+        self.assertEqual(delta['counts'][str(self.stages[0].id)], len(untouched))
+        self.assertEqual(delta['revision'], self.revision())
+
+    def test_up_to_date_client_gets_empty_delta(self):
+        delta = self.changes(self.revision())
+        self.assertEqual((delta['type'], delta['cards'], delta['removed']), ('delta', [], []))
+
+    def test_snapshot_when_log_is_compacted_or_revision_unknown(self):
+        board = KanbanBoard.objects.get(id=self.board.id)
+        KanbanBoard.objects.filter(id=board.id).update(compacted_revision=board.revision)
+        self.assertEqual(get_changes_since(board, board.revision - 1)['type'], 'snapshot')
+        self.assertEqual(self.changes(board.revision + 10)['type'], 'snapshot')
+        self.assertEqual(self.changes('')['type'], 'snapshot')
+
+    def test_snapshot_follows_board_changes(self):
+        board_url = reverse('kanban:kanban_board')
+        self.client.get(board_url)
+        card = ProfileCard.objects.get(id=self.column(self.stages[0])[0])
+        # A set-based update reported by hand, as another process would
+        ProfileCard.objects.filter(id=card.id).update(stage=self.stages[2])
+        card.stage = self.stages[2]
+        board_changed(self.board.id, [card_event('card.moved', card)])
+        columns = {column['id']: column for column in self.client.get(board_url).context['columns']}
+        self.assertIn(card.id, [item['id'] for item in columns[self.stages[2].id]['cards']])
+
+
+class NotesTests(BoardTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.card = ProfileCard.objects.filter(board=self.board).first()
+
+    def save(self, notes, version, client_id='editor-1'):
+        return self.client.post(
+            reverse('kanban:update_notes', args=[self.card.id]),
+            json.dumps({'notes': notes, 'version': version, 'client_id': client_id}),
+            content_type='application/json',
+        )
+
+    def test_save_from_stale_version_conflicts(self):
+        self.assertEqual(self.save('First', 0).json()['version'], 1)
+        response = self.save('Mine', 0, client_id='editor-2')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.json()['notes'], response.json()['version']), ('First', 1))
+        self.assertEqual(ProfileCard.objects.get(id=self.card.id).notes, 'First')
+
+    def test_rapid_saves_from_one_client_are_coalesced(self):
+        self.save('H', 0)
+        [first] = BoardChange.objects.filter(card_id=self.card.id, event__type='card.notes_updated')
+        self.save('He', 1)
+        self.save('Hello', 2)
+        self.assertEqual(NoteRevision.objects.filter(card=self.card).count(), 1)
+        # The session's one change log entry moved up to the latest revision, and doesn't carry the text
+        [change] = BoardChange.objects.filter(card_id=self.card.id, event__type='card.notes_updated')
+        self.assertEqual((change.id, change.revision, change.event['notes_version']), (first.id, self.revision(), 3))
+        self.assertNotIn('notes', change.event)
+        self.assertEqual([entry['notes'] for entry in notes_history(self.card)], ['Hello', ''])
+        delta = get_changes_since(self.board, first.revision)
+        self.assertEqual([card['id'] for card in delta['cards']], [self.card.id])
+
+    def test_coalesced_save_query_count(self):
+        save_notes(self.card, 'H', 0, client_id='editor-1')
+        # Savepoint, revision with card, card, revision, board revision (update and read), change log, release
+        with self.assertNumQueries(8):
+            save_notes(self.card, 'He', 1, client_id='editor-1')
+        self.assertEqual(BoardChange.objects.filter(card_id=self.card.id, event__type='card.notes_updated').count(), 1)
+
+    def test_saves_from_different_clients_keep_their_revisions(self):
+        self.save('Hello', 0)
+        self.save('Hello there', 1, client_id='editor-2')
+        self.assertEqual(NoteRevision.objects.filter(card=self.card).count(), 2)
+        self.assertEqual([entry['notes'] for entry in notes_history(self.card)], ['Hello there', 'Hello', ''])
+        self.assertEqual(BoardChange.objects.filter(card_id=self.card.id, event__type='card.notes_updated').count(), 2)
+
+    def test_unchanged_notes_are_not_saved(self):
+        version = save_notes(self.card, '', 0)
+        self.assertEqual(version, 0)
+        self.assertFalse(NoteRevision.objects.filter(card=self.card).exists())
+        with self.assertRaises(NotesConflict):
+            save_notes(self.card, 'Late', 5)
+
+
+class PipelineRuleTests(BoardTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.source, self.target = self.stages[0], self.stages[1]
+
+    def idle(self, card_ids, days):
+        ProfileCard.objects.filter(id__in=card_ids).update(updated_at=self.now - datetime.timedelta(days=days))
+
+    def rule(self, action, **kwargs):
+        return PipelineRule.objects.create(
+            board=self.board, name=action, stage=self.source, idle_days=7, action=action, **kwargs,
+        )
+
+    def test_target_stage_must_be_in_the_same_pipeline(self):
+        other = KanbanBoard.objects.create(recruiter=User.objects.create_user('other'))
+        foreign = PipelineStage.objects.create(board=other, name='screening', order=1)
+        rule = PipelineRule(name='Move', stage=self.source, idle_days=7, action='move', target_stage=foreign)
+        with self.assertRaises(ValidationError):
+            rule.clean()
+        rule.target_stage = self.target
+        rule.clean()
+
+    def test_move_rule_moves_idle_cards_in_chunks(self):
+        *idle, fresh = self.column(self.source)
+        self.idle(idle, 10)
+        rule = self.rule('move', target_stage=self.target)
+        self.assertEqual(automation.run_rule(rule, self.now, dry_run=True), len(idle))
+
+        revision = self.revision()
+        with mock.patch.object(automation, 'RULE_CHUNK_SIZE', 2):
+            self.assertEqual(automation.run_rule(rule, self.now), len(idle))
+        # Oldest first, each chunk after the cards already in the column
+        self.assertEqual(self.column(self.target), idle)
+        self.assertEqual(self.column(self.source), [fresh])
+        self.assertEqual(self.revision(), revision + len(idle))
+        self.assertEqual(
+            StageTransition.objects.filter(from_stage_id=self.source.id, to_stage_id=self.target.id).count(), len(idle),
+        )
+        rule.refresh_from_db()
+        self.assertEqual((rule.last_run_at, rule.last_matched), (self.now, len(idle)))
+
+    def test_flag_rule_flags_each_card_once(self):
+        card_ids = self.column(self.source)
+        self.idle(card_ids[:2], 10)
+        self.idle(card_ids[2:], 3)
+        rule = self.rule('flag')
+        self.assertEqual(automation.run_rule(rule, self.now), 2)
+        self.assertEqual(set(ProfileCard.objects.filter(flagged=True).values_list('id', flat=True)), set(card_ids[:2]))
+        # Flagged cards no longer match
+        self.assertEqual(automation.run_rule(rule, self.now), 0)
+        self.assertEqual(BoardChange.objects.filter(board=self.board, event__type='card.flagged').count(), 2)
+
+    def test_rules_of_other_boards_leave_cards_alone(self):
+        other = KanbanBoard.objects.create(recruiter=User.objects.create_user('other'))
+        self.idle(self.column(self.source), 10)
+        rule = PipelineRule.objects.create(board=other, name='Flag', stage=self.source, idle_days=7, action='flag')
+        self.assertEqual(automation.run_rule(rule, self.now), 0)
+
+
+class HistogramTests(TestCase):
+
+    def test_duration_buckets_double(self):
+        hour = 3600
+        self.assertEqual(
+            [duration_bucket(seconds) for seconds in [0, hour - 1, hour, 2 * hour - 1, 2 * hour, 5 * hour, 10 ** 9]],
+            [0, 0, 1, 1, 2, 3, 15],
+        )
+
+    def test_percentile_interpolates_within_bucket(self):
+        self.assertIsNone(histogram_percentile([], 50))
+        self.assertIsNone(histogram_percentile([0, 0], 50))
+        # Four durations in [1h, 2h): the median is half way through the bucket
+        self.assertEqual(histogram_percentile([0, 4], 50), 5400)
+        self.assertEqual(histogram_percentile([0, 4], 100), 7200)
+        self.assertEqual(histogram_percentile([2, 2], 50), 3600)
+        self.assertEqual(histogram_percentile([2, 2], 75), 5400)
+
+
+class RollupTests(BoardTestCase):
+    # A card ID of its own, clear of the shortlisted cards' transitions
+    card_id = 10 ** 6
+
+    def setUp(self):
+        super().setUp()
+        self.start = timezone.now() - datetime.timedelta(days=2)
+
+    def move(self, from_stage, to_stage, hours):
+        record_transitions(self.board.id, [(self.card_id, from_stage.id, to_stage.id)], at=self.start + datetime.timedelta(hours=hours))
+
+    def rollup(self, from_stage, to_stage):
+        return StageFlowRollup.objects.get(board=self.board, from_stage_id=from_stage.id, to_stage_id=to_stage.id)
+
+    def test_rollup_times_each_stage_incrementally(self):
+        first, second, third, fourth = self.stages[:4]
+        self.move(first, second, 0)
+        self.move(second, third, 3)
+        rollup_board(self.board.id)
+        self.assertEqual(rollup_board(self.board.id), 0)
+        rollup = self.rollup(second, third)
+        self.assertEqual((rollup.count, rollup.timed_count, rollup.total_seconds), (1, 1, 3 * 3600))
+        self.assertEqual(rollup.histogram[duration_bucket(3 * 3600)], 1)
+
+        # Timed from the transition rolled up by the previous run
+        self.move(third, fourth, 27)
+        self.assertEqual(rollup_board(self.board.id), 1)
+        self.assertEqual(self.rollup(third, fourth).total_seconds, 24 * 3600)
+
+    def test_report_reads_stored_rollups_only(self):
+        first, second, third = self.stages[:3]
+        self.move(first, second, 0)
+        self.move(second, third, 3)
+        with self.assertNumQueries(1):
+            report = funnel_report(self.board)
+        self.assertEqual({stage['id']: stage['entered'] for stage in report['stages']}[third.id], 0)
+
+        call_command('rollup_stage_transitions', stdout=io.StringIO())
+        stages = {stage['id']: stage for stage in funnel_report(self.board)['stages']}
+        self.assertEqual(stages[third.id]['entered'], 1)
+        self.assertEqual(stages[second.id]['time_in_stage']['count'], 1)
+        self.assertEqual(stages[second.id]['time_in_stage']['mean_days'], 0.12)
@@ -7,7 +7,18 @@ urlpatterns = [
     path('', views.kanban_board, name='kanban_board'),
     path('like-profile/<int:profile_id>/', views.like_profile, name='like_profile'),
     path('unlike-profile/<int:profile_id>/', views.unlike_profile, name='unlike_profile'),
+    path('bulk-like/', views.bulk_like_profiles, name='bulk_like_profiles'),
+    path('bulk-unlike/', views.bulk_unlike_profiles, name='bulk_unlike_profiles'),
     path('move-card/', views.MoveCardView.as_view(), name='move_card'),
+    path('move-cards/', views.BatchMoveCardsView.as_view(), name='move_cards'),
     path('update-notes/<int:card_id>/', views.update_card_notes, name='update_notes'),
+    path('update-notes/<int:card_id>/history/', views.card_notes_history, name='notes_history'),
+    path('stages/', views.board_stages, name='board_stages'),
+    path('analytics/', views.board_analytics, name='board_analytics'),
     path('liked-profiles/', views.get_liked_profiles, name='get_liked_profiles'),
+    path('events/', views.board_events, name='board_events'),
+    path('column/<int:stage_id>/', views.column_cards, name='column_cards'),
+    path('filter/', views.filter_cards, name='filter_cards'),
+    path('export/<str:export_format>/', views.export_board, name='export_board'),
+    path('changes/', views.board_changes, name='board_changes'),
 ]
@@ -1,49 +1,47 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, HttpResponseNotModified
 from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 from django.views import View
-from django.db.models import Case, When
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.text import slugify
+import asyncio
+import base64
 import json
 
-from profiles.models import Profile
-from .models import KanbanBoard, ProfileCard, PipelineStage, ProfileLike
+from profiles.models import Profile, ProfileSkill
+from .models import KanbanBoard, ProfileCard, ProfileLike
+from .analytics import conversion, funnel_report
+from .board import (
+    COLUMN_PAGE_SIZE, MAX_COLUMN_PAGE_SIZE, get_board_snapshot, get_changes_since, get_column_page, move_cards,
+    set_board_stages,
+)
+from .broker import board_channel, get_broker, live_updates_available
+from .exports import EXPORT_FORMATS
+from .filters import MAX_FILTER_SKILLS, filter_board_cards
+from .notes import MAX_NOTES_LENGTH, NotesConflict, notes_history, save_notes
+from .shortlist import MAX_BULK_PROFILES, shortlist_profiles, unshortlist_profiles
+from .stages import stage_registry
 
 
 @login_required
+@ensure_csrf_cookie
 def kanban_board(request):
     """Display the kanban board for the current user"""
     # Get or create the user's kanban board
     board, created = KanbanBoard.objects.get_or_create(recruiter=request.user)
     
-    # Get pipeline stages in the correct order
-    stages = PipelineStage.objects.filter(
-        name__in=['profile_interest', 'resume_review', 'interview', 'hired', 'rejected']
-    ).order_by(
-        Case(
-            When(name='profile_interest', then=0),
-            When(name='resume_review', then=1),
-            When(name='interview', then=2),
-            When(name='hired', then=3),
-            When(name='rejected', then=4),
-        )
-    )
-    
-    # Get all profile cards for this board, organized by stage
-    cards_by_stage = {}
-    for stage in stages:
-        cards_by_stage[stage.id] = ProfileCard.objects.filter(
-            board=board, 
-            stage=stage
-        ).select_related('profile')
-    
+    snapshot = get_board_snapshot(board)
     context = {
         'board': board,
-        'stages': stages,
-        'cards_by_stage': cards_by_stage,
+        'live_updates': live_updates_available(request),
+        'revision': snapshot['revision'],
+        'columns': snapshot['columns'],
+        'proficiency_levels': ProfileSkill.PROFICIENCY_CHOICES,
     }
     return render(request, 'kanban/kanban_board.html', context)
 
@@ -53,28 +51,7 @@ def like_profile(request, profile_id):
     """Like a profile and add it to the kanban board"""
     profile = get_object_or_404(Profile, id=profile_id)
     
-    # Check if already liked
-    like, created = ProfileLike.objects.get_or_create(
-        recruiter=request.user,
-        profile=profile
-    )
-    
-    if created:
-        # Get or create the user's kanban board
-        board, _ = KanbanBoard.objects.get_or_create(recruiter=request.user)
-        
-        # Get the first stage (Profile Interest)
-        first_stage = PipelineStage.objects.filter(name='profile_interest').first()
-        
-        if first_stage:
-            # Create a profile card in the first stage
-            ProfileCard.objects.create(
-                board=board,
-                profile=profile,
-                stage=first_stage,
-                position=0
-            )
-        
+    if shortlist_profiles(request.user, [profile.id]):
         return JsonResponse({'status': 'liked', 'message': 'Profile added to your pipeline!'})
     else:
         return JsonResponse({'status': 'already_liked', 'message': 'Profile already in your pipeline!'})
@@ -85,20 +62,55 @@ def unlike_profile(request, profile_id):
     """Remove a profile from the kanban board"""
     profile = get_object_or_404(Profile, id=profile_id)
     
-    try:
-        like = ProfileLike.objects.get(recruiter=request.user, profile=profile)
-        like.delete()
-        
-        # Also remove from kanban board
-        board = KanbanBoard.objects.get(recruiter=request.user)
-        ProfileCard.objects.filter(board=board, profile=profile).delete()
-        
+    if unshortlist_profiles(request.user, [profile.id]):
         return JsonResponse({'status': 'unliked', 'message': 'Profile removed from your pipeline!'})
-    except ProfileLike.DoesNotExist:
+    else:
         return JsonResponse({'status': 'not_liked', 'message': 'Profile not in your pipeline!'})
 
 
-@method_decorator(csrf_exempt, name='dispatch')
+def _bulk_profile_ids(request):
+    """Read the list of profile IDs posted to a bulk endpoint"""
+    data = json.loads(request.body)
+    profile_ids = [int(profile_id) for profile_id in data.get('profile_ids', [])]
+    if len(profile_ids) > MAX_BULK_PROFILES:
+        raise ValueError(f'At most {MAX_BULK_PROFILES} profiles can be shortlisted at once')
+    return profile_ids
+
+
+@login_required
+@require_http_methods(['POST'])
+def bulk_like_profiles(request):
+    """Like many profiles at once and add them to the kanban board"""
+    try:
+        profile_ids = _bulk_profile_ids(request)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    liked = shortlist_profiles(request.user, profile_ids)
+    return JsonResponse({
+        'status': 'liked',
+        'liked': liked,
+        'message': f'{len(liked)} profiles added to your pipeline!',
+    })
+
+
+@login_required
+@require_http_methods(['POST'])
+def bulk_unlike_profiles(request):
+    """Remove many profiles from the kanban board at once"""
+    try:
+        profile_ids = _bulk_profile_ids(request)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    unliked = unshortlist_profiles(request.user, profile_ids)
+    return JsonResponse({
+        'status': 'unliked',
+        'unliked': unliked,
+        'message': f'{len(unliked)} profiles removed from your pipeline!',
+    })
+
+
 @method_decorator(login_required, name='dispatch')
 class MoveCardView(View):
     """Handle drag and drop of profile cards between stages"""
@@ -106,57 +118,334 @@ class MoveCardView(View):
     def post(self, request):
         try:
             data = json.loads(request.body)
-            card_id = data.get('card_id')
-            new_stage_id = data.get('new_stage_id')
-            new_position = data.get('new_position', 0)
-            
-            # Get the card and new stage
-            card = get_object_or_404(ProfileCard, id=card_id, board__recruiter=request.user)
-            new_stage = get_object_or_404(PipelineStage, id=new_stage_id)
-            
-            # Move the card
-            card.move_to_stage(new_stage, new_position)
-            
+            card_id = int(data['card_id'])
+            new_stage_id = int(data['new_stage_id'])
+            # Neighbouring cards the card was dropped between, if any
+            prev_card_id = int(data['prev_card_id']) if data.get('prev_card_id') else None
+            next_card_id = int(data['next_card_id']) if data.get('next_card_id') else None
+        except (ValueError, TypeError, KeyError) as e:
             return JsonResponse({
-                'status': 'success',
-                'message': f'Card moved to {new_stage.get_name_display()}'
-            })
-            
-        except Exception as e:
+                'status': 'error',
+                'message': f'Invalid request: {e}'
+            }, status=400)
+        
+        # Get the card and new stage
+        card = get_object_or_404(ProfileCard, id=card_id, board__recruiter=request.user)
+        new_stage = stage_registry.get_stage(card.board_id, new_stage_id)
+        if new_stage is None:
+            return JsonResponse({'status': 'error', 'message': 'Stage not found'}, status=404)
+        
+        # Move the card
+        card.move_to_stage(new_stage, prev_card_id, next_card_id)
+        
+        return JsonResponse({
+            'status': 'success',
+            'message': f'Card moved to {new_stage.display_name}'
+        })
+
+
+@method_decorator(login_required, name='dispatch')
+class BatchMoveCardsView(View):
+    """Move several selected profile cards to a stage in one request"""
+    
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            card_ids = [int(card_id) for card_id in data.get('card_ids', [])]
+            new_stage_id = int(data['new_stage_id'])
+            prev_card_id = int(data['prev_card_id']) if data.get('prev_card_id') else None
+            next_card_id = int(data['next_card_id']) if data.get('next_card_id') else None
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
             return JsonResponse({
                 'status': 'error',
-                'message': str(e)
+                'message': f'Invalid request: {e}'
             }, status=400)
+        
+        if not card_ids:
+            return JsonResponse({'status': 'error', 'message': 'No cards selected'}, status=400)
+        
+        board = get_object_or_404(KanbanBoard, recruiter=request.user)
+        new_stage = stage_registry.get_stage(board.id, new_stage_id)
+        if new_stage is None:
+            return JsonResponse({'status': 'error', 'message': 'Stage not found'}, status=404)
+        
+        try:
+            revision = move_cards(board, card_ids, new_stage, prev_card_id, next_card_id)
+        except ProfileCard.DoesNotExist:
+            return JsonResponse({'status': 'error', 'message': 'Card not found'}, status=404)
+        
+        return JsonResponse({
+            'status': 'success',
+            'message': f'{len(card_ids)} cards moved to {new_stage.display_name}',
+            'revision': revision,
+        })
 
 
 @login_required
+@require_http_methods(['GET', 'POST'])
 def update_card_notes(request, card_id):
-    """Update notes for a profile card"""
+    """
+    Get or save the notes of a profile card.
+    
+    Saves send the notes with the ``version`` they were edited from and are
+    refused with a 409 (carrying the current notes) if someone else saved in
+    between. ``client_id`` identifies the editor, so rapid autosaves from it
+    share one history revision.
+    """
+    card = get_object_or_404(ProfileCard.objects.only('id', 'board_id', 'notes', 'notes_version'), id=card_id, board__recruiter=request.user)
+    if request.method == 'GET':
+        return JsonResponse({'status': 'success', 'notes': card.notes, 'version': card.notes_version})
+    
+    try:
+        data = json.loads(request.body)
+        notes = data.get('notes', '')
+        version = int(data['version'])
+        client_id = str(data.get('client_id', ''))[:64]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'status': 'error', 'message': 'Send the notes with the version they were edited from'}, status=400)
+    if not isinstance(notes, str) or len(notes) > MAX_NOTES_LENGTH:
+        return JsonResponse({'status': 'error', 'message': f'Notes must be text of at most {MAX_NOTES_LENGTH} characters'}, status=400)
+    
+    try:
+        version = save_notes(card, notes, version, author=request.user, client_id=client_id)
+    except NotesConflict as conflict:
+        return JsonResponse({
+            'status': 'conflict',
+            'message': str(conflict),
+            'notes': conflict.notes,
+            'version': conflict.version,
+        }, status=409)
+    
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Notes updated successfully',
+        'version': version,
+    })
+
+
+@login_required
+def card_notes_history(request, card_id):
+    """Past versions of a card's notes, newest first"""
+    card = get_object_or_404(ProfileCard.objects.only('id'), id=card_id, board__recruiter=request.user)
+    try:
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 200)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid limit'}, status=400)
+    return JsonResponse({'status': 'success', 'history': notes_history(card, limit)})
+
+
+def serialize_stage(stage):
+    return {
+        'id': stage.id,
+        'name': stage.name,
+        'label': stage.display_name,
+        'color': stage.color,
+    }
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def board_stages(request):
+    """
+    Get or replace the stages of the current user's board.
+    
+    POST a JSON body of the form ``{"stages": [{"name", "label", "color"}, ...]}``
+    to give the board its own pipeline.
+    """
+    board, created = KanbanBoard.objects.get_or_create(recruiter=request.user)
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            notes = data.get('notes', '')
-            
-            card = get_object_or_404(ProfileCard, id=card_id, board__recruiter=request.user)
-            card.notes = notes
-            card.save()
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Notes updated successfully'
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': str(e)
-            }, status=400)
+            stages = set_board_stages(board, data.get('stages', []))
+        except (ValueError, TypeError, AttributeError) as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    else:
+        stages = stage_registry.get_stages(board.id)
+    return JsonResponse({'status': 'success', 'stages': [serialize_stage(stage) for stage in stages]})
+
+
+@login_required
+def board_analytics(request):
+    """
+    Get hiring funnel analytics for the current user's board.
+    
+    ``?days=`` sets the period (default 90); ``?from=<stage>&to=<stage>``
+    adds the conversion between two stages.
+    """
+    board = get_object_or_404(KanbanBoard, recruiter=request.user)
+    try:
+        days = min(max(int(request.GET.get('days', 90)), 1), 3660)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'days must be a number'}, status=400)
+    
+    report = funnel_report(board, days)
+    if request.GET.get('from') and request.GET.get('to'):
+        report['conversion'] = {
+            'from': request.GET['from'],
+            'to': request.GET['to'],
+            'rate': conversion(report, request.GET['from'], request.GET['to']),
+        }
+    return JsonResponse(dict(report, status='success'))
+
+
+def encode_id_set(ids):
+    """
+    Encode a sorted list of IDs compactly.
+    
+    Dense sets become a base64 bitmap offset from the smallest ID; sparse
+    ones a list of gaps between consecutive IDs.
+    """
+    if not ids:
+        return {'encoding': 'bitmap', 'base': 0, 'bitmap': ''}
+    base = ids[0]
+    span = ids[-1] - base + 1
+    if span <= 32 * len(ids):
+        bitmap = bytearray((span + 7) // 8)
+        for profile_id in ids:
+            offset = profile_id - base
+            bitmap[offset // 8] |= 1 << (offset % 8)
+        return {'encoding': 'bitmap', 'base': base, 'bitmap': base64.b64encode(bytes(bitmap)).decode('ascii')}
+    return {'encoding': 'gaps', 'base': base, 'gaps': [b - a for a, b in zip(ids, ids[1:])]}
+
+
+@login_required
+async def get_liked_profiles(request):
+    """
+    Get the set of profiles liked by the current user, in a compact versioned form.
+    
+    The version changes whenever a like is added or removed; clients send the
+    version they hold as If-None-Match and get a 304 if it is still current.
+    Pages that only need the liked state of the profiles they show get it
+    rendered server-side instead (see profiles.views.profile_list).
+    """
+    user = await request.auser()
+    likes = ProfileLike.objects.filter(recruiter=user)
+    stats = await likes.aaggregate(count=Count('id'), last_id=Max('id'))
+    version = f'"{stats["count"]}-{stats["last_id"] or 0}"'
+    if request.headers.get('If-None-Match') == version:
+        response = HttpResponseNotModified()
+        response['ETag'] = version
+        return response
+    
+    liked_profiles = sorted([profile_id async for profile_id in likes.values_list('profile_id', flat=True)])
+    response = JsonResponse(dict(encode_id_set(liked_profiles), version=version.strip('"'), count=len(liked_profiles)))
+    response['ETag'] = version
+    return response
+
+
+@login_required
+def column_cards(request, stage_id):
+    """
+    Get a page of the cards in one column of the current user's board.
     
-    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=405)
+    Pages follow on from ``?after=<position>&after_id=<card id>``, the cursor
+    returned with the previous page; ``?limit=`` sets the page size.
+    """
+    board = get_object_or_404(KanbanBoard, recruiter=request.user)
+    stage = stage_registry.get_stage(board.id, stage_id)
+    if stage is None:
+        return JsonResponse({'status': 'error', 'message': 'Stage not found'}, status=404)
+    try:
+        limit = min(max(int(request.GET.get('limit', COLUMN_PAGE_SIZE)), 1), MAX_COLUMN_PAGE_SIZE)
+        after_id = int(request.GET['after_id']) if request.GET.get('after_id') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid page cursor'}, status=400)
+    
+    page = get_column_page(board, stage, request.GET.get('after'), after_id, limit)
+    page['count'] = ProfileCard.objects.filter(board=board, stage=stage).count()
+    return JsonResponse(dict(page, status='success'))
 
 
 @login_required
-def get_liked_profiles(request):
-    """Get all profiles liked by the current user"""
-    liked_profiles = ProfileLike.objects.filter(recruiter=request.user).values_list('profile_id', flat=True)
-    return JsonResponse({'liked_profiles': list(liked_profiles)})
\ No newline at end of file
+def filter_cards(request):
+    """
+    Get the IDs of the cards on the current user's board matching a filter, per stage.
+    
+    ``?skill=`` (repeatable) with an optional ``?level=`` minimum proficiency,
+    and ``?q=`` to search notes, names and headlines.
+    """
+    board = get_object_or_404(KanbanBoard, recruiter=request.user)
+    skills = [skill.strip() for skill in request.GET.getlist('skill') if skill.strip()]
+    level = request.GET.get('level') or None
+    text = request.GET.get('q', '').strip()
+    
+    if len(skills) > MAX_FILTER_SKILLS:
+        return JsonResponse({'status': 'error', 'message': f'At most {MAX_FILTER_SKILLS} skills can be combined'}, status=400)
+    if level and level not in dict(ProfileSkill.PROFICIENCY_CHOICES):
+        return JsonResponse({'status': 'error', 'message': 'Invalid proficiency level'}, status=400)
+    
+    matches = filter_board_cards(board, skills, level, text)
+    return JsonResponse({
+        'status': 'success',
+        'stages': matches,
+        'count': sum(len(card_ids) for card_ids in matches.values()),
+    })
+
+
+@login_required
+def export_board(request, export_format):
+    """Download every card on the current user's board as CSV, or as a ZIP with JSON resumes"""
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'status': 'error', 'message': 'Unsupported export format'}, status=400)
+    board = get_object_or_404(KanbanBoard, recruiter=request.user)
+    stream, content_type, extension = EXPORT_FORMATS[export_format]
+    
+    filename = f'{slugify(board.name) or "board"}-{timezone.localdate().isoformat()}.{extension}'
+    response = StreamingHttpResponse(stream(board), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def board_changes(request):
+    """Get the card changes on the user's board since a revision (?since=<rev>)"""
+    board = get_object_or_404(KanbanBoard, recruiter=request.user)
+    try:
+        since = int(request.GET['since'])
+    except (KeyError, ValueError):
+        since = None
+    return JsonResponse(get_changes_since(board, since))
+
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_STREAM_KEEPALIVE = 15
+
+
+@login_required
+async def board_events(request):
+    """
+    Stream live changes to the current user's board as server-sent events.
+    
+    Needs an ASGI server: each open board holds a long-lived response. Under
+    WSGI this answers 204, which tells the client to stop reconnecting and
+    poll ``board_changes`` instead.
+    """
+    if not live_updates_available(request):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    board = await KanbanBoard.objects.filter(recruiter=user).afirst()
+    if board is None:
+        return JsonResponse({'status': 'error', 'message': 'Board not found'}, status=404)
+    
+    async def stream():
+        subscription = get_broker().subscribe(board_channel(board.id))
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await subscription.get(timeout=EVENT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if subscription.overflowed:
+                    # Events were dropped; the client has to reload the board
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                yield f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class PerfConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'perf'
+    verbose_name = 'Performance tooling'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import instrument_connections, instrument_templates
+        instrument_connections()
+        instrument_templates()
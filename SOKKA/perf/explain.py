@@ -0,0 +1,42 @@
+"""
+Query plan inspection for SQLite.
+
+``explain_queries`` runs ``EXPLAIN QUERY PLAN`` on queries captured with
+``CaptureQueriesContext``, and ``full_scans`` picks out the plan steps that
+read a whole table without an index.
+"""
+
+import re
+
+from django.db import connections
+
+# "SCAN <table>" with no index; "SCAN <table> USING [COVERING] INDEX" walks an index instead
+FULL_SCAN_RE = re.compile(r'^SCAN (?P<table>\w+)(?: AS \w+)?$')
+
+
+def explain(sql, using='default'):
+    """Get the query plan of one SQL statement, as a list of plan step descriptions"""
+    with connections[using].cursor() as cursor:
+        # Captured SQL has its parameters inlined already
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def explain_queries(captured_queries, using='default'):
+    """Get (sql, plan) for each SELECT in a list of captured queries"""
+    return [
+        (query['sql'], explain(query['sql'], using))
+        for query in captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def full_scans(plan, allowed_tables=(), using='default'):
+    """Get the tables a query plan reads in full, other than ``allowed_tables``"""
+    # Subqueries and CTEs are scanned as they are produced; only tables count
+    tables = set(connections[using].introspection.table_names()) - set(allowed_tables)
+    return [
+        match.group('table')
+        for match in (FULL_SCAN_RE.match(step.strip()) for step in plan)
+        if match and match.group('table') in tables
+    ]
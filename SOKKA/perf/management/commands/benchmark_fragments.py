@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from jobs.models import Job
+from profiles.models import Profile
+
+
+def profile_page(size):
+    profiles = Profile.objects.select_related('user').prefetch_related(
+        'profile_skills__skill', 'privacy_settings',
+    ).filter(user__isnull=False).exclude(privacy_settings__profile_visibility='private')
+    page = Paginator(profiles, size).get_page(1)
+    for profile in page:
+        profile.is_liked = False
+    return 'profiles/profile_list.html', {'page_obj': page, 'search_query': ''}
+
+
+def job_page(size):
+    jobs = list(Job.objects.filter(is_active=True)[:size])
+    return 'jobs/job_list.html', {'jobs': jobs, 'filters': {}}
+
+
+PAGES = {
+    'profile_list': profile_page,
+    'job_list': job_page,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure how long the profile and job listing templates take to render, '
+        'without fragment caching, with a cold cache and with a warm one'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=50, help='Cards or rows on the page')
+        parser.add_argument('--renders', type=int, default=50, help='Timed renders per case')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        for name, build in PAGES.items():
+            template_name, context = build(options['size'])
+            rows = len(context.get('page_obj') or context.get('jobs'))
+            if not rows:
+                raise CommandError('Seed a dataset first (manage.py seed_perf)')
+
+            def render():
+                started = time.perf_counter()
+                render_to_string(template_name, context, request)
+                return time.perf_counter() - started
+
+            with override_settings(FRAGMENT_CACHE_SECONDS=0):
+                render()
+                uncached = [render() for _ in range(options['renders'])]
+            cold = []
+            for _ in range(options['renders']):
+                cache.clear()
+                cold.append(render())
+            warm = [render() for _ in range(options['renders'])]
+
+            baseline = statistics.median(uncached)
+            self.stdout.write(f'{name} ({rows} rows):')
+            for case, times in (('uncached', uncached), ('cold cache', cold), ('warm cache', warm)):
+                median = statistics.median(times)
+                self.stdout.write(
+                    f'  {case:<12} median {median * 1000:>7.2f}ms  ({(median - baseline) / baseline:+.0%})'
+                )
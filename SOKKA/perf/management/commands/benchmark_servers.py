@@ -0,0 +1,202 @@
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from .run_benchmarks import build_endpoints, percentile
+
+# The endpoints with async views, driven together as one mix
+ENDPOINTS = (
+    'jobs:list',
+    'profiles:search_skills',
+    'profiles:public_profile_detail',
+    'kanban:get_liked_profiles',
+)
+
+SERVERS = {
+    # ASGI: one event loop per worker, async views run on it
+    'uvicorn': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'SOKKA.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+    ],
+    # WSGI: each sync worker handles one request at a time
+    'gunicorn': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', 'SOKKA.wsgi:application', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers), '--worker-class', 'sync', '--log-level', 'warning',
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_tree_rss(pid):
+    """Resident memory of a process and all its descendants, in bytes"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The parent PID comes after the parenthesized command name
+                    parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+class MemorySampler(threading.Thread):
+    """Track the peak resident memory of a process tree while running"""
+
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.peak = max(self.peak, process_tree_rss(self.pid))
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+async def fetch(port, path, cookie):
+    """GET a path over a fresh connection; return the status code"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\nConnection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+
+
+async def drive(port, paths, cookie, requests, concurrency):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(paths[index % len(paths)])
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, path, cookie)
+            except OSError:
+                status = 0
+            if 200 <= status < 400:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare uvicorn (ASGI, async views) with gunicorn sync workers (WSGI) on the endpoints with '
+        'async views: throughput, latency and memory per in-flight request at rising concurrency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', dest='servers', choices=sorted(SERVERS),
+                            help='Only run this server (repeatable)')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes per server')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128],
+                            help='Concurrent requests to try')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per concurrency level')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for picking URLs')
+
+    def handle(self, *args, **options):
+        endpoints = [endpoint for endpoint in build_endpoints(random.Random(options['seed'])) if endpoint[0] in ENDPOINTS]
+        # Everything runs as the recruiter, so each view runs in full (no anonymous page cache)
+        recruiter = next(user for name, user, urls in endpoints if user is not None)
+        client = Client()
+        client.force_login(recruiter)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        paths = [url for name, user, urls in endpoints for url in urls]
+        random.Random(options['seed']).shuffle(paths)
+
+        for server in options['servers'] or sorted(SERVERS):
+            self.benchmark(server, paths, cookie, options)
+
+    def benchmark(self, server, paths, cookie, options):
+        port = free_port()
+        try:
+            process = subprocess.Popen(SERVERS[server](port, options['workers']), cwd=settings.BASE_DIR)
+        except OSError as e:
+            raise CommandError(f'Could not start {server}: {e}')
+        try:
+            self.wait_until_up(server, process, port, paths[0], cookie)
+            # Warm every worker up before measuring its idle footprint
+            asyncio.run(drive(port, paths, cookie, options['workers'] * 20, options['workers']))
+            idle = process_tree_rss(process.pid)
+            self.stdout.write(f'{server} ({options["workers"]} workers), idle {idle / 2 ** 20:.1f} MiB:')
+
+            for concurrency in options['concurrency']:
+                sampler = MemorySampler(process.pid)
+                sampler.start()
+                latencies, errors, elapsed = asyncio.run(drive(port, paths, cookie, options['requests'], concurrency))
+                sampler.stop()
+                per_request = max(sampler.peak - idle, 0) / concurrency
+                self.stdout.write(
+                    f'  concurrency {concurrency:>4}  {len(latencies) / elapsed:>8.1f} req/s  '
+                    f'p50 {(percentile(latencies, 50) or 0) * 1000:>8.1f}ms  '
+                    f'p95 {(percentile(latencies, 95) or 0) * 1000:>8.1f}ms  '
+                    f'mean {(statistics.fmean(latencies) if latencies else 0) * 1000:>8.1f}ms  '
+                    f'peak {sampler.peak / 2 ** 20:>7.1f} MiB  '
+                    f'{per_request / 2 ** 10:>7.1f} KiB per in-flight request  {errors} errors'
+                )
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def wait_until_up(self, server, process, port, path, cookie, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{server} exited (is it installed? pip install {server})')
+            try:
+                asyncio.run(fetch(port, path, cookie))
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'{server} did not start within {timeout}s')
@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from jobs.models import Job, JobApplication
+from kanban.board import load_board
+from kanban.models import KanbanBoard, ProfileCard
+from kanban.shortlist import shortlist_profiles, unshortlist_profiles
+from kanban.stages import stage_registry
+from profiles.models import Profile
+
+
+def use_database(name, options):
+    """Point this process's default connection at another SQLite file"""
+    connections.close_all()
+    connection.settings_dict['NAME'] = name
+    connection.settings_dict['OPTIONS'] = options
+
+
+def seed(workers, profiles, jobs):
+    """Create a recruiter with a populated board and an applicant per worker"""
+    call_command('populate_stages', stdout=open(os.devnull, 'w'))
+    profile_ids = [
+        profile.id for profile in Profile.objects.bulk_create(
+            [Profile(headline=f'Benchmark candidate {i}') for i in range(profiles)]
+        )
+    ]
+    Job.objects.bulk_create([Job(title=f'Benchmark job {i}', description='Benchmark job') for i in range(jobs)])
+    for worker in range(workers):
+        recruiter = User.objects.create_user(f'bench-recruiter-{worker}')
+        User.objects.create_user(f'bench-applicant-{worker}')
+        shortlist_profiles(recruiter, random.sample(profile_ids, min(len(profile_ids), 100)))
+
+
+def like_profile(state):
+    # The like/unlike views: toggle a shortlisted profile
+    profile_id = random.choice(state['profile_ids'])
+    if not shortlist_profiles(state['recruiter'], [profile_id]):
+        unshortlist_profiles(state['recruiter'], [profile_id])
+
+
+def move_card(state):
+    # MoveCardView: drop a card at the top of a random stage
+    card = ProfileCard.objects.filter(board=state['board']).order_by('?').first()
+    if card is None:
+        return
+    stage = random.choice(state['stages'])
+    first = ProfileCard.objects.filter(board=state['board'], stage=stage).exclude(id=card.id).order_by('position', 'id').first()
+    card.move_to_stage(stage, next_card_id=first.id if first else None)
+
+
+def apply_to_job(state):
+    # apply_to_job: check for an earlier application, then apply (or withdraw, to keep going)
+    job_id = random.choice(state['job_ids'])
+    applications = JobApplication.objects.filter(job_id=job_id, applicant=state['applicant'])
+    if applications.exists():
+        applications.delete()
+    else:
+        JobApplication.objects.create(job_id=job_id, applicant=state['applicant'], tailored_note='Benchmark')
+
+
+def read_board(state):
+    load_board(state['board'])
+
+
+def read_jobs(state):
+    list(Job.objects.filter(is_active=True)[:20])
+
+
+WRITES = [like_profile, move_card, apply_to_job]
+READS = [read_board, read_jobs]
+
+
+def run_worker(worker, name, options, seconds, write_ratio, start_at):
+    """Run a random mix of operations until the time is up, returning counts and latencies"""
+    use_database(name, options)
+    random.seed(worker)
+    state = {
+        'recruiter': User.objects.get(username=f'bench-recruiter-{worker}'),
+        'applicant': User.objects.get(username=f'bench-applicant-{worker}'),
+        'profile_ids': list(Profile.objects.values_list('id', flat=True)),
+        'job_ids': list(Job.objects.values_list('id', flat=True)),
+    }
+    state['board'] = KanbanBoard.objects.get(recruiter=state['recruiter'])
+    state['stages'] = stage_registry.get_stages(state['board'].id)
+
+    result = {'reads': 0, 'writes': 0, 'lock_errors': 0, 'read_latency': [], 'write_latency': []}
+    time.sleep(max(start_at - time.time(), 0))
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        is_write = random.random() < write_ratio
+        operation = random.choice(WRITES if is_write else READS)
+        started = time.perf_counter()
+        try:
+            operation(state)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            result['lock_errors'] += 1
+            continue
+        kind = 'write' if is_write else 'read'
+        result[f'{kind}s'] += 1
+        result[f'{kind}_latency'].append(time.perf_counter() - started)
+    connections.close_all()
+    return result
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare SQLite connection profiles under concurrent load: several processes like '
+        'profiles, move cards, apply to jobs and read boards against a scratch database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            action='append',
+            dest='profiles',
+            help='SQLite profile from settings.SQLITE_PROFILES to run (repeatable; default: all)',
+        )
+        parser.add_argument('--workers', type=int, default=8, help='Number of worker processes')
+        parser.add_argument('--seconds', type=float, default=10, help='How long each profile runs')
+        parser.add_argument('--write-ratio', type=float, default=0.3, help='Share of operations that write')
+        parser.add_argument('--profiles-count', type=int, default=2000, help='Candidate profiles to seed')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or list(settings.SQLITE_PROFILES)
+        unknown = set(profiles) - set(settings.SQLITE_PROFILES)
+        if unknown:
+            raise CommandError(f'Unknown SQLite profiles: {", ".join(sorted(unknown))}')
+        workers = options['workers']
+        original = (connection.settings_dict['NAME'], connection.settings_dict['OPTIONS'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Build the seeded database once and give each profile a fresh copy
+            template = os.path.join(directory, 'template.sqlite3')
+            use_database(template, {})
+            self.stdout.write('Creating the benchmark database...')
+            call_command('migrate', verbosity=0, interactive=False)
+            seed(workers, options['profiles_count'], jobs=200)
+            use_database(original[0], original[1])
+
+            context = multiprocessing.get_context('fork')
+            rows = []
+            for profile in profiles:
+                name = os.path.join(directory, f'{profile}.sqlite3')
+                shutil.copyfile(template, name)
+                start_at = time.time() + 1
+                with context.Pool(workers) as pool:
+                    results = pool.starmap(run_worker, [
+                        (worker, name, settings.SQLITE_PROFILES[profile], options['seconds'], options['write_ratio'], start_at)
+                        for worker in range(workers)
+                    ])
+                rows.append((profile, results))
+
+        self.stdout.write(
+            f'\n{workers} workers, {options["seconds"]:g}s per profile, {options["write_ratio"]:.0%} writes\n'
+        )
+        self.stdout.write(
+            f'{"profile":<12}{"reads/s":>10}{"writes/s":>10}{"locked":>9}{"locked %":>10}'
+            f'{"read p95":>10}{"write p50":>11}{"write p95":>11}'
+        )
+        for profile, results in rows:
+            reads = sum(result['reads'] for result in results)
+            writes = sum(result['writes'] for result in results)
+            locked = sum(result['lock_errors'] for result in results)
+            read_latency = [value for result in results for value in result['read_latency']]
+            write_latency = [value for result in results for value in result['write_latency']]
+            attempts = writes + locked
+            self.stdout.write(
+                f'{profile:<12}{reads / options["seconds"]:>10.1f}{writes / options["seconds"]:>10.1f}{locked:>9}'
+                f'{(locked / attempts if attempts else 0):>10.1%}'
+                f'{percentile(read_latency, 95) * 1000:>8.1f}ms'
+                f'{statistics.median(write_latency) * 1000 if write_latency else 0:>9.1f}ms'
+                f'{percentile(write_latency, 95) * 1000:>9.1f}ms'
+            )
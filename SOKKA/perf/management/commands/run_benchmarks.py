@@ -0,0 +1,272 @@
+import asyncio
+import datetime
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from jobs.models import Job
+from kanban.models import KanbanBoard, ProfileCard
+from kanban.stages import stage_registry
+from perf.metrics import registry
+from profiles.models import Profile, Skill
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+def build_endpoints(rng, samples=50):
+    """
+    Get the hot endpoints as (name, user, [urls]).
+
+    Each endpoint gets a sample of realistic URLs (different pages, filters and
+    records), requested in turn. ``user`` is None for anonymous traffic.
+    """
+    job_ids = list(Job.objects.filter(is_active=True).order_by('?').values_list('id', flat=True)[:samples])
+    user_ids = list(
+        Profile.objects.filter(user__isnull=False).exclude(privacy_settings__profile_visibility='private')
+        .order_by('?').values_list('user_id', flat=True)[:samples]
+    )
+    skills = list(Skill.objects.values_list('name', flat=True))
+    board = KanbanBoard.objects.filter(profile_cards__isnull=False).select_related('recruiter').order_by('?').first()
+    if not job_ids or not user_ids or board is None:
+        raise CommandError('Seed a dataset first (manage.py seed_perf)')
+    recruiter = board.recruiter
+    candidate = User.objects.get(id=user_ids[0])
+    stage_ids = [
+        stage.id for stage in stage_registry.get_stages(board.id)
+        if ProfileCard.objects.filter(board=board, stage=stage).exists()
+    ]
+
+    def pick(values, count=samples):
+        return [rng.choice(values) for _ in range(count)]
+
+    return [
+        ('jobs:list', None, [reverse('jobs:list')] + [
+            f'{reverse("jobs:list")}?skills={skill}&is_remote=1' for skill in pick(skills, 10)
+        ]),
+        # Anonymous visitors can't open job details (there is no login page to link to)
+        ('jobs:detail', candidate, [reverse('jobs:detail', args=[job_id]) for job_id in job_ids]),
+        ('profiles:profile_list', recruiter, [
+            f'{reverse("profiles:profile_list")}?page={page}' for page in range(1, 11)
+        ] + [f'{reverse("profiles:profile_list")}?search={skill}' for skill in pick(skills, 5)]),
+        ('profiles:public_profile_detail', recruiter, [
+            reverse('profiles:public_profile_detail', args=[user_id]) for user_id in user_ids
+        ]),
+        ('profiles:search_skills', None, [
+            f'{reverse("profiles:search_skills")}?search={skill[:3]}' for skill in pick(skills, 20)
+        ]),
+        ('kanban:kanban_board', recruiter, [reverse('kanban:kanban_board')]),
+        ('kanban:column_cards', recruiter, [reverse('kanban:column_cards', args=[stage_id]) for stage_id in stage_ids]),
+        ('kanban:get_liked_profiles', recruiter, [reverse('kanban:get_liked_profiles')]),
+        ('kanban:filter_cards', recruiter, [
+            f'{reverse("kanban:filter_cards")}?skill={skill}' for skill in pick(skills, 10)
+        ]),
+    ]
+
+
+def _summarize(name, latencies, errors, elapsed, queries_per_request):
+    requests = len(latencies)
+    return {
+        'endpoint': name,
+        'requests': requests,
+        'errors': errors,
+        'throughput': round(requests / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        'queries_per_request': round(queries_per_request, 2) if queries_per_request is not None else None,
+    }
+
+
+def _view_queries(view):
+    metrics = registry.snapshot().get(view)
+    return (metrics['queries'], metrics['requests']) if metrics else (0, 0)
+
+
+def _queries_per_request(view, before):
+    # The metrics middleware counts every request's queries
+    queries, requests = _view_queries(view)
+    return (queries - before[0]) / (requests - before[1]) if requests > before[1] else None
+
+
+def run_wsgi(name, user, urls, requests, concurrency):
+    """Request an endpoint from several threads through the WSGI handler"""
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = Client(raise_request_exception=False)
+            if user is not None:
+                local.client.force_login(user)
+        return local.client
+
+    def request(index):
+        c = client()
+        started = time.perf_counter()
+        response = c.get(urls[index % len(urls)])
+        latency = time.perf_counter() - started
+        with lock:
+            if response.status_code >= 400:
+                errors[0] += 1
+            else:
+                latencies.append(latency)
+
+    before = _view_queries(name)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(request, range(requests)))
+    elapsed = time.perf_counter() - started
+    return _summarize(name, latencies, errors[0], elapsed, _queries_per_request(name, before))
+
+
+async def _run_asgi(name, user, urls, requests, concurrency):
+    latencies, errors = [], [0]
+    clients = []
+    for _ in range(concurrency):
+        client = AsyncClient(raise_request_exception=False)
+        if user is not None:
+            await client.aforce_login(user)
+        clients.append(client)
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+
+    async def worker(client):
+        while not queue.empty():
+            index = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(urls[index % len(urls)])
+            latency = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors[0] += 1
+            else:
+                latencies.append(latency)
+
+    before = _view_queries(name)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    return _summarize(name, latencies, errors[0], elapsed, _queries_per_request(name, before))
+
+
+def run_asgi(name, user, urls, requests, concurrency):
+    """Request an endpoint from concurrent tasks through the ASGI handler"""
+    return asyncio.run(_run_asgi(name, user, urls, requests, concurrency))
+
+
+RUNNERS = {
+    'wsgi': run_wsgi,
+    'asgi': run_asgi,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the hot endpoints: request each one concurrently through the WSGI or ASGI handler '
+        'and report latency percentiles, throughput and SQL queries per request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interface', choices=sorted(RUNNERS), default='wsgi', help='Handler to drive')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint first')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run this endpoint (repeatable)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Compare with results saved earlier with --output')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for picking URLs')
+
+    def handle(self, *args, **options):
+        endpoints = build_endpoints(random.Random(options['seed']))
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {name for name, user, urls in endpoints}
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['endpoints']]
+
+        run = RUNNERS[options['interface']]
+        results = []
+        # The test clients send requests to "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, user, urls in endpoints:
+                if options['warmup']:
+                    run(name, user, urls, options['warmup'], 1)
+                result = run(name, user, urls, options['requests'], options['concurrency'])
+                results.append(result)
+                self.stdout.write(
+                    f'{name:<32} {result["throughput"] or 0:>8.1f} req/s  p50 {result["p50_ms"] or 0:>7.1f}ms  '
+                    f'p95 {result["p95_ms"] or 0:>7.1f}ms  p99 {result["p99_ms"] or 0:>7.1f}ms  '
+                    f'{result["queries_per_request"] or 0:>5.1f} queries  {result["errors"]} errors'
+                )
+
+        report = {
+            'commit': git_commit(),
+            'run_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'interface': options['interface'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'database': {
+                'vendor': connections['default'].vendor,
+                'sqlite_profile': getattr(settings, 'SQLITE_PROFILE', None),
+                'replicas': len(getattr(settings, 'DATABASE_REPLICAS', [])),
+            },
+            'dataset': {
+                'profiles': Profile.objects.count(),
+                'jobs': Job.objects.count(),
+                'users': User.objects.count(),
+                'cards': ProfileCard.objects.count(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Saved results to {options["output"]}')
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def compare(self, report, path):
+        with open(path) as f:
+            baseline = json.load(f)
+        before = {result['endpoint']: result for result in baseline['results']}
+        self.stdout.write(f'\nCompared with {baseline.get("commit") or path}:')
+        for result in report['results']:
+            old = before.get(result['endpoint'])
+            if not old or not old['p95_ms'] or not result['p95_ms']:
+                continue
+            change = (result['p95_ms'] - old['p95_ms']) / old['p95_ms']
+            style = self.style.ERROR if change > 0.1 else self.style.SUCCESS if change < -0.1 else str
+            self.stdout.write(style(
+                f'{result["endpoint"]:<32} p95 {old["p95_ms"]:>7.1f}ms -> {result["p95_ms"]:>7.1f}ms ({change:+.0%})  '
+                f'throughput {old["throughput"]} -> {result["throughput"]}  '
+                f'queries {old["queries_per_request"]} -> {result["queries_per_request"]}'
+            ))
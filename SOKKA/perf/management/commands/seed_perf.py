@@ -0,0 +1,257 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.models import Job, JobApplication
+from kanban.models import KanbanBoard, ProfileCard, ProfileLike
+from kanban.ranking import spread_keys
+from kanban.stages import stage_registry
+from profiles.models import (
+    Education, Link, Profile, ProfilePrivacySettings, ProfileSkill, Skill, WorkExperience,
+)
+
+FIRST_NAMES = [
+    'Aisha', 'Ben', 'Carlos', 'Dana', 'Elif', 'Femi', 'Grace', 'Hiro', 'Ines', 'Jonas', 'Kavya', 'Liam',
+    'Mei', 'Noah', 'Olga', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tariq', 'Uma', 'Victor', 'Wen', 'Yusuf', 'Zoe',
+]
+LAST_NAMES = [
+    'Adams', 'Bauer', 'Chen', 'Diaz', 'Eze', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jensen', 'Kim', 'Lopez',
+    'Müller', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Usman', 'Virtanen', 'Wang', 'Yilmaz',
+]
+ROLES = [
+    'Backend Engineer', 'Frontend Engineer', 'Full Stack Developer', 'Data Scientist', 'Data Engineer',
+    'DevOps Engineer', 'Site Reliability Engineer', 'Mobile Developer', 'ML Engineer', 'QA Engineer',
+    'Product Designer', 'Security Engineer', 'Engineering Manager', 'Platform Engineer',
+]
+SENIORITIES = ['Junior', '', 'Senior', 'Staff', 'Lead', 'Principal']
+SKILLS = [
+    'Python', 'Django', 'Flask', 'FastAPI', 'JavaScript', 'TypeScript', 'React', 'Vue', 'Angular', 'Svelte',
+    'Node.js', 'Go', 'Rust', 'Java', 'Kotlin', 'Scala', 'C', 'C++', 'C#', '.NET', 'Ruby', 'Rails', 'PHP',
+    'Laravel', 'Swift', 'Objective-C', 'Android', 'iOS', 'Flutter', 'React Native', 'SQL', 'PostgreSQL',
+    'MySQL', 'SQLite', 'MongoDB', 'Redis', 'Elasticsearch', 'Kafka', 'RabbitMQ', 'Spark', 'Hadoop',
+    'Airflow', 'dbt', 'Pandas', 'NumPy', 'scikit-learn', 'TensorFlow', 'PyTorch', 'NLP', 'Computer Vision',
+    'AWS', 'GCP', 'Azure', 'Docker', 'Kubernetes', 'Terraform', 'Ansible', 'Linux', 'Bash', 'Git', 'CI/CD',
+    'GraphQL', 'REST', 'gRPC', 'HTML', 'CSS', 'Sass', 'Tailwind', 'Figma', 'Accessibility', 'Testing',
+    'Selenium', 'Cypress', 'Security', 'OAuth', 'Networking', 'Microservices', 'System Design', 'Agile',
+]
+COMPANIES = [
+    'Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises', 'Vandelay',
+    'Soylent', 'Cyberdyne', 'Tyrell', 'Wonka', 'Aperture', 'Massive Dynamic', 'Pied Piper', 'Oscorp',
+]
+INSTITUTIONS = [
+    'State University', 'Institute of Technology', 'City College', 'Polytechnic University',
+    'National University', 'Technical University', 'Open University',
+]
+DEGREES = ['BSc', 'BA', 'MSc', 'MEng', 'PhD', 'Diploma']
+FIELDS = ['Computer Science', 'Software Engineering', 'Mathematics', 'Physics', 'Statistics', 'Design', 'Economics']
+CITIES = ['Berlin', 'London', 'Lagos', 'Toronto', 'Austin', 'Bangalore', 'Tokyo', 'São Paulo', 'Lisbon', 'Remote']
+LEVELS = [value for value, label in ProfileSkill.PROFICIENCY_CHOICES]
+
+# Full scale: roughly what production looks like
+DEFAULTS = {
+    'profiles': 1_000_000,
+    'jobs': 100_000,
+    'applications': 500_000,
+    'boards': 200,
+    'cards_per_board': 500,
+}
+
+
+def _date(rng, years_ago_min, years_ago_max):
+    return datetime.date.today() - datetime.timedelta(days=rng.randint(years_ago_min * 365, years_ago_max * 365))
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a realistic synthetic dataset for performance work: candidate profiles with skills, '
+        'education and work history, jobs, applications and recruiter boards with cards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply the counts (other than cards per board) by this, e.g. 0.01 for a quick dataset')
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f'--{name.replace("_", "-")}', type=int, help=f'Number of {name.replace("_", " ")} (default {default:,})')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk insert')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable datasets')
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name] if options[name] is not None else max(int(default * scale), 1)
+            for name, default in DEFAULTS.items()
+            # Boards stay realistically sized at any scale
+            for scale in [1 if name == 'cards_per_board' else options['scale']]
+        }
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Seeded accounts can't log in
+        self.password = make_password(None)
+        # Continue numbering from an earlier run, so it can be topped up
+        self.offset = User.objects.filter(username__startswith='perf-candidate-').count()
+
+        call_command('populate_stages', stdout=self.stdout)
+        skill_ids = self.seed_skills()
+        profile_ids, user_ids = self.seed_profiles(counts['profiles'], skill_ids)
+        job_ids = self.seed_jobs(counts['jobs'])
+        self.seed_applications(counts['applications'], job_ids, user_ids)
+        self.seed_boards(counts['boards'], counts['cards_per_board'], profile_ids)
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded ' + ', '.join(f'{count:,} {name.replace("_", " ")}' for name, count in counts.items())
+        ))
+
+    def progress(self, label, done, total):
+        self.stdout.write(f'\r{label}: {done:,}/{total:,}', ending='')
+        if done >= total:
+            self.stdout.write('')
+        self.stdout.flush()
+
+    def seed_skills(self):
+        Skill.objects.bulk_create([Skill(name=name) for name in SKILLS], ignore_conflicts=True)
+        return list(Skill.objects.values_list('id', flat=True))
+
+    def seed_profiles(self, total, skill_ids):
+        rng = self.rng
+        profile_ids, user_ids = [], []
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            with transaction.atomic():
+                names = [(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)) for _ in range(size)]
+                users = User.objects.bulk_create([
+                    User(
+                        username=f'perf-candidate-{self.offset + start + i}',
+                        first_name=first, last_name=last,
+                        email=f'candidate{self.offset + start + i}@example.com',
+                        password=self.password,
+                    )
+                    for i, (first, last) in enumerate(names)
+                ])
+                profiles = Profile.objects.bulk_create([
+                    Profile(
+                        user=user,
+                        headline=f'{rng.choice(SENIORITIES)} {rng.choice(ROLES)}'.strip(),
+                        bio=f'{rng.randint(1, 20)} years building software at companies like {rng.choice(COMPANIES)}.',
+                        location=rng.choice(CITIES),
+                    )
+                    for user in users
+                ])
+                ProfilePrivacySettings.objects.bulk_create([
+                    ProfilePrivacySettings(
+                        profile=profile,
+                        profile_visibility=rng.choices(['public', 'selective', 'private'], [85, 10, 5])[0],
+                        show_phone=rng.random() < 0.5,
+                    )
+                    for profile in profiles
+                ])
+                ProfileSkill.objects.bulk_create([
+                    ProfileSkill(profile=profile, skill_id=skill_id, proficiency_level=rng.choice(LEVELS))
+                    for profile in profiles
+                    for skill_id in rng.sample(skill_ids, rng.randint(3, 10))
+                ])
+                educations, work, links = [], [], []
+                for profile in profiles:
+                    for _ in range(rng.randint(1, 2)):
+                        started = _date(rng, 6, 20)
+                        educations.append(Education(
+                            profile=profile, institution=f'{rng.choice(CITIES)} {rng.choice(INSTITUTIONS)}',
+                            degree=rng.choice(DEGREES), field_of_study=rng.choice(FIELDS),
+                            start_date=started, end_date=started + datetime.timedelta(days=365 * rng.randint(2, 5)),
+                        ))
+                    jobs_held = rng.randint(1, 4)
+                    for index in range(jobs_held):
+                        current = index == 0 and rng.random() < 0.7
+                        started = _date(rng, 1 + 3 * index, 3 + 3 * index)
+                        work.append(WorkExperience(
+                            profile=profile, company=rng.choice(COMPANIES), position=rng.choice(ROLES),
+                            start_date=started, is_current=current,
+                            end_date=None if current else started + datetime.timedelta(days=rng.randint(180, 1000)),
+                            description='Built and operated production services.', location=rng.choice(CITIES),
+                        ))
+                    links.append(Link(profile=profile, link_type='github', url=f'https://github.com/candidate{profile.id}'))
+                    if rng.random() < 0.6:
+                        links.append(Link(profile=profile, link_type='linkedin', url=f'https://www.linkedin.com/in/candidate{profile.id}'))
+                Education.objects.bulk_create(educations)
+                WorkExperience.objects.bulk_create(work)
+                Link.objects.bulk_create(links)
+            profile_ids.extend(profile.id for profile in profiles)
+            user_ids.extend(user.id for user in users)
+            self.progress('Profiles', start + size, total)
+        return profile_ids, user_ids
+
+    def seed_jobs(self, total):
+        rng = self.rng
+        poster = User.objects.get_or_create(username='perf-employer', defaults={'password': self.password})[0]
+        job_ids = []
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            jobs = []
+            for _ in range(size):
+                salary = rng.randrange(40_000, 200_000, 5_000)
+                jobs.append(Job(
+                    title=f'{rng.choice(SENIORITIES)} {rng.choice(ROLES)}'.strip(),
+                    description='We are hiring. ' * rng.randint(5, 30),
+                    skills=', '.join(rng.sample(SKILLS, rng.randint(2, 6))),
+                    location=rng.choice(CITIES),
+                    salary_min=salary, salary_max=salary + rng.randrange(10_000, 60_000, 5_000),
+                    is_remote=rng.random() < 0.3,
+                    visa_sponsorship=rng.random() < 0.2,
+                    posted_by=poster,
+                    is_active=rng.random() < 0.8,
+                ))
+            job_ids.extend(job.id for job in Job.objects.bulk_create(jobs))
+            self.progress('Jobs', start + size, total)
+        return job_ids
+
+    def seed_applications(self, total, job_ids, user_ids):
+        rng = self.rng
+        if not job_ids or not user_ids:
+            return
+        total = min(total, len(job_ids) * len(user_ids))
+        created = 0
+        while created < total:
+            size = min(self.batch_size, total - created)
+            pairs = {(rng.choice(job_ids), rng.choice(user_ids)) for _ in range(size)}
+            # Pairs already applied for are skipped, so count what was actually added
+            before = JobApplication.objects.count()
+            JobApplication.objects.bulk_create([
+                JobApplication(
+                    job_id=job_id, applicant_id=user_id, tailored_note='I would love to join your team.',
+                    status=rng.choices(['pending', 'reviewed', 'accepted', 'rejected'], [70, 20, 3, 7])[0],
+                )
+                for job_id, user_id in pairs
+            ], ignore_conflicts=True)
+            created += JobApplication.objects.count() - before
+            self.progress('Applications', min(created, total), total)
+
+    def seed_boards(self, total, cards_per_board, profile_ids):
+        rng = self.rng
+        if not profile_ids:
+            return
+        offset = User.objects.filter(username__startswith='perf-recruiter-').count()
+        recruiters = User.objects.bulk_create([
+            User(username=f'perf-recruiter-{offset + i}', first_name='Recruiter', last_name=str(offset + i), password=self.password)
+            for i in range(total)
+        ])
+        boards = KanbanBoard.objects.bulk_create([KanbanBoard(recruiter=recruiter) for recruiter in recruiters])
+        for done, board in enumerate(boards, 1):
+            shortlisted = rng.sample(profile_ids, min(cards_per_board, len(profile_ids)))
+            stages = stage_registry.get_stages(board.id)
+            # Most candidates sit in the early stages
+            weights = [2 ** (len(stages) - index) for index in range(len(stages))]
+            by_stage = {}
+            for profile_id in shortlisted:
+                by_stage.setdefault(rng.choices(stages, weights)[0], []).append(profile_id)
+            with transaction.atomic():
+                ProfileLike.objects.bulk_create(
+                    [ProfileLike(recruiter_id=board.recruiter_id, profile_id=profile_id) for profile_id in shortlisted],
+                    batch_size=self.batch_size,
+                )
+                ProfileCard.objects.bulk_create([
+                    ProfileCard(board=board, profile_id=profile_id, stage=stage, position=position)
+                    for stage, stage_profiles in by_stage.items()
+                    for profile_id, position in zip(stage_profiles, spread_keys(len(stage_profiles)))
+                ], batch_size=self.batch_size)
+            self.progress('Boards', done, total)
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the default SQLite database to the local stand-in read replicas (run on a schedule)'
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Only SQLite replicas can be synced; other databases replicate themselves')
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write('No replicas configured (set SOKKA_DB_REPLICAS)')
+            return
+
+        # The backup API copies a consistent snapshot, even while the primary is being written
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                connections[alias].close()
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'Synced {alias}')
+        finally:
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(settings.DATABASE_REPLICAS)} replicas'))
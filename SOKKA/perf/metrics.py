@@ -0,0 +1,301 @@
+"""
+Per-view performance metrics.
+
+``MetricsMiddleware`` records, for every request, under the view's URL name
+(e.g. ``jobs:list``): latency, number and total time of SQL queries,
+template render time and response size. Queries are counted by a database
+execute wrapper on every connection (see ``instrument_connections``), which
+charges them to the request in the current context, also when the async ORM
+runs them in a worker thread. Template time is measured by wrapping the
+Django template backend (see ``instrument_templates``).
+
+Metrics are aggregated in-process under a lock and served in Prometheus text
+format by ``metrics_view``. With several worker processes, set
+``METRICS_DIR`` to a directory shared by the workers: each worker writes its
+totals there every ``METRICS_FLUSH_SECONDS``, to a file named by a token of
+its own (pids are reused), and the endpoint adds up every worker's file.
+Files not written for ``METRICS_STALE_SECONDS`` belong to workers that have
+exited and are removed; an idle worker's file comes back with its next flush.
+Async requests flush from a worker thread, off the event loop.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+# Upper bounds of the histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Counters of the request being handled
+_request = contextvars.ContextVar('request_metrics', default=None)
+
+
+def _new_view_metrics():
+    return {
+        'requests': 0,
+        'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+        'latency_seconds': 0.0,
+        'query_buckets': [0] * (len(QUERY_COUNT_BUCKETS) + 1),
+        'queries': 0,
+        'query_seconds': 0.0,
+        'template_seconds': 0.0,
+        'response_bytes': 0,
+    }
+
+
+def _bucket(bounds, value):
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+def merge_metrics(target, metrics):
+    """Add one set of per-view metrics into another, in place"""
+    for view, values in metrics.items():
+        totals = target.setdefault(view, _new_view_metrics())
+        for key, value in values.items():
+            if isinstance(value, list):
+                totals[key] = [a + b for a, b in zip(totals[key], value)]
+            else:
+                totals[key] += value
+    return target
+
+
+class MetricsRegistry:
+    """This process's metrics, by view"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.flushed_at = 0.0
+        self.pid = None
+        self.token = None
+
+    def record(self, view, latency, queries, query_seconds, template_seconds, response_bytes):
+        with self.lock:
+            metrics = self.views.get(view)
+            if metrics is None:
+                metrics = self.views[view] = _new_view_metrics()
+            metrics['requests'] += 1
+            metrics['latency_buckets'][_bucket(LATENCY_BUCKETS, latency)] += 1
+            metrics['latency_seconds'] += latency
+            metrics['query_buckets'][_bucket(QUERY_COUNT_BUCKETS, queries)] += 1
+            metrics['queries'] += queries
+            metrics['query_seconds'] += query_seconds
+            metrics['template_seconds'] += template_seconds
+            metrics['response_bytes'] += response_bytes
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.views))
+
+    def file_name(self):
+        """Name of this process's file in the shared directory"""
+        # A worker forked from a process that already had a token gets its own
+        pid = os.getpid()
+        if self.pid != pid:
+            self.pid, self.token = pid, f'{pid}-{uuid.uuid4().hex}'
+        return f'{self.token}.json'
+
+    def flush_due(self):
+        return time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_SECONDS
+
+    def flush(self, directory, force=False):
+        """Write this process's totals to the shared directory, at most every METRICS_FLUSH_SECONDS"""
+        with self.lock:
+            if not force and not self.flush_due():
+                return
+            self.flushed_at = time.monotonic()
+            data = json.dumps(self.views)
+            path = os.path.join(directory, self.file_name())
+        # Per thread, as async requests flush from worker threads
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Get the metrics of every worker (just this process without METRICS_DIR)"""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self.snapshot()
+        self.flush(directory, force=True)
+        stale = time.time() - settings.METRICS_STALE_SECONDS
+        totals = {}
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < stale:
+                    # Left by a worker that has exited (or by an interrupted write)
+                    os.remove(path)
+                    continue
+                if not name.endswith('.json'):
+                    continue
+                with open(path) as f:
+                    merge_metrics(totals, json.load(f))
+            except (OSError, ValueError):
+                # A worker's file vanished or is being replaced; it is counted next scrape
+                continue
+        return totals
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting the request's queries and their time"""
+    counters = _request.get()
+    if counters is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counters['queries'] += 1
+        counters['query_seconds'] += time.perf_counter() - started
+
+
+def _add_query_recorder(sender, connection, **kwargs):
+    # A connection object reconnects after CONN_MAX_AGE; add the wrapper just once
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_connections():
+    """Count the queries of every database connection against the request being handled"""
+    # Connections are per thread, so a wrapper installed by the middleware
+    # would miss the queries async views run in the ORM's worker thread
+    connection_created.connect(_add_query_recorder, dispatch_uid='perf.metrics.record_query')
+
+
+def instrument_templates():
+    """Time every render of a Django template made while handling a request"""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        counters = _request.get()
+        # Form widgets render templates inside templates; only time the outermost render
+        if counters is None or counters['rendering']:
+            return render(self, context, request)
+        counters['rendering'] = True
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            counters['template_seconds'] += time.perf_counter() - started
+            counters['rendering'] = False
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+@sync_and_async_middleware
+class MetricsMiddleware:
+    """Record latency, SQL, template time and response size per view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.measure(request) as counters:
+            response = self.get_response(request)
+        self.record(request, response, counters)
+        if settings.METRICS_DIR:
+            registry.flush(settings.METRICS_DIR)
+        return response
+
+    async def __acall__(self, request):
+        with self.measure(request) as counters:
+            response = await self.get_response(request)
+        self.record(request, response, counters)
+        if settings.METRICS_DIR and registry.flush_due():
+            # Writing the file would block the event loop
+            await sync_to_async(registry.flush, thread_sensitive=False)(settings.METRICS_DIR)
+        return response
+
+    @contextlib.contextmanager
+    def measure(self, request):
+        counters = {'queries': 0, 'query_seconds': 0.0, 'template_seconds': 0.0, 'rendering': False}
+        token = _request.set(counters)
+        started = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            _request.reset(token)
+            counters['latency'] = time.perf_counter() - started
+
+    def record(self, request, response, counters):
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        if response.streaming:
+            size = int(response.get('Content-Length', 0))
+        else:
+            size = len(response.content)
+        registry.record(
+            view, counters['latency'], counters['queries'], counters['query_seconds'], counters['template_seconds'], size,
+        )
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram(lines, name, help_text, bounds, metrics, buckets_key, sum_key):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for view, values in metrics:
+        label = _label(view)
+        cumulative = 0
+        for bound, count in zip(list(bounds) + ['+Inf'], values[buckets_key]):
+            cumulative += count
+            lines.append(f'{name}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{view="{label}"}} {values[sum_key]}')
+        lines.append(f'{name}_count{{view="{label}"}} {values["requests"]}')
+
+
+def _counter(lines, name, help_text, metrics, key):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for view, values in metrics:
+        lines.append(f'{name}{{view="{_label(view)}"}} {values[key]}')
+
+
+def render_metrics(views):
+    """Render per-view metrics in the Prometheus text exposition format"""
+    metrics = sorted(views.items())
+    lines = []
+    _histogram(lines, 'sokka_request_duration_seconds', 'Time to handle a request.',
+               LATENCY_BUCKETS, metrics, 'latency_buckets', 'latency_seconds')
+    _histogram(lines, 'sokka_db_queries_per_request', 'SQL queries made by a request.',
+               QUERY_COUNT_BUCKETS, metrics, 'query_buckets', 'queries')
+    _counter(lines, 'sokka_db_query_seconds_total', 'Time spent running SQL queries.', metrics, 'query_seconds')
+    _counter(lines, 'sokka_template_render_seconds_total', 'Time spent rendering templates.', metrics, 'template_seconds')
+    _counter(lines, 'sokka_response_bytes_total', 'Bytes of response bodies sent.', metrics, 'response_bytes')
+    return '\n'.join(lines) + '\n'
+
+
+@staff_member_required
+def metrics_view(request):
+    """Serve the metrics in Prometheus text format (to staff only)"""
+    return HttpResponse(render_metrics(registry.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
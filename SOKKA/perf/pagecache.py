@@ -0,0 +1,199 @@
+"""
+Whole-page cache for anonymous listings.
+
+Anonymous visitors browsing jobs and profiles send the same handful of
+filters over and over, in whatever order and spelling their browser or a
+shared link uses. ``cache_anonymous_page`` caches such a view's response
+under a key built from the query string in canonical form: only the
+parameters the view reads, each normalized, with empty and default values
+dropped and the rest sorted. ``?is_remote=true&title=+python`` and
+``?title=python&is_remote=1&utm_source=x`` share one entry.
+
+Each cached page depends on one or more groups (``'jobs'``, ``'profiles'``),
+and the key embeds the current generation of each group: a token in the
+cache that ``bump_page_generation`` replaces whenever something listed by
+the group changes (see ``perf.signals``). Every page built before the change
+stops being looked up at once, without finding or deleting any keys; the
+old entries simply expire. Pages that will be cached are built from the
+primary database, even in views that read from replicas: a lagging replica
+would otherwise let a page with the old rows be cached under the new
+generation.
+"""
+
+import functools
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from .replicas import primary_reads
+
+GENERATION_CACHE_KEY = 'pagecache:generation:{group}'
+PAGE_CACHE_KEY = 'pagecache:response:{name}:{generations}:{digest}'
+
+
+def text(value):
+    """Normalize a free-text parameter"""
+    return value.strip()
+
+
+def flag(value):
+    """Normalize a parameter read as "on" when it is 1 or true"""
+    return '1' if value in ('1', 'true', 'True') else ''
+
+
+def integer(value):
+    """Normalize a parameter ignored unless it is an integer"""
+    try:
+        return str(int(value))
+    except ValueError:
+        return ''
+
+
+def comma_set(value):
+    """Normalize a comma-separated list whose order and repeats don't matter"""
+    return ','.join(sorted({item.strip() for item in value.split(',')} - {''}))
+
+
+def normalize_query(query, params):
+    """
+    Get the normalized value of each parameter a view reads ('' when missing).
+
+    ``params`` maps the parameter names to their normalizers. Like
+    ``QueryDict.get``, only the last value of a repeated parameter counts.
+    Views should filter and render with these values, so that requests
+    sharing a cache key get the same page.
+    """
+    return {name: normalize(query.get(name, '')) for name, normalize in params.items()}
+
+
+def canonical_query(query, params, defaults=None):
+    """Get the canonical form of a query string: its normalized, non-default parameters, sorted"""
+    defaults = defaults or {}
+    values = normalize_query(query, params)
+    return urlencode([
+        (name, values[name]) for name in sorted(values)
+        if values[name] and values[name] != defaults.get(name)
+    ])
+
+
+def get_page_generations(groups):
+    """Get the current generation token of each group, starting any that don't have one yet"""
+    keys = {group: GENERATION_CACHE_KEY.format(group=group) for group in groups}
+    found = cache.get_many(keys.values())
+    generations = []
+    for group, key in keys.items():
+        generation = found.get(key)
+        if generation is None:
+            # First use (or the cache was flushed): start a new generation
+            cache.add(key, uuid.uuid4().hex, None)
+            generation = cache.get(key)
+        generations.append(generation)
+    return generations
+
+
+def bump_page_generation(*groups):
+    """
+    Invalidate every cached page of the groups, once the current transaction commits.
+
+    Bumping before the commit would let a request still seeing the old rows
+    cache them under the new generation.
+    """
+    def bump():
+        cache.set_many({GENERATION_CACHE_KEY.format(group=group): uuid.uuid4().hex for group in groups}, None)
+
+    transaction.on_commit(bump)
+
+
+def page_cache_key(name, groups, query, args=()):
+    digest = hashlib.md5('|'.join([query, *map(str, args)]).encode()).hexdigest()
+    return PAGE_CACHE_KEY.format(name=name, generations='.'.join(get_page_generations(groups)), digest=digest)
+
+
+def _cacheable_request(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Pages show pending messages (without marking them as read here)
+    return not len(messages.get_messages(request))
+
+
+def _cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _cached_response(cached):
+    content, headers = cached
+    response = HttpResponse(content)
+    for header, value in headers:
+        response[header] = value
+    return response
+
+
+def cache_anonymous_page(name, groups, params, defaults=None, timeout=None):
+    """
+    Cache a view's responses to anonymous visitors, by canonical query string.
+
+    ``groups`` are the page generations the response depends on; ``params``
+    and ``defaults`` describe the query string (see ``canonical_query``).
+    Responses carrying a CSRF token or cookies, or anything but a 200, are
+    not cached.
+    Works on sync and async views alike.
+    """
+    def cache_key(request, args, kwargs):
+        return page_cache_key(
+            name, groups, canonical_query(request.GET, params, defaults), [*args, *sorted(kwargs.items())],
+        )
+
+    def store(key, response):
+        if hasattr(response, 'render'):
+            response.render()
+        # Headers set by the view (Content-Type, Vary...) are replayed with the content
+        cache.set(
+            key, (response.content, list(response.items())),
+            settings.PAGE_CACHE_SECONDS if timeout is None else timeout,
+        )
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                # Loading the user and messages may query the database, as may a
+                # database-backed cache, so these steps run in a worker thread
+                if not await sync_to_async(_cacheable_request)(request):
+                    return await view(request, *args, **kwargs)
+                key = await sync_to_async(cache_key)(request, args, kwargs)
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return _cached_response(cached)
+                with primary_reads():
+                    response = await view(request, *args, **kwargs)
+                if _cacheable_response(request, response):
+                    await sync_to_async(store)(key, response)
+                return response
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if not _cacheable_request(request):
+                    return view(request, *args, **kwargs)
+                key = cache_key(request, args, kwargs)
+                cached = cache.get(key)
+                if cached is not None:
+                    return _cached_response(cached)
+                with primary_reads():
+                    response = view(request, *args, **kwargs)
+                if _cacheable_response(request, response):
+                    store(key, response)
+                return response
+        return wrapper
+    return decorator
@@ -0,0 +1,136 @@
+"""
+Read replica routing.
+
+Views marked with ``read_only`` send their reads to one of the aliases in
+``settings.DATABASE_REPLICAS``; everything else, and every write, uses the
+default database. Replicas lag behind the primary, so after a session makes
+a write (any unsafe request) ``ReplicaPinningMiddleware`` pins that session
+to the primary for ``DATABASE_REPLICA_PIN_SECONDS``, and its own changes are
+visible on the next page it reads.
+
+Locally, replicas are SQLite copies of the database kept up to date with
+``manage.py sync_replicas``.
+"""
+
+import contextlib
+import contextvars
+import functools
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+PIN_COOKIE = 'db_primary_until'
+
+# Whether the current request may read from a replica
+_read_only = contextvars.ContextVar('read_only', default=False)
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+
+# Sessions are read to authenticate every request, and a lagging replica
+# would log out a user who just signed in
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+def replica_reads_allowed():
+    return _read_only.get() and not _pinned.get()
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Read from the primary within the block, even in a read-only view"""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def read_only(view):
+    """
+    Mark a view as making no writes that its own reads depend on, so it can read from replicas.
+    
+    The view must not create rows it expects to find missing (the replica may
+    simply not have them yet), and reads that guard access, such as privacy
+    settings, should go to the primary with ``.using('default')``.
+    """
+    # Async ORM calls run in a worker thread with a copy of the context, so the flag carries over
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            token = _read_only.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_only.reset(token)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _read_only.set(True)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _read_only.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Route reads in read-only views to a random replica"""
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if replicas and replica_reads_allowed() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema along with their data from the primary
+        return db not in getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@sync_and_async_middleware
+class ReplicaPinningMiddleware:
+    """Read from the primary for a while after a session writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _pinned.set(self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+        return self.pin_after_write(request, response)
+
+    async def __acall__(self, request):
+        token = _pinned.set(self.is_pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned.reset(token)
+        return self.pin_after_write(request, response)
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def pin_after_write(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and settings.DATABASE_REPLICAS:
+            seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from jobs.models import Job
+from profiles.models import Profile, ProfilePrivacySettings, ProfileSkill, Skill
+from .pagecache import bump_page_generation
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def job_changed(sender, instance, **kwargs):
+    bump_page_generation('jobs')
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=ProfileSkill)
+@receiver(post_delete, sender=ProfileSkill)
+@receiver(post_save, sender=ProfilePrivacySettings)
+@receiver(post_delete, sender=ProfilePrivacySettings)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def profile_listing_changed(sender, instance, **kwargs):
+    """Profile listings show (and search) profiles, their skills and visibility"""
+    bump_page_generation('profiles')
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Profile listings show and search candidates' names"""
+    # Logging in only records the time
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_page_generation('profiles')
@@ -0,0 +1,169 @@
+"""
+Static asset pipeline.
+
+``CompressedManifestStaticFilesStorage`` extends Django's manifest storage
+(which gives every file a content-hashed name at ``collectstatic`` time): once
+the hashed files are written, CSS is minified (JS too, when ``rjsmin`` is
+installed), and text assets get ``.gz`` and, when ``brotli`` is installed,
+``.br`` siblings, compressed once at their highest level.
+
+``serve`` serves ``STATIC_ROOT`` when Django itself serves static files. It
+picks the smallest precompressed variant the client accepts, and lets
+browsers cache hashed files forever, since their name changes with their
+content.
+"""
+
+import functools
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from rjsmin import jsmin
+except ImportError:
+    jsmin = None
+
+COMPRESSED_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.xml', '.html')
+# Smaller files gain too little from compression
+MIN_COMPRESS_SIZE = 256
+
+# Hashed files never change; everything else may, so is revalidated often
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CACHE_CONTROL = 'public, max-age=60'
+
+# Strings and comments, which CSS minification must not look inside
+CSS_STRING_OR_COMMENT_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)''', re.S)
+
+
+def _minify_css_code(css):
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r'([:(])\s+', r'\1', css)
+    css = re.sub(r'\s+([)!])', r'\1', css)
+    return css.replace(';}', '}')
+
+
+def minify_css(css):
+    """Drop comments and needless whitespace from a stylesheet, leaving strings alone"""
+    parts = []
+    code = ''
+    for index, part in enumerate(CSS_STRING_OR_COMMENT_RE.split(css)):
+        if index % 2 == 0:
+            code += part
+        elif part.startswith('/*'):
+            code += ' '
+        else:
+            parts.append(_minify_css_code(code))
+            parts.append(part)
+            code = ''
+    parts.append(_minify_css_code(code))
+    return ''.join(parts).strip()
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': jsmin,
+}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that minifies and precompresses the hashed files"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            self.minify(name)
+            self.compress(name)
+
+    def minify(self, name):
+        minify = MINIFIERS.get(os.path.splitext(name)[1])
+        if minify is None:
+            return
+        path = self.path(name)
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        minified = minify(source)
+        if minified != source:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(minified)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSED_EXTENSIONS):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            content = f.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(content, quality=11)
+        for suffix, compressed in variants.items():
+            # Only keep variants that are actually smaller
+            if len(compressed) < len(content):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+
+def _accepted_encodings(request):
+    """Get the content codings the client accepts (leaving out any with q=0)"""
+    encodings = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = next((param[2:] for param in params if param.startswith('q=')), '1')
+        try:
+            if float(quality) > 0:
+                encodings.add(coding.lower())
+        except ValueError:
+            continue
+    return encodings
+
+
+@functools.cache
+def _hashed_names():
+    # Only the manifest storage (used when DEBUG is off) hashes names
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve(request, path):
+    """Serve a collected static file, precompressed when the client accepts it"""
+    path = posixpath.normpath(path).lstrip('/')
+    full_path = safe_join(settings.STATIC_ROOT, path)
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    stat = os.stat(full_path)
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        accepted = _accepted_encodings(request)
+        serve_path, encoding = full_path, None
+        for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if coding in accepted and os.path.isfile(full_path + suffix):
+                serve_path, encoding = full_path + suffix, coding
+                break
+        response = FileResponse(open(serve_path, 'rb'), content_type=content_type)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if path in _hashed_names() else CACHE_CONTROL
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
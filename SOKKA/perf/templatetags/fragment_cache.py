@@ -0,0 +1,81 @@
+"""
+Caching of per-row template fragments.
+
+``{% fragment "profile_card" profile %}...{% endfragment %}`` caches what it
+encloses under the row's identity and version: the model, primary key, and
+``version`` field (or ``updated_at`` for models without one). A changed row
+gets a new key, so nothing is ever invalidated; old fragments expire after
+``FRAGMENT_CACHE_SECONDS``. The enclosed markup must depend on the row only.
+Anything that varies by viewer (a like button, "your profile") belongs
+outside the fragment.
+
+``{% prefetch_fragments "profile_card" page_obj %}`` before the loop fetches
+the fragments of every row on the page in one ``get_many``; each fragment
+then only renders (and stores) itself on a miss.
+
+Setting ``FRAGMENT_CACHE_SECONDS`` to 0 turns the caching off.
+"""
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+register = template.Library()
+
+FRAGMENT_CACHE_KEY = 'fragment:{name}:{model}:{pk}:{version}'
+
+# Where prefetched fragments are kept for the rest of the render
+PREFETCHED = 'fragment_cache.prefetched'
+
+
+def fragment_key(name, obj):
+    version = getattr(obj, 'version', None)
+    if version is None:
+        version = obj.updated_at.timestamp()
+    return FRAGMENT_CACHE_KEY.format(name=name, model=obj._meta.label_lower, pk=obj.pk, version=version)
+
+
+def _prefetched(context):
+    if PREFETCHED not in context.render_context:
+        context.render_context[PREFETCHED] = {}
+    return context.render_context[PREFETCHED]
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_fragments(context, name, objects):
+    """Fetch the named fragments of all the objects at once"""
+    if settings.FRAGMENT_CACHE_SECONDS:
+        keys = [fragment_key(name, obj) for obj in objects]
+        found = cache.get_many(keys)
+        # Misses are remembered too, so they aren't looked up again one by one
+        _prefetched(context).update({key: found.get(key) for key in keys})
+    return ''
+
+
+class FragmentNode(template.Node):
+    def __init__(self, name, obj, nodelist):
+        self.name = name
+        self.obj = obj
+        self.nodelist = nodelist
+
+    def render(self, context):
+        if not settings.FRAGMENT_CACHE_SECONDS:
+            return self.nodelist.render(context)
+        key = fragment_key(self.name.resolve(context), self.obj.resolve(context))
+        prefetched = _prefetched(context)
+        content = prefetched[key] if key in prefetched else cache.get(key)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, settings.FRAGMENT_CACHE_SECONDS)
+        return content
+
+
+@register.tag
+def fragment(parser, token):
+    """Cache the enclosed markup for one row: {% fragment "name" obj %}...{% endfragment %}"""
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f'{bits[0]} takes a fragment name and an object')
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(parser.compile_filter(bits[1]), parser.compile_filter(bits[2]), nodelist)
@@ -0,0 +1,191 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from jobs.models import Job, JobApplication
+from kanban.models import KanbanBoard
+from kanban.shortlist import shortlist_profiles
+from kanban.stages import invalidate_stages, stage_registry
+from profiles.models import Profile, ProfilePrivacySettings, ProfileSkill, Skill
+from . import metrics, pagecache
+from .explain import explain_queries, full_scans
+from .replicas import ReplicaRouter, read_only
+
+# Tables small and bounded enough that reading them whole is fine
+SMALL_TABLES = {'kanban_pipelinestage'}
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class HotViewQueryPlanTests(TestCase):
+    """The queries behind the hot views must all be answered through indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        invalidate_stages()
+        call_command('populate_stages', verbosity=0, stdout=io.StringIO())
+        skills = Skill.objects.bulk_create([Skill(name=f'Skill {i}') for i in range(50)])
+        users = User.objects.bulk_create([User(username=f'candidate-{i}') for i in range(300)])
+        profiles = Profile.objects.bulk_create([
+            Profile(user=user if i % 3 else None, headline=f'Engineer {i}', first_name='Sam')
+            for i, user in enumerate(users)
+        ])
+        ProfilePrivacySettings.objects.bulk_create([
+            ProfilePrivacySettings(profile=profile, profile_visibility='private' if i % 10 == 0 else 'public')
+            for i, profile in enumerate(profiles)
+        ])
+        ProfileSkill.objects.bulk_create([
+            ProfileSkill(profile=profile, skill=skills[(i + j) % len(skills)], proficiency_level='advanced')
+            for i, profile in enumerate(profiles)
+            for j in range(3)
+        ])
+        jobs = Job.objects.bulk_create([
+            Job(title=f'Job {i}', description='A job', is_active=i % 4 != 0) for i in range(300)
+        ])
+        cls.applicant = users[1]
+        JobApplication.objects.bulk_create([
+            JobApplication(job=job, applicant=cls.applicant, tailored_note='Hello') for job in jobs[:50]
+        ])
+
+        cls.recruiter = User.objects.create_user('recruiter')
+        shortlist_profiles(cls.recruiter, [profile.id for profile in profiles[:200]])
+        cls.board = KanbanBoard.objects.get(recruiter=cls.recruiter)
+        cls.profile_user = users[1]
+        cls.job = jobs[1]
+
+    def assertIndexedQueries(self, user, url):
+        """Request a page and check the plan of every query it ran"""
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertLess(response.status_code, 400, url)
+        for sql, plan in explain_queries(queries.captured_queries):
+            scans = full_scans(plan, SMALL_TABLES)
+            self.assertFalse(scans, f'{url} reads {", ".join(scans)} in full:\n{sql}\n' + '\n'.join(plan))
+
+    def test_job_list(self):
+        self.assertIndexedQueries(self.applicant, reverse('jobs:list'))
+
+    def test_job_detail(self):
+        self.assertIndexedQueries(self.applicant, reverse('jobs:detail', args=[self.job.id]))
+
+    def test_profile_list(self):
+        self.assertIndexedQueries(self.recruiter, reverse('profiles:profile_list'))
+        self.assertIndexedQueries(self.recruiter, reverse('profiles:profile_list') + '?page=3')
+
+    def test_public_profile_detail(self):
+        self.assertIndexedQueries(self.recruiter, reverse('profiles:public_profile_detail', args=[self.profile_user.id]))
+
+    def test_kanban_board(self):
+        self.assertIndexedQueries(self.recruiter, reverse('kanban:kanban_board'))
+
+    def test_column_page(self):
+        stage = stage_registry.get_first_stage(self.board.id)
+        self.assertIndexedQueries(self.recruiter, reverse('kanban:column_cards', args=[stage.id]) + '?limit=20')
+
+    def test_liked_profiles(self):
+        self.assertIndexedQueries(self.recruiter, reverse('kanban:get_liked_profiles'))
+
+    def test_filter_cards_by_skill(self):
+        self.assertIndexedQueries(self.recruiter, reverse('kanban:filter_cards') + '?skill=Skill+3&level=intermediate')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class PageCacheTests(TestCase):
+    """Anonymous pages are built from the primary and replayed with their headers"""
+
+    def setUp(self):
+        self.calls = []
+
+        @pagecache.cache_anonymous_page('tests:page', groups=['tests'], params={'q': pagecache.text})
+        @read_only
+        def view(request):
+            # Where this view's reads would go
+            self.calls.append(ReplicaRouter().db_for_read(Profile))
+            response = HttpResponse('page', content_type='text/plain')
+            patch_vary_headers(response, ['Accept-Language'])
+            return response
+
+        self.view = view
+        # Start from an empty cache for the page
+        with self.captureOnCommitCallbacks(execute=True):
+            pagecache.bump_page_generation('tests')
+        self.request = RequestFactory().get('/', {'q': 'x'})
+        self.request.user = AnonymousUser()
+        self.request._messages = []
+
+    def test_pages_built_for_the_cache_read_the_primary(self):
+        self.view(self.request)
+        self.assertEqual(self.calls, [None])
+        # Uncached requests still read from replicas
+        self.request.user = User(username='someone')
+        self.view(self.request)
+        self.assertEqual(self.calls, [None, 'replica_0'])
+
+    def test_cached_page_keeps_its_headers(self):
+        first = self.view(self.request)
+        second = self.view(self.request)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], 'text/plain')
+        self.assertEqual(second['Vary'], 'Accept-Language')
+
+
+class MetricsFileTests(TestCase):
+    """Workers share their totals through files in METRICS_DIR"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.registry = metrics.MetricsRegistry()
+        self.registry.record('jobs:list', 0.01, 2, 0.001, 0.002, 100)
+
+    def write(self, name, views, age=0):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            json.dump(views, f)
+        os.utime(path, (time.time() - age, time.time() - age))
+
+    def test_file_is_named_by_a_token_not_just_the_pid(self):
+        self.registry.flush(self.directory, force=True)
+        [name] = os.listdir(self.directory)
+        self.assertTrue(name.startswith(f'{os.getpid()}-'))
+        self.assertNotEqual(name, metrics.MetricsRegistry().file_name())
+
+    @override_settings(METRICS_STALE_SECONDS=60)
+    def test_collect_adds_up_live_workers_and_prunes_exited_ones(self):
+        other = metrics.MetricsRegistry()
+        other.record('jobs:list', 0.02, 3, 0.001, 0.002, 50)
+        self.write('1-live.json', other.snapshot())
+        self.write('2-exited.json', other.snapshot(), age=120)
+        self.write('3-exited.json.1.tmp', {}, age=120)
+        with override_settings(METRICS_DIR=self.directory):
+            totals = self.registry.collect()
+        self.assertEqual((totals['jobs:list']['requests'], totals['jobs:list']['queries']), (2, 5))
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(['1-live.json', self.registry.file_name()]))
+
+    async def test_async_requests_flush_off_the_event_loop(self):
+        async def get_response(request):
+            return HttpResponse('ok')
+
+        threads = []
+        middleware = metrics.MetricsMiddleware(get_response)
+        with override_settings(METRICS_DIR=self.directory), \
+                mock.patch.object(metrics.registry, 'flush', side_effect=lambda directory: threads.append(threading.get_ident())), \
+                mock.patch.object(metrics.registry, 'flush_due', return_value=True):
+            await middleware(RequestFactory().get('/'))
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
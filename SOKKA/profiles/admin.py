@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, Skill, ProfileSkill, Education, WorkExperience, Link, ProfilePrivacySettings
+from .models import Profile, Skill, ProfileSkill, Education, WorkExperience, Link, ProfilePrivacySettings, ProfileExport
 
 
 class ProfileSkillInline(admin.TabularInline):
@@ -104,4 +104,13 @@ class ProfilePrivacySettingsAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ProfileExport)
+class ProfileExportAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'format', 'profile_version', 'visibility_mask', 'status', 'requested_at', 'rendered_at']
+    list_filter = ['format', 'status']
+    search_fields = ['profile__user__first_name', 'profile__user__last_name']
+    readonly_fields = ['requested_at', 'rendered_at']
+    exclude = ['content']
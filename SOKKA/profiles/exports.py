@@ -0,0 +1,254 @@
+"""
+Profile exports (PDF and JSON Resume).
+
+Exports are rendered off the request path by the background task workers
+(see ``tasks.queue``) and stored as ``ProfileExport`` rows keyed by (profile version, visibility mask),
+so any later request for the same profile state is served straight from the
+stored artifact. Saving a profile or one of its sections bumps
+``Profile.version`` (see ``profiles.signals``), which invalidates every
+artifact rendered for the previous version.
+"""
+
+import json
+import logging
+import textwrap
+
+from django.utils import timezone
+
+from tasks.queue import task
+from .models import Profile, ProfileExport, ProfilePrivacySettings
+
+logger = logging.getLogger(__name__)
+
+# Order matters: a field's index is its bit in the visibility mask
+VISIBILITY_FIELDS = (
+    'email', 'phone', 'location', 'bio', 'skills',
+    'work_experience', 'education', 'links', 'profile_picture',
+)
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'json': 'application/json',
+}
+
+# Pending exports older than this are assumed lost (e.g. no worker is running)
+STALE_PENDING_SECONDS = 300
+
+
+def get_visible_fields(profile):
+    """Get the visible fields for a profile, defaulting to public when no settings exist"""
+    try:
+        privacy_settings = profile.privacy_settings
+    except ProfilePrivacySettings.DoesNotExist:
+        privacy_settings = ProfilePrivacySettings(profile=profile)
+    return privacy_settings.get_visible_fields()
+
+
+def visibility_mask(visible_fields):
+    """Pack a list of visible field names into an integer bitmask"""
+    mask = 0
+    for bit, field in enumerate(VISIBILITY_FIELDS):
+        if field in visible_fields:
+            mask |= 1 << bit
+    return mask
+
+
+def fields_from_mask(mask):
+    """Unpack a visibility bitmask into the list of visible field names"""
+    return [field for bit, field in enumerate(VISIBILITY_FIELDS) if mask & (1 << bit)]
+
+
+def build_resume(profile, visible_fields):
+    """Build a JSON Resume (https://jsonresume.org/schema) dict for a profile"""
+    basics = {
+        'name': profile.get_full_name(),
+        'label': profile.headline,
+    }
+    if 'email' in visible_fields and profile.get_email():
+        basics['email'] = profile.get_email()
+    if 'phone' in visible_fields and profile.phone:
+        basics['phone'] = profile.phone
+    if 'bio' in visible_fields and profile.bio:
+        basics['summary'] = profile.bio
+    if 'location' in visible_fields and profile.location:
+        basics['location'] = {'address': profile.location}
+    if 'links' in visible_fields:
+        basics['profiles'] = [
+            {'network': link.get_link_type_display(), 'url': link.url, 'username': link.title}
+            for link in profile.links.all()
+        ]
+
+    resume = {'basics': basics}
+    if 'work_experience' in visible_fields:
+        resume['work'] = [
+            {
+                'name': work.company,
+                'position': work.position,
+                'location': work.location,
+                'startDate': work.start_date.isoformat(),
+                'endDate': work.end_date.isoformat() if work.end_date else None,
+                'summary': work.description,
+            }
+            for work in profile.work_experiences.all()
+        ]
+    if 'education' in visible_fields:
+        resume['education'] = [
+            {
+                'institution': education.institution,
+                'studyType': education.degree,
+                'area': education.field_of_study,
+                'startDate': education.start_date.isoformat(),
+                'endDate': education.end_date.isoformat() if education.end_date else None,
+                'score': str(education.gpa) if education.gpa is not None else None,
+            }
+            for education in profile.educations.all()
+        ]
+    if 'skills' in visible_fields:
+        resume['skills'] = [
+            {'name': profile_skill.skill.name, 'level': profile_skill.get_proficiency_level_display()}
+            for profile_skill in profile.profile_skills.all()
+        ]
+    return resume
+
+
+def render_json(resume):
+    """Render a resume dict as JSON Resume bytes"""
+    return json.dumps(resume, indent=2).encode('utf-8')
+
+
+def _resume_lines(resume):
+    """Flatten a resume dict into plain text lines for the PDF renderer"""
+    basics = resume['basics']
+    lines = [basics['name'], basics.get('label', ''), '']
+    for key in ('email', 'phone'):
+        if basics.get(key):
+            lines.append(basics[key])
+    if basics.get('location'):
+        lines.append(basics['location']['address'])
+    if basics.get('summary'):
+        lines += ['', 'Summary'] + textwrap.wrap(basics['summary'], 90)
+
+    if resume.get('work'):
+        lines += ['', 'Work Experience']
+        for work in resume['work']:
+            lines.append(f"{work['position']} at {work['name']} ({work['startDate']} - {work['endDate'] or 'Present'})")
+            lines += textwrap.wrap(work['summary'] or '', 90)
+    if resume.get('education'):
+        lines += ['', 'Education']
+        for education in resume['education']:
+            lines.append(f"{education['studyType']} {education['area'] or ''} - {education['institution']}".strip())
+    if resume.get('skills'):
+        lines += ['', 'Skills']
+        lines += textwrap.wrap(', '.join(f"{skill['name']} ({skill['level']})" for skill in resume['skills']), 90)
+    if basics.get('profiles'):
+        lines += ['', 'Links']
+        lines += [f"{link['network']}: {link['url']}" for link in basics['profiles']]
+    return lines
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def render_pdf(resume, lines_per_page=60):
+    """Render a resume dict as a minimal single-font PDF document"""
+    lines = _resume_lines(resume)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # page tree, filled in once the page object numbers are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    page_refs = []
+    for page in pages:
+        text = ['BT', '/F1 10 Tf', '12 TL', '50 800 Td']
+        text += [f'({_pdf_escape(line)}) Tj T*' for line in page]
+        text.append('ET')
+        stream = '\n'.join(text).encode('latin-1', errors='replace')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = b' '.join(b'%d 0 R' % ref for ref in page_refs)
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_refs))
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref_offset = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+RENDERERS = {
+    'pdf': render_pdf,
+    'json': render_json,
+}
+
+
+# Someone is waiting for the download, so exports go ahead of batch work
+@task(name='profiles.render_export', priority=10)
+def render_export(export_id):
+    """Render a pending export and store the artifact"""
+    try:
+        export = ProfileExport.objects.get(id=export_id, status='pending')
+    except ProfileExport.DoesNotExist:
+        return
+    profile = Profile.objects.select_related('user').prefetch_related(
+        'profile_skills__skill', 'work_experiences', 'educations', 'links'
+    ).get(id=export.profile_id)
+
+    try:
+        resume = build_resume(profile, fields_from_mask(export.visibility_mask))
+        export.content = RENDERERS[export.format](resume)
+        export.status = 'ready'
+        export.error = ''
+    except Exception as e:
+        logger.exception('Rendering %s export %s failed', export.format, export.id)
+        export.status = 'failed'
+        export.error = str(e)
+    export.rendered_at = timezone.now()
+    export.save(update_fields=['content', 'status', 'error', 'rendered_at'])
+
+    if export.status == 'ready':
+        # Artifacts for older profile versions can never be served again
+        ProfileExport.objects.filter(
+            profile_id=export.profile_id,
+            format=export.format,
+            profile_version__lt=export.profile_version,
+        ).delete()
+
+
+def request_export(profile, export_format):
+    """
+    Get the export for the profile's current version and visibility.
+
+    Returns the ``ProfileExport`` row; if it isn't ready yet, rendering is
+    scheduled once the surrounding transaction commits.
+    """
+    mask = visibility_mask(get_visible_fields(profile))
+    export, created = ProfileExport.objects.get_or_create(
+        profile=profile,
+        format=export_format,
+        profile_version=profile.version,
+        visibility_mask=mask,
+    )
+    if export.status == 'ready':
+        return export
+
+    stale = (timezone.now() - export.requested_at).total_seconds() > STALE_PENDING_SECONDS
+    if created or export.status == 'failed' or stale:
+        if not created:
+            ProfileExport.objects.filter(id=export.id).update(status='pending', requested_at=timezone.now())
+            export.status = 'pending'
+        render_export.enqueue_on_commit(export.id)
+    return export
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_profileprivacysettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped whenever the profile or one of its sections changes'),
+        ),
+        migrations.CreateModel(
+            name='ProfileExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('pdf', 'PDF'), ('json', 'JSON Resume')], max_length=10)),
+                ('profile_version', models.PositiveIntegerField()),
+                ('visibility_mask', models.PositiveIntegerField(help_text='Bitmask of the visible fields the export was rendered with')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('content', models.BinaryField(blank=True, default=b'')),
+                ('error', models.TextField(blank=True)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('rendered_at', models.DateTimeField(blank=True, null=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exports', to='profiles.profile')),
+            ],
+            options={
+                'unique_together': {('profile', 'format', 'profile_version', 'visibility_mask')},
+            },
+        ),
+    ]
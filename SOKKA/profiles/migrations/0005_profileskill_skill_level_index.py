@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_profile_version_profileexport'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profileskill',
+            index=models.Index(fields=['skill', 'proficiency_level', 'profile'], name='profiles_skill_level_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_profileskill_skill_level_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('user__isnull', False)), fields=['-updated_at'], name='profiles_listed_recent_idx'),
+        ),
+    ]
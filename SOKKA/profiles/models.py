@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
@@ -17,11 +18,32 @@ class Profile(models.Model):
     location = models.CharField(max_length=100, blank=True, help_text="City, State/Country")
     phone = models.CharField(max_length=20, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    version = models.PositiveIntegerField(default=0, editable=False, help_text="Bumped whenever the profile or one of its sections changes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # The browse page: profiles with an account, most recently updated first
+            models.Index(fields=['-updated_at'], name='profiles_listed_recent_idx', condition=models.Q(user__isnull=False)),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # The version is only ever bumped in the database (as profiles.signals does),
+        # in the same UPDATE, so saving a stale instance can't reuse a version
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (update_fields is not None and not update_fields):
+            super().save(*args, **kwargs)
+            return
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        self.version = F('version') + 1
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            # Loaded from the database on first access, if anything needs it
+            del self.version
     
     def __str__(self):
         if self.user:
@@ -57,21 +79,34 @@ class Skill(models.Model):
 
 class ProfileSkill(models.Model):
     """Many-to-many relationship between Profile and Skill with proficiency level"""
+    # Lowest to highest
+    PROFICIENCY_CHOICES = [
+        ('beginner', 'Beginner'),
+        ('intermediate', 'Intermediate'),
+        ('advanced', 'Advanced'),
+        ('expert', 'Expert'),
+    ]
+    
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='profile_skills')
     skill = models.ForeignKey(Skill, on_delete=models.CASCADE)
     proficiency_level = models.CharField(
         max_length=20,
-        choices=[
-            ('beginner', 'Beginner'),
-            ('intermediate', 'Intermediate'),
-            ('advanced', 'Advanced'),
-            ('expert', 'Expert'),
-        ],
+        choices=PROFICIENCY_CHOICES,
         default='intermediate'
     )
     
     class Meta:
         unique_together = ['profile', 'skill']
+        indexes = [
+            # Finds the profiles with a skill at given levels without touching the table
+            models.Index(fields=['skill', 'proficiency_level', 'profile'], name='profiles_skill_level_idx'),
+        ]
+    
+    @classmethod
+    def levels_at_least(cls, level):
+        """Get the proficiency levels at or above ``level``"""
+        levels = [value for value, label in cls.PROFICIENCY_CHOICES]
+        return levels[levels.index(level):]
     
     def __str__(self):
         return f"{self.profile.user.get_full_name()} - {self.skill.name} ({self.proficiency_level})"
@@ -234,4 +269,33 @@ class ProfilePrivacySettings(models.Model):
                 visible_fields.append('links')
             if self.show_profile_picture:
                 visible_fields.append('profile_picture')
-            return visible_fields
\ No newline at end of file
+            return visible_fields
+
+
+class ProfileExport(models.Model):
+    """Rendered profile export, keyed by profile version and visibility mask"""
+    FORMAT_CHOICES = [
+        ('pdf', 'PDF'),
+        ('json', 'JSON Resume'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='exports')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    profile_version = models.PositiveIntegerField()
+    visibility_mask = models.PositiveIntegerField(help_text="Bitmask of the visible fields the export was rendered with")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    content = models.BinaryField(blank=True, default=b'')
+    error = models.TextField(blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    rendered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['profile', 'format', 'profile_version', 'visibility_mask']
+    
+    def __str__(self):
+        return f"{self.get_format_display()} export of {self.profile.get_full_name()} (v{self.profile_version})"
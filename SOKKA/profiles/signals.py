@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Profile, ProfileSkill, Education, WorkExperience, Link, Skill
+
+
+def bump_profile_version(profile_id):
+    """Mark a profile as changed so cached renderings of it are invalidated"""
+    Profile.objects.filter(id=profile_id).update(version=F('version') + 1)
+
+
+@receiver(post_save, sender=ProfileSkill)
+@receiver(post_delete, sender=ProfileSkill)
+@receiver(post_save, sender=Education)
+@receiver(post_delete, sender=Education)
+@receiver(post_save, sender=WorkExperience)
+@receiver(post_delete, sender=WorkExperience)
+@receiver(post_save, sender=Link)
+@receiver(post_delete, sender=Link)
+def profile_section_changed(sender, instance, **kwargs):
+    """Any change to a profile section is a change to the profile"""
+    bump_profile_version(instance.profile_id)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Profiles show their user's name"""
+    # Logging in only records the time
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    Profile.objects.filter(user=instance).update(version=F('version') + 1)
+
+
+@receiver(post_save, sender=Skill)
+def skill_changed(sender, instance, created, **kwargs):
+    """Profiles show the names of their skills"""
+    if not created:
+        Profile.objects.filter(profile_skills__skill=instance).update(version=F('version') + 1)
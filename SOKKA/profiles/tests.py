@@ -1,3 +1,85 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from .models import Profile, ProfileExport, ProfilePrivacySettings
+
+
+class ProfileVersionTests(TestCase):
+    """Profile.version must change with every save, and never go back to a used number"""
+
+    def setUp(self):
+        self.profile = Profile.objects.create(headline='Engineer', first_name='Sam')
+
+    def test_save_bumps_version(self):
+        version = self.profile.version
+        self.profile.headline = 'Senior engineer'
+        self.profile.save()
+        self.assertEqual(self.profile.version, version + 1)
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).version, version + 1)
+
+    def test_save_is_a_single_update(self):
+        self.profile.headline = 'Senior engineer'
+        with CaptureQueriesContext(connection) as queries:
+            self.profile.save()
+        # Signal receivers in other apps may run their own queries
+        own = [query['sql'] for query in queries if '"profiles_profile"' in query['sql']]
+        self.assertEqual(len(own), 1)
+        self.assertTrue(own[0].startswith('UPDATE'))
+
+    def test_save_with_update_fields_bumps_version(self):
+        version = self.profile.version
+        self.profile.headline = 'Senior engineer'
+        self.profile.save(update_fields=['headline'])
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).version, version + 1)
+
+    def test_stale_instance_does_not_reuse_a_version(self):
+        stale = Profile.objects.get(pk=self.profile.pk)
+        # A section change bumps the version in the database only
+        Profile.objects.filter(pk=self.profile.pk).update(version=self.profile.version + 1)
+        used = self.profile.version + 1
+        stale.bio = 'Changed'
+        stale.save()
+        self.assertGreater(stale.version, used)
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).version, stale.version)
+
+
+class PublicProfileDetailTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', first_name='Sam')
+        self.profile = Profile.objects.create(user=self.owner, headline='Engineer', bio='Builds things')
+        self.client.force_login(User.objects.create_user('recruiter'))
+
+    def test_missing_privacy_settings_are_not_created(self):
+        response = self.client.get(reverse('profiles:public_profile_detail', args=[self.owner.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Builds things')
+        self.assertFalse(ProfilePrivacySettings.objects.filter(profile=self.profile).exists())
+
+    def test_private_profile_hides_details(self):
+        ProfilePrivacySettings.objects.create(profile=self.profile, profile_visibility='private')
+        response = self.client.get(reverse('profiles:public_profile_detail', args=[self.owner.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Builds things')
+
+
+class ExportProfileTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', first_name='Sam')
+        self.profile = Profile.objects.create(user=self.owner, headline='Engineer')
+        self.client.force_login(User.objects.create_user('recruiter'))
+
+    def test_private_profile_is_not_exported(self):
+        ProfilePrivacySettings.objects.create(profile=self.profile, profile_visibility='private')
+        response = self.client.get(reverse('profiles:export_profile', args=[self.owner.id, 'json']))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(ProfileExport.objects.exists())
+
+    def test_public_profile_export_is_queued(self):
+        response = self.client.get(reverse('profiles:export_profile', args=[self.owner.id, 'json']))
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(ProfileExport.objects.filter(profile=self.profile).exists())
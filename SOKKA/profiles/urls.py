@@ -33,6 +33,7 @@ urlpatterns = [
     # Public profiles (for recruiters)
     path('browse/', views.profile_list, name='profile_list'),
     path('view/<int:user_id>/', views.public_profile_detail, name='public_profile_detail'),
+    path('view/<int:user_id>/export/<str:export_format>/', views.export_profile, name='export_profile'),
     
     # Privacy settings
     path('privacy/', views.privacy_settings, name='privacy_settings'),
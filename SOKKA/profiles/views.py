@@ -1,13 +1,18 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.contrib.auth.models import User
 from .models import Profile, ProfileSkill, Education, WorkExperience, Link, Skill, ProfilePrivacySettings
 from .forms import ProfileForm, ProfileSkillForm, EducationForm, WorkExperienceForm, LinkForm, SkillSearchForm, ProfilePrivacySettingsForm
+from . import exports
+from kanban.models import ProfileLike
+from perf import pagecache
+from perf.replicas import read_only
 
 
 def get_current_profile(request):
@@ -327,17 +332,23 @@ def delete_link(request, link_id):
     return redirect('profiles:profile_detail')
 
 
-def search_skills(request):
+@read_only
+async def search_skills(request):
     """AJAX endpoint for searching skills"""
     if request.method == 'GET':
         search_term = request.GET.get('search', '')
         if len(search_term) >= 2:
             skills = Skill.objects.filter(name__icontains=search_term)[:10]
-            skill_data = [{'id': skill.id, 'name': skill.name} for skill in skills]
+            skill_data = [{'id': skill.id, 'name': skill.name} async for skill in skills]
             return JsonResponse({'skills': skill_data})
     return JsonResponse({'skills': []})
 
 
+@pagecache.cache_anonymous_page(
+    'profiles:profile_list', groups=['profiles'],
+    params={'search': pagecache.text, 'page': pagecache.integer}, defaults={'page': '1'},
+)
+@read_only
 def profile_list(request):
     """List all public profiles (for recruiters to browse)"""
     # Only show profiles that have users (since public_profile_detail requires user_id)
@@ -347,7 +358,7 @@ def profile_list(request):
     profiles = profiles.exclude(privacy_settings__profile_visibility='private')
     
     # Add search functionality
-    search_query = request.GET.get('search', '')
+    search_query = request.GET.get('search', '').strip()
     if search_query:
         profiles = profiles.filter(
             Q(headline__icontains=search_query) |
@@ -362,6 +373,16 @@ def profile_list(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
+    # Liked state for just the profiles on this page, in a single IN query
+    liked_ids = set()
+    if request.user.is_authenticated:
+        liked_ids = set(ProfileLike.objects.filter(
+            recruiter=request.user,
+            profile_id__in=[profile.id for profile in page_obj],
+        ).values_list('profile_id', flat=True))
+    for profile in page_obj:
+        profile.is_liked = profile.id in liked_ids
+    
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
@@ -369,17 +390,17 @@ def profile_list(request):
     return render(request, 'profiles/profile_list.html', context)
 
 
-def public_profile_detail(request, user_id):
+@read_only
+async def public_profile_detail(request, user_id):
     """View a public profile (for recruiters)"""
-    user = get_object_or_404(User, id=user_id)
-    profile = get_object_or_404(Profile, user=user)
+    profile = await aget_object_or_404(Profile.objects.select_related('user'), user_id=user_id)
     
-    # Get privacy settings
-    try:
-        privacy_settings = profile.privacy_settings
-    except ProfilePrivacySettings.DoesNotExist:
-        # Create default privacy settings if they don't exist
-        privacy_settings = ProfilePrivacySettings.objects.create(profile=profile)
+    # Privacy settings come from the primary: a lagging replica could still
+    # show a profile its owner just made private
+    privacy_settings = await ProfilePrivacySettings.objects.using('default').filter(profile=profile).afirst()
+    if privacy_settings is None:
+        # No settings saved yet: the defaults apply (without writing from a read-only view)
+        privacy_settings = ProfilePrivacySettings(profile=profile)
     
     # Check if profile should be visible
     if privacy_settings.profile_visibility == 'private':
@@ -394,23 +415,53 @@ def public_profile_detail(request, user_id):
             'is_private': True,
             'privacy_settings': privacy_settings,
         }
-        return render(request, 'profiles/public_profile_detail.html', context)
+        return await sync_to_async(render)(request, 'profiles/public_profile_detail.html', context)
     
     # Get visible fields based on privacy settings
     visible_fields = privacy_settings.get_visible_fields()
     
+    async def section(queryset, field):
+        return [item async for item in queryset] if field in visible_fields else []
+    
     context = {
         'profile': profile,
-        'profile_skills': profile.profile_skills.select_related('skill').all() if 'skills' in visible_fields else [],
-        'educations': profile.educations.all() if 'education' in visible_fields else [],
-        'work_experiences': profile.work_experiences.all() if 'work_experience' in visible_fields else [],
-        'links': profile.links.all() if 'links' in visible_fields else [],
+        'profile_skills': await section(profile.profile_skills.select_related('skill'), 'skills'),
+        'educations': await section(profile.educations.all(), 'education'),
+        'work_experiences': await section(profile.work_experiences.all(), 'work_experience'),
+        'links': await section(profile.links.all(), 'links'),
         'is_public': True,
         'is_private': False,
         'privacy_settings': privacy_settings,
         'visible_fields': visible_fields,
     }
-    return render(request, 'profiles/public_profile_detail.html', context)
+    # Rendering looks at the viewer (request.user), which may need the database
+    return await sync_to_async(render)(request, 'profiles/public_profile_detail.html', context)
+
+
+@login_required
+def export_profile(request, user_id, export_format):
+    """Download a profile export, rendering it in the background if needed"""
+    if export_format not in exports.RENDERERS:
+        return JsonResponse({'status': 'error', 'message': 'Unsupported export format'}, status=400)
+    
+    profile = get_object_or_404(Profile.objects.select_related('user', 'privacy_settings'), user_id=user_id)
+    # Checked on the primary, as public_profile_detail does
+    privacy_settings = ProfilePrivacySettings.objects.using('default').filter(profile=profile).first()
+    if privacy_settings is not None and privacy_settings.profile_visibility == 'private':
+        raise Http404('No Profile matches the given query.')
+    
+    export = exports.request_export(profile, export_format)
+    
+    if export.status != 'ready':
+        # Not rendered yet; the client polls this URL until it is
+        return JsonResponse({
+            'status': 'pending',
+            'message': 'Your export is being prepared. Please try again shortly.',
+        }, status=202)
+    
+    response = HttpResponse(bytes(export.content), content_type=exports.CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="profile-{user_id}-v{export.profile_version}.{export_format}"'
+    return response
 
 
 def privacy_settings(request):
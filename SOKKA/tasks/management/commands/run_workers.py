@@ -0,0 +1,97 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from tasks import queue
+
+logger = logging.getLogger('tasks.worker')
+
+
+def work(number, options, stopping):
+    """Claim and run tasks until asked to stop"""
+    # Connections inherited from the parent must not be shared
+    connections.close_all()
+    # The parent decides when to stop (a Ctrl-C or service stop reaches the whole process group)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    housekeeping_at = 0.0
+    completed = 0
+
+    while not stopping.is_set():
+        close_old_connections()
+        if number == 0 and time.monotonic() >= housekeeping_at:
+            # One worker looks after tasks stuck with dead workers and old results
+            requeued, failed = queue.requeue_expired()
+            if requeued or failed:
+                logger.warning('Requeued %d and failed %d tasks whose worker stopped responding', requeued, failed)
+            queue.purge_finished()
+            housekeeping_at = time.monotonic() + settings.TASKS_LEASE_SECONDS / 2
+
+        claimed = queue.claim(options['batch'], options['names'])
+        if not claimed:
+            stopping.wait(options['poll'])
+            continue
+        for index, task in enumerate(claimed):
+            if stopping.is_set():
+                queue.release(claimed[index:])
+                break
+            queue.run(task)
+            completed += 1
+        if options['max_tasks'] and completed >= options['max_tasks']:
+            break
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run background task workers: a pool of processes claiming tasks from the queue table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 2, help='Worker processes')
+        parser.add_argument('--batch', type=int, default=10, help='Tasks claimed at once by a worker')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--task', action='append', dest='names', help='Only run tasks with this name (repeatable)')
+        parser.add_argument('--max-tasks', type=int, default=0,
+                            help='Restart a worker after this many tasks (0: never)')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        stopping = context.Event()
+        workers = {}
+
+        def start(number):
+            process = context.Process(target=work, args=(number, options, stopping), name=f'task-worker-{number}')
+            process.start()
+            workers[number] = process
+
+        stop_requested = []
+
+        def stop(signum, frame):
+            # Setting the event here could deadlock with the main thread holding its lock
+            stop_requested.append(signum)
+
+        connections.close_all()
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+        for number in range(options['processes']):
+            start(number)
+        self.stdout.write(f'Started {options["processes"]} task workers ({", ".join(sorted(queue.registry))})')
+
+        while not stop_requested:
+            time.sleep(1)
+            for number, process in list(workers.items()):
+                if not process.is_alive() and not stop_requested:
+                    # Recycled after --max-tasks, or crashed: start a fresh one
+                    if process.exitcode:
+                        logger.error('Task worker %d exited with code %d', number, process.exitcode)
+                    start(number)
+
+        stopping.set()
+        self.stdout.write('Stopping: waiting for running tasks to finish...')
+        for process in workers.values():
+            process.join()
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """A call of a registered task function, queued for a worker (see tasks.queue)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200, help_text="Registered name of the task function")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0, help_text="Higher runs first")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(help_text="Not run before this time (used for delays and retry backoff)")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    claimed_by = models.CharField(max_length=64, blank=True, help_text="Claim token of the worker running the task")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claiming: queued tasks by priority, then due time
+            models.Index(fields=['-priority', 'run_at', 'id'], name='tasks_queued_idx', condition=models.Q(status='queued')),
+            # Requeueing tasks of workers that died
+            models.Index(fields=['claimed_at'], name='tasks_running_idx', condition=models.Q(status='running')),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
@@ -0,0 +1,165 @@
+"""
+Database-backed task queue.
+
+Slow work (rendering exports, recomputing recommendations, sending digests)
+runs in ``manage.py run_workers`` processes rather than in requests. A task
+is a function registered with ``@task``; calling ``.enqueue(...)`` stores a
+``Task`` row with its JSON arguments, and a worker picks it up. There is no
+broker: the table is the queue.
+
+Workers claim a batch of due tasks, highest priority first, by stamping them
+with a claim token. Where the database supports ``SELECT ... FOR UPDATE SKIP
+LOCKED`` the batch is picked that way, so workers never wait on each other's
+rows; on SQLite, which serializes writers anyway, a single ``UPDATE ...
+WHERE id IN (SELECT ... LIMIT n)`` claims the batch atomically. A failed task
+is retried with exponential backoff until it runs out of attempts. Tasks left
+running by a worker that died are requeued once their lease expires.
+
+Apps register their tasks when they are loaded (by importing the modules
+that define them from ``AppConfig.ready``), so workers know every task.
+
+Enqueueing inside a transaction stores the task as part of it, so it only
+becomes visible to workers if the transaction commits. ``enqueue_on_commit``
+instead waits for the commit before storing anything.
+"""
+
+import datetime
+import logging
+import random
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Task functions by registered name
+registry = {}
+
+
+class TaskFunction:
+    """A function that can be queued to run in a worker"""
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, priority=None, delay=None, **kwargs):
+        """Queue a call; ``delay`` (seconds) holds it back, ``priority`` overrides the task's"""
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + datetime.timedelta(seconds=delay or 0),
+        )
+
+    def enqueue_on_commit(self, *args, **kwargs):
+        """Queue a call once the current transaction commits (right away outside one)"""
+        transaction.on_commit(lambda: self.enqueue(*args, **kwargs))
+
+
+def task(func=None, *, name=None, priority=0, max_attempts=3):
+    """Register a function as a task: ``@task`` or ``@task(priority=10, max_attempts=5)``"""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        if task_name in registry:
+            raise ValueError(f'A task named {task_name!r} is already registered')
+        registry[task_name] = TaskFunction(func, task_name, priority, max_attempts)
+        return registry[task_name]
+    return decorator(func) if func is not None else decorator
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a task that has failed ``attempts`` times"""
+    delay = settings.TASKS_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    # Jitter keeps tasks that failed together from retrying together
+    return min(delay, settings.TASKS_MAX_RETRY_BACKOFF_SECONDS) * random.uniform(0.5, 1)
+
+
+def claim(batch_size, names=None):
+    """Claim up to ``batch_size`` due tasks for this worker, highest priority first"""
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    due = Task.objects.filter(status='queued', run_at__lte=now)
+    if names:
+        due = due.filter(name__in=names)
+    due = due.order_by('-priority', 'run_at', 'id')
+    claimed = {'status': 'running', 'claimed_by': token, 'claimed_at': now, 'attempts': F('attempts') + 1}
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size])
+            Task.objects.filter(id__in=ids).update(**claimed)
+        else:
+            # One statement, so no other worker can claim a task in between
+            Task.objects.filter(id__in=due.values('id')[:batch_size], status='queued').update(**claimed)
+    return list(Task.objects.filter(claimed_by=token, status='running').order_by('-priority', 'run_at', 'id'))
+
+
+def run(claimed):
+    """Run a claimed task and record how it went"""
+    function = registry.get(claimed.name)
+    try:
+        if function is None:
+            raise LookupError(f'No task named {claimed.name!r} is registered')
+        function(*claimed.args, **claimed.kwargs)
+    except Exception as e:
+        logger.exception('Task %s (%s) failed on attempt %d', claimed.id, claimed.name, claimed.attempts)
+        if claimed.attempts < claimed.max_attempts and function is not None:
+            claimed.status = 'queued'
+            claimed.run_at = timezone.now() + datetime.timedelta(seconds=retry_delay(claimed.attempts))
+        else:
+            claimed.status = 'failed'
+            claimed.finished_at = timezone.now()
+        claimed.last_error = f'{type(e).__name__}: {e}'
+    else:
+        claimed.status = 'done'
+        claimed.finished_at = timezone.now()
+    # Only the worker holding the claim may record the outcome
+    Task.objects.filter(id=claimed.id, claimed_by=claimed.claimed_by).update(
+        status=claimed.status, run_at=claimed.run_at, finished_at=claimed.finished_at, last_error=claimed.last_error,
+        claimed_by='', claimed_at=None,
+    )
+    return claimed.status
+
+
+def release(claimed):
+    """Hand claimed tasks that weren't started back to the queue"""
+    return Task.objects.filter(
+        id__in=[task.id for task in claimed], claimed_by__in={task.claimed_by for task in claimed}, status='running',
+    ).update(status='queued', claimed_by='', claimed_at=None, attempts=F('attempts') - 1)
+
+
+def requeue_expired():
+    """
+    Put back tasks whose worker has held them past the lease (e.g. it died).
+
+    A task that has used up its attempts fails instead, so one that kills
+    its worker can't do so forever.
+    """
+    now = timezone.now()
+    expired = Task.objects.filter(
+        status='running', claimed_at__lt=now - datetime.timedelta(seconds=settings.TASKS_LEASE_SECONDS),
+    )
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', claimed_by='', claimed_at=None, finished_at=now, last_error='Worker lease expired',
+    )
+    requeued = expired.update(status='queued', claimed_by='', claimed_at=None, run_at=now)
+    return requeued, failed
+
+
+def purge_finished():
+    """Delete finished tasks older than TASKS_KEEP_FINISHED_SECONDS"""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.TASKS_KEEP_FINISHED_SECONDS)
+    return Task.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff).delete()[0]
@@ -0,0 +1,190 @@
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from profiles import exports
+from profiles.models import Profile, ProfileExport
+from . import queue
+from .models import Task
+
+# Values the record task was called with
+calls = []
+
+
+@queue.task(name='tasks.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task(name='tasks.tests.fail', max_attempts=3)
+def fail():
+    raise RuntimeError('Always fails')
+
+
+class QueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def make_due(self):
+        """Let the queued tasks run now, as if their backoff had passed"""
+        Task.objects.filter(status='queued').update(run_at=timezone.now())
+
+
+class ClaimTests(QueueTestCase):
+
+    def test_claims_due_tasks_by_priority(self):
+        low = record.enqueue('low')
+        high = record.enqueue('high', priority=5)
+        record.enqueue('later', delay=60)
+        claimed = queue.claim(10)
+        self.assertEqual([task.id for task in claimed], [high.id, low.id])
+        self.assertTrue(all(task.status == 'running' and task.attempts == 1 for task in claimed))
+
+    def test_no_task_is_claimed_twice(self):
+        # Exercises the single-statement claim on SQLite, SKIP LOCKED elsewhere
+        for value in range(7):
+            record.enqueue(value)
+        batches = [queue.claim(3), queue.claim(3), queue.claim(3), queue.claim(3)]
+        ids = [task.id for batch in batches for task in batch]
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1, 0])
+        self.assertEqual(len(set(ids)), 7)
+        self.assertEqual(len({batch[0].claimed_by for batch in batches[:3]}), 3)
+
+    def test_claims_only_named_tasks(self):
+        record.enqueue(1)
+        fail.enqueue()
+        self.assertEqual([task.name for task in queue.claim(10, ['tasks.tests.fail'])], ['tasks.tests.fail'])
+
+    def test_run_records_success(self):
+        record.enqueue('hello')
+        [task] = queue.claim(1)
+        self.assertEqual(queue.run(task), 'done')
+        self.assertEqual(calls, ['hello'])
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.claimed_by), ('done', ''))
+        self.assertIsNotNone(task.finished_at)
+
+    def test_release_returns_unstarted_tasks(self):
+        record.enqueue(1)
+        claimed = queue.claim(1)
+        self.assertEqual(queue.release(claimed), 1)
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts, task.claimed_by), ('queued', 0, ''))
+
+
+@override_settings(TASKS_RETRY_BACKOFF_SECONDS=10, TASKS_MAX_RETRY_BACKOFF_SECONDS=15)
+class RetryTests(QueueTestCase):
+
+    def test_retries_with_backoff_until_out_of_attempts(self):
+        fail.enqueue()
+        delays = []
+        for attempt in range(1, 3):
+            [task] = queue.claim(1)
+            before = timezone.now()
+            with self.assertLogs('tasks.queue', 'ERROR'):
+                self.assertEqual(queue.run(task), 'queued')
+            task.refresh_from_db()
+            self.assertEqual(task.attempts, attempt)
+            self.assertEqual(task.last_error, 'RuntimeError: Always fails')
+            delays.append((task.run_at - before).total_seconds())
+            # Not due again until the backoff has passed
+            self.assertEqual(queue.claim(1), [])
+            self.make_due()
+        # 10s, then 20s capped at 15s, each with up to half taken off as jitter
+        self.assertTrue(5 <= delays[0] <= 10.5, delays)
+        self.assertTrue(7.5 <= delays[1] <= 15.5, delays)
+
+        [task] = queue.claim(1)
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertEqual(queue.run(task), 'failed')
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ('failed', 3))
+        self.assertIsNotNone(task.finished_at)
+
+    def test_unknown_task_fails_at_once(self):
+        Task.objects.create(name='tasks.tests.missing', run_at=timezone.now())
+        [task] = queue.claim(1)
+        with self.assertLogs('tasks.queue', 'ERROR') as logs:
+            self.assertEqual(queue.run(task), 'failed')
+        self.assertIn('tasks.tests.missing', logs.output[0])
+
+    def test_outcome_is_only_recorded_by_the_claim_holder(self):
+        record.enqueue(1)
+        [task] = queue.claim(1)
+        # The lease expired and another worker claimed the task meanwhile
+        Task.objects.filter(id=task.id).update(claimed_by='another-worker')
+        queue.run(task)
+        self.assertEqual(Task.objects.get(id=task.id).status, 'running')
+
+
+@override_settings(TASKS_LEASE_SECONDS=60)
+class RequeueExpiredTests(QueueTestCase):
+
+    def expire(self):
+        Task.objects.filter(status='running').update(claimed_at=timezone.now() - datetime.timedelta(seconds=61))
+
+    def test_requeues_tasks_past_their_lease(self):
+        record.enqueue(1)
+        record.enqueue(2)
+        claimed = queue.claim(2)
+        Task.objects.filter(id=claimed[0].id).update(claimed_at=timezone.now() - datetime.timedelta(seconds=61))
+        self.assertEqual(queue.requeue_expired(), (1, 0))
+        self.assertEqual(Task.objects.get(id=claimed[0].id).status, 'queued')
+        self.assertEqual(Task.objects.get(id=claimed[1].id).status, 'running')
+        self.assertEqual([task.id for task in queue.claim(1)], [claimed[0].id])
+
+    def test_fails_tasks_out_of_attempts(self):
+        record.enqueue(1)
+        Task.objects.update(max_attempts=1)
+        queue.claim(1)
+        self.expire()
+        self.assertEqual(queue.requeue_expired(), (0, 1))
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.last_error), ('failed', 'Worker lease expired'))
+
+
+class EnqueueOnCommitTests(QueueTestCase):
+
+    def test_enqueued_once_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record.enqueue_on_commit('after commit')
+            self.assertFalse(Task.objects.exists())
+        for callback in callbacks:
+            callback()
+        task = Task.objects.get()
+        self.assertEqual((task.name, task.args), ('tasks.tests.record', ['after commit']))
+
+    def test_not_enqueued_when_rolled_back(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    record.enqueue_on_commit('rolled back')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(Task.objects.exists())
+
+
+class RenderExportTaskTests(QueueTestCase):
+
+    def test_worker_renders_requested_export(self):
+        user = User.objects.create_user('candidate', first_name='Sam', last_name='Lee')
+        profile = Profile.objects.create(user=user, headline='Engineer')
+        with self.captureOnCommitCallbacks(execute=True):
+            export = exports.request_export(profile, 'json')
+        self.assertEqual(export.status, 'pending')
+
+        [task] = queue.claim(10)
+        self.assertEqual((task.name, task.args, task.priority), ('profiles.render_export', [export.id], 10))
+        self.assertEqual(queue.run(task), 'done')
+        export = ProfileExport.objects.get(id=export.id)
+        self.assertEqual(export.status, 'ready')
+        self.assertEqual(json.loads(bytes(export.content))['basics']['label'], 'Engineer')
+        # Served from the artifact from now on, without queueing anything
+        self.assertEqual(exports.request_export(profile, 'json').status, 'ready')
+        self.assertEqual(Task.objects.filter(status='queued').count(), 0)